@@ -13,4 +13,8 @@ from .client import (  # pylint: disable=wrong-import-position
     BruntClient,
     BruntClientAsync,
 )
+from .facade import BruntClientLoop  # pylint: disable=wrong-import-position
 from .thing import Thing  # pylint: disable=wrong-import-position
+from .scheduler import PriorityScheduler  # pylint: disable=wrong-import-position
+from .pipeline import DevicePipelines  # pylint: disable=wrong-import-position
+from .utils import RequestPriority  # pylint: disable=wrong-import-position
@@ -0,0 +1,326 @@
+"""Command line tool to run batches of Brunt commands."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import math
+import os
+import sys
+import time
+from typing import IO, Any, Final
+
+from . import __version__
+from .client import BruntClientAsync
+from .thing import Thing
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY: Final = 16
+DEFAULT_SESSION_FILE: Final = os.path.join("~", ".brunt_session.json")
+COMMANDS: Final = ("get-state", "set-position", "list")
+
+
+def parse_args(args: list[str]) -> argparse.Namespace:
+    """Parse the command line parameters.
+
+    :param args: the command line parameters as a list of strings.
+    :return: the parsed parameters.
+    """
+    parser = argparse.ArgumentParser(
+        prog="brunt",
+        description=(
+            "Run Brunt commands, read as NDJSON from a file or stdin, for instance "
+            '{"cmd": "set-position", "thing": "Blind", "position": 50}, '
+            '{"cmd": "get-state", "thing_uri": "/hub/1234"} or {"cmd": "list"}. '
+            "The results are written as NDJSON to stdout as soon as they are done."
+        ),
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    parser.add_argument(
+        "input",
+        nargs="?",
+        type=argparse.FileType("r"),
+        default=sys.stdin,
+        help="file with one command per line, defaults to stdin",
+    )
+    parser.add_argument(
+        "-u",
+        "--username",
+        default=os.environ.get("BRUNT_USERNAME"),
+        help="the username of your Brunt account, defaults to $BRUNT_USERNAME",
+    )
+    parser.add_argument(
+        "-p",
+        "--password",
+        default=os.environ.get("BRUNT_PASSWORD"),
+        help="the password of your Brunt account, defaults to $BRUNT_PASSWORD",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"the number of commands run at once, defaults to {DEFAULT_CONCURRENCY}",
+    )
+    parser.add_argument(
+        "-t", "--timeout", type=float, help="deadline in seconds for each command"
+    )
+    parser.add_argument(
+        "--session",
+        default=DEFAULT_SESSION_FILE,
+        help=f"file to keep the login session in, defaults to {DEFAULT_SESSION_FILE}",
+    )
+    parser.add_argument(
+        "--no-session", action="store_true", help="do not load or save the session"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print a latency summary to stderr when done",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        action="store_const",
+        const=logging.INFO,
+        help="set loglevel to INFO",
+    )
+    parser.add_argument(
+        "-vv",
+        "--very-verbose",
+        dest="loglevel",
+        action="store_const",
+        const=logging.DEBUG,
+        help="set loglevel to DEBUG",
+    )
+    parsed = parser.parse_args(args)
+    if parsed.concurrency < 1:
+        parser.error("--concurrency should be at least 1")
+    return parsed
+
+
+def setup_logging(loglevel: int | None) -> None:
+    """Set up basic logging to stderr.
+
+    :param loglevel: minimum loglevel for emitting messages.
+    """
+    logging.basicConfig(
+        level=loglevel or logging.WARNING,
+        stream=sys.stderr,
+        format="[%(asctime)s] %(levelname)s:%(name)s:%(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
+def _to_json(value: Any) -> Any:
+    """Convert a result of the client to something json can dump."""
+    if isinstance(value, Thing):
+        return dataclasses.asdict(value)
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    return value
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Return the nearest rank percentile of sorted values."""
+    idx = max(0, math.ceil(percentile / 100 * len(values)) - 1)
+    return values[idx]
+
+
+def _load_session(client: BruntClientAsync, path: str) -> None:
+    """Load a saved session, a missing or broken file is ignored."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            client.import_session(json.load(file))
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, TypeError, KeyError) as exc:
+        _LOGGER.warning("Could not load the session from %s: %s", path, exc)
+
+
+def _save_session(client: BruntClientAsync, path: str) -> None:
+    """Save the session, only readable for the user since it is a login."""
+    cookies = client.export_session()
+    if not cookies:
+        return
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(cookies, file)
+    os.replace(tmp, path)
+
+
+async def _run_command(
+    client: BruntClientAsync, command: dict[str, Any], timeout: float | None
+) -> Any:
+    """Run one command with the client."""
+    cmd = command.get("cmd")
+    thing = command.get("thing")
+    thing_uri = command.get("thing_uri")
+    if cmd == "get-state":
+        return await client.async_get_state(
+            thing=thing, thing_uri=thing_uri, timeout=timeout
+        )
+    if cmd == "set-position":
+        if "position" not in command:
+            raise ValueError("set-position needs a position.")
+        return await client.async_change_request_position(
+            int(command["position"]),
+            thing=thing,
+            thing_uri=thing_uri,
+            force=bool(command.get("force", False)),
+            timeout=timeout,
+        )
+    if cmd == "list":
+        return await client.async_get_things(timeout=timeout)
+    raise ValueError(f"Unknown cmd: {cmd}, use one of {', '.join(COMMANDS)}")
+
+
+async def run_batch(
+    client: BruntClientAsync,
+    source: IO[str],
+    output: IO[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = None,
+) -> list[tuple[str, float, bool]]:
+    """Run the NDJSON commands from source and write the results to output.
+
+    The commands are read while earlier commands run, at most concurrency
+    commands are in flight at once, and each result is written as soon as
+    it is done, so not in the order of the input. An "id" in a command is
+    copied to its result.
+
+    :param client: the client to run the commands with.
+    :param source: the NDJSON commands, one per line.
+    :param output: where the NDJSON results are written.
+    :param concurrency: the number of commands run at once.
+    :param timeout: deadline in seconds for each command.
+    :return: list with the cmd, the latency in seconds and if it succeeded,
+        for each command.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: set[asyncio.Task[None]] = set()
+    timings: list[tuple[str, float, bool]] = []
+
+    def _write(result: dict[str, Any]) -> None:
+        output.write(json.dumps(result, default=str) + "\n")
+        output.flush()
+
+    async def _run(line_no: int, command: dict[str, Any]) -> None:
+        result: dict[str, Any] = {"line": line_no, "cmd": command.get("cmd")}
+        if "id" in command:
+            result["id"] = command["id"]
+        start = time.perf_counter()
+        try:
+            value = await _run_command(client, command, timeout)
+        except Exception as exc:  # pylint: disable=broad-except
+            result.update(ok=False, error=f"{type(exc).__name__}: {exc}")
+        else:
+            result.update(ok=True, result=_to_json(value))
+        finally:
+            semaphore.release()
+        result["elapsed"] = round(time.perf_counter() - start, 6)
+        timings.append((str(result["cmd"]), result["elapsed"], result["ok"]))
+        _write(result)
+
+    line_no = 0
+    while True:
+        line = await loop.run_in_executor(None, source.readline)
+        if not line:
+            break
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict):
+                raise ValueError("a command should be a json object")
+        except ValueError as exc:
+            _write({"line": line_no, "ok": False, "error": f"Invalid command: {exc}"})
+            timings.append(("invalid", 0.0, False))
+            continue
+        await semaphore.acquire()
+        task = asyncio.ensure_future(_run(line_no, command))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return timings
+
+
+def format_stats(timings: list[tuple[str, float, bool]], elapsed: float) -> str:
+    """Return a latency summary of a batch.
+
+    :param timings: the list returned by run_batch.
+    :param elapsed: the wall clock seconds of the whole batch.
+    :return: a summary, with a line per cmd.
+    """
+    lines = [
+        f"{len(timings)} commands in {elapsed:.3f}s "
+        f"({len(timings) / elapsed if elapsed else 0:.1f}/s), "
+        f"{sum(1 for t in timings if not t[2])} failed"
+    ]
+    per_cmd: dict[str, list[float]] = {}
+    for cmd, latency, _ in timings:
+        per_cmd.setdefault(cmd, []).append(latency)
+    for cmd, latencies in sorted(per_cmd.items()):
+        latencies.sort()
+        lines.append(
+            f"{cmd}: n={len(latencies)} "
+            + " ".join(
+                f"p{p}={_percentile(latencies, p) * 1000:.1f}ms" for p in (50, 90, 99)
+            )
+            + f" max={latencies[-1] * 1000:.1f}ms"
+        )
+    return "\n".join(lines)
+
+
+async def _async_main(args: argparse.Namespace) -> int:
+    """Run the batch with a client, loading and saving the session."""
+    session_file = None if args.no_session else os.path.expanduser(args.session)
+    async with BruntClientAsync(args.username, args.password) as client:
+        if session_file:
+            _load_session(client, session_file)
+        start = time.perf_counter()
+        timings = await run_batch(
+            client, args.input, sys.stdout, args.concurrency, args.timeout
+        )
+        elapsed = time.perf_counter() - start
+        if session_file:
+            try:
+                _save_session(client, session_file)
+            except OSError as exc:
+                _LOGGER.warning(
+                    "Could not save the session to %s: %s", session_file, exc
+                )
+    if args.stats:
+        print(format_stats(timings, elapsed), file=sys.stderr)
+    return 1 if any(not ok for _, _, ok in timings) else 0
+
+
+def main(args: list[str]) -> int:
+    """Run the commands and return the exit code, 1 if a command failed.
+
+    :param args: command line parameters as list of strings.
+    :return: the exit code.
+    """
+    parsed = parse_args(args)
+    setup_logging(parsed.loglevel)
+    return asyncio.run(_async_main(parsed))
+
+
+def run() -> None:
+    """Call main passing the CLI arguments extracted from sys.argv.
+
+    This function can be used as entry point to create console scripts.
+    """
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    run()
@@ -1,18 +1,62 @@
 """Main code for brunt api package."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
 from types import TracebackType
-from typing import Any, Type
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Iterator, Type
 
 from aiohttp.client import ClientSession
+from aiohttp.client_exceptions import ClientError, ClientResponseError
 from requests import Session
 
-from .const import MAIN_HOST, MAIN_THINGS_PATH, REQUEST_POSITION_KEY, THINGS_HOST
+from .const import (
+    ARRIVAL_TOLERANCE,
+    DEFAULT_ARRIVAL_POLL_INTERVAL,
+    DEFAULT_ARRIVAL_TIMEOUT,
+    DEFAULT_ELIDE_MAX_AGE,
+    DEFAULT_GROUP_CONCURRENCY,
+    DEFAULT_MAP_WORKERS,
+    DEFAULT_POOL_SIZE,
+    FLEET_REFRESH_MIN_THINGS,
+    FLEET_REFRESH_RATIO,
+    MAIN_HOST,
+    MAIN_THINGS_PATH,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_DELAY,
+    PENDING_MAX_AGE,
+    REQUEST_POSITION_KEY,
+    THINGS_HOST,
+)
+from .history import ThingHistory
 from .http import BruntHttp, BruntHttpAsync
-from .thing import Thing
-from .utils import RequestTypes
+from .limiter import LimiterStats
+from .outbox import Outbox, OutboxEntry
+from .pipeline import DevicePipelines
+from .poller import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_JITTER,
+    DEFAULT_MAX_BATCHES,
+    DEFAULT_TICK,
+    PollScheduler,
+)
+from .profiling import profiled, stage
+from .scheduler import PriorityScheduler
+from .thing import RegistryDiff, Thing
+from .utils import (
+    Deadline,
+    LatencyTracker,
+    RequestPriority,
+    RequestTypes,
+    deadline_scope,
+    remaining_timeout,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,7 +64,15 @@ _LOGGER = logging.getLogger(__name__)
 class BaseClient:
     """Base class for clients."""
 
-    def __init__(self, username: str = None, password: str = None):
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        elide_writes: bool = False,
+        elide_max_age: float = DEFAULT_ELIDE_MAX_AGE,
+        timeout: float = None,
+        history_size: int = None,
+    ):
         """Construct for the API wrapper.
 
         If you supply username and password here, they are stored, but not used.
@@ -29,12 +81,33 @@ class BaseClient:
 
         :param username: the username of your Brunt account
         :param password: the password of your Brunt account
+        :param elide_writes: skip position changes that match the known target
+        :param elide_max_age: seconds the cached state is trusted for eliding writes
+        :param timeout: default deadline in seconds for each call
+        :param history_size: number of states kept per thing, None for no history
         """
         self._user: str | None = username
         self._pass: str | None = password
         self._things: list[Thing] | None = None
+        self._thing_index: dict[str, int] = {}
+        self._record_keys: dict[str, tuple[Any, int]] = {}
+        self._last_registry_diff: RegistryDiff | None = None
         self._last_login: datetime | None = None
         self._last_requested_position: dict[str, int] | None = None
+        self._groups: dict[str, list[str]] = {}
+        self._scenes: dict[str, dict[str, int]] = {}
+        self._pending: dict[str, dict[str, tuple[Any, float]]] = {}
+        self._elide_writes = elide_writes
+        self._elide_max_age = elide_max_age
+        self._observed_at: dict[str, float] = {}
+        self._timeout = timeout
+        self._history_size = history_size
+        self._history: dict[str, ThingHistory] = {}
+        self._lock = threading.RLock()
+
+    def _call_timeout(self, timeout: float | None) -> float | None:
+        """Return the timeout for a call, the client default when not given."""
+        return timeout if timeout is not None else self._timeout
 
     def _prepare_login(self, username: str = None, password: str = None) -> dict:
         """Prepare the login info."""
@@ -77,10 +150,11 @@ class BaseClient:
             if int(value) < 0 or int(value) > 100:
                 raise ValueError("Please set the position between 0 and 100.")
             if thing_uri:
-                if self._last_requested_position is not None:
-                    self._last_requested_position[thing_uri] = int(value)
-                else:
-                    self._last_requested_position = {thing_uri: int(value)}
+                with self._lock:
+                    if self._last_requested_position is not None:
+                        self._last_requested_position[thing_uri] = int(value)
+                    else:
+                        self._last_requested_position = {thing_uri: int(value)}
         return {
             "data": {key: str(value)},
             "path": f"/thing{thing_uri}",
@@ -89,28 +163,359 @@ class BaseClient:
 
     def _get_thing_uri_from_thing(self, thing: str) -> str:
         """Get the thing_uri for a thing."""
+        with self._lock:
+            if self._things is None:
+                raise ValueError("Refresh things first")
+            thing_uri = next(
+                (t.thing_uri for t in self._things if t.compare_name(thing)), None
+            )
+            if thing_uri is None:
+                raise ValueError("Unknown thing: " + thing)
+            return thing_uri
+
+    def _get_thing_by_uri(self, thing_uri: str) -> Thing | None:
+        """Get the cached Thing for a thing_uri."""
+        with self._lock:
+            idx = self._thing_index.get(thing_uri)
+            if self._things is None or idx is None:
+                return None
+            return self._things[idx]
+
+    def get_cached_thing(self, thing: str = None, thing_uri: str = None) -> Thing:
+        """Get the cached state of a thing, without calling the API.
+
+        Includes the changes made through this client that the server
+        has not yet confirmed, see pending_changes.
+
+        :param thing: a string with the name of the thing.
+        :param thing_uri: Uri (string) of the thing.
+        :return: the cached Thing.
+        :raises: ValueError if the requested thing does not exists.
+            SyntaxError when not exactly one of the params is given.
+        """
+        if thing is None and thing_uri is None:
+            raise SyntaxError(
+                "Please provide either the 'thing' name or the 'thing_uri', \
+                    the thing_uri is used first when given."
+            )
+        if thing_uri is None and thing is not None:
+            thing_uri = self._get_thing_uri_from_thing(thing)
+        cached = self._get_thing_by_uri(thing_uri)  # type: ignore
+        if cached is None:
+            raise ValueError(f"Unknown thing_uri: {thing_uri}")
+        return cached
+
+    @property
+    def pending_changes(self) -> dict[str, dict[str, Any]]:
+        """Return the changed fields per thing_uri not yet confirmed by the server."""
+        with self._lock:
+            return {
+                uri: {key: value for key, (value, _) in fields.items()}
+                for uri, fields in self._pending.items()
+                if fields
+            }
+
+    def _apply_change(self, request: dict) -> None:
+        """Apply a successful change to the cached Thing and mark it as pending."""
+        with self._lock:
+            thing_uri = request["path"][len("/thing") :]
+            cached = self._get_thing_by_uri(thing_uri)
+            if cached is None:
+                return
+            updates = cached.update_from_dict(request["data"])
+            now = time.monotonic()
+            self._pending.setdefault(thing_uri, {}).update(
+                {key: (value, now) for key, value in updates.items()}
+            )
+            self._observed_at[thing_uri] = now
+
+    def _observe_thing(self, thing: Thing) -> Thing:
+        """Check a fetched Thing against the pending changes and cache it."""
+        with self._lock:
+            if thing.thing_uri is None:
+                return thing
+            self._process_state(thing)
+            idx = self._thing_index.get(thing.thing_uri)
+            if self._things is not None and idx is not None:
+                self._things[idx] = thing
+            return thing
+
+    def history(self, thing: str = None, thing_uri: str = None) -> ThingHistory:
+        """Get the position history of a thing.
+
+        :param thing: a string with the name of the thing.
+        :param thing_uri: Uri (string) of the thing.
+        :return: the ThingHistory with the states seen by this client.
+        :raises: ValueError if the client keeps no history or the thing has none.
+            SyntaxError when not exactly one of the params is given.
+        """
+        if not self._history_size:
+            raise ValueError("Create the client with a history_size to keep history.")
+        if thing is None and thing_uri is None:
+            raise SyntaxError(
+                "Please provide either the 'thing' name or the 'thing_uri', \
+                    the thing_uri is used first when given."
+            )
+        if thing_uri is None and thing is not None:
+            thing_uri = self._get_thing_uri_from_thing(thing)
+        if thing_uri not in self._history:
+            raise ValueError(f"No history for thing_uri: {thing_uri}")
+        return self._history[thing_uri]  # type: ignore
+
+    def _process_state(self, thing: Thing) -> None:
+        """Process a fetched Thing, for history, freshness and pending changes.
+
+        A pending change is done when the Thing confirms it. Until then the
+        pending value is kept on the Thing, so a lagging state does not roll
+        back the cache, for at most PENDING_MAX_AGE seconds, then the server
+        wins. Called with the lock held.
+        """
+        if thing.thing_uri is None:
+            return
+        now = time.monotonic()
+        self._observed_at[thing.thing_uri] = now
+        if self._history_size:
+            if thing.thing_uri not in self._history:
+                self._history[thing.thing_uri] = ThingHistory(self._history_size)
+            self._history[thing.thing_uri].append_thing(thing)
+        fields = self._pending.get(thing.thing_uri)
+        if fields is None:
+            return
+        for key, (value, written) in list(fields.items()):
+            if getattr(thing, key) == value:
+                del fields[key]
+            elif now - written > PENDING_MAX_AGE:
+                _LOGGER.debug(
+                    "Pending %s=%s for %s not confirmed, server has %s",
+                    key,
+                    value,
+                    thing.thing_uri,
+                    getattr(thing, key),
+                )
+                del fields[key]
+            else:
+                setattr(thing, key, value)
+        if not fields:
+            del self._pending[thing.thing_uri]
+
+    def _should_elide(
+        self, request_position: int, thing: str = None, thing_uri: str = None
+    ) -> bool:
+        """Return True if the position is the known target and the state is fresh."""
+        with self._lock:
+            if not self._elide_writes or self._things is None:
+                return False
+            if thing_uri is None:
+                try:
+                    thing_uri = self._get_thing_uri_from_thing(thing)  # type: ignore
+                except ValueError:
+                    return False
+            observed = self._observed_at.get(thing_uri)
+            if observed is None or time.monotonic() - observed > self._elide_max_age:
+                return False
+            cached = self._get_thing_by_uri(thing_uri)
+            if cached is None:
+                return False
+            last_requested = (self._last_requested_position or {}).get(
+                thing_uri, cached.request_position
+            )
+            if cached.request_position == last_requested == int(request_position):
+                _LOGGER.debug(
+                    "Skipping write, %s is already at %s", thing_uri, last_requested
+                )
+                return True
+            return False
+
+    @staticmethod
+    def _record_key(record: dict[str, Any]) -> tuple[Any, int]:
+        """Return the TIMESTAMP and a cheap hash of a raw thing record."""
+        try:
+            record_hash = hash(tuple(record.items()))
+        except TypeError:
+            record_hash = hash(repr(record))
+        return record.get("TIMESTAMP"), record_hash
+
+    def _registry_apply(
+        self, record: dict[str, Any], seen: set[str], diff: RegistryDiff
+    ) -> Thing | None:
+        """Add a thing record to the registry, only rebuilding changed things.
+
+        A cached Thing is kept as is when the TIMESTAMP and hash of its record
+        did not change and it has no pending changes.
+
+        :raises: ValueError when the record is not a dict.
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f"Invalid thing record in response: {record!r}")
+        with self._lock:
+            thing_uri = Thing.uri_from_dict(record)
+            if thing_uri is None:
+                _LOGGER.debug("Skipping thing without thing_uri: %s", record)
+                return None
+            if self._things is None:
+                self._things = []
+            seen.add(thing_uri)
+            key = self._record_key(record)
+            idx = self._thing_index.get(thing_uri)
+            if (
+                idx is not None
+                and thing_uri not in self._pending
+                and self._record_keys.get(thing_uri) == key
+            ):
+                self._observed_at[thing_uri] = time.monotonic()
+                diff.unchanged += 1
+                return self._things[idx]
+            thing = Thing.create_from_dict(record)
+            self._process_state(thing)
+            self._record_keys[thing_uri] = key
+            if idx is None:
+                self._thing_index[thing_uri] = len(self._things)
+                self._things.append(thing)
+                diff.added.append(thing)
+            else:
+                self._things[idx] = thing
+                diff.changed.append(thing)
+            return thing
+
+    def _registry_finish(self, seen: set[str], diff: RegistryDiff) -> RegistryDiff:
+        """Remove the things that were not in the thing list."""
+        with self._lock:
+            if self._things is None:
+                self._things = []
+            if len(seen) != len(self._things):
+                diff.removed = [t for t in self._things if t.thing_uri not in seen]
+                self._things = [t for t in self._things if t.thing_uri in seen]
+                for thing in diff.removed:
+                    self._record_keys.pop(thing.thing_uri, None)  # type: ignore
+                    self._observed_at.pop(thing.thing_uri, None)  # type: ignore
+                self._thing_index = {
+                    t.thing_uri: idx  # type: ignore
+                    for idx, t in enumerate(self._things)
+                }
+            self._last_registry_diff = diff
+            return diff
+
+    @profiled("registry")
+    def _update_registry(self, records: list[dict[str, Any]]) -> RegistryDiff:
+        """Update the registry from a complete thing list."""
+        with self._lock:
+            seen: set[str] = set()
+            diff = RegistryDiff()
+            for record in records:
+                self._registry_apply(record, seen, diff)
+            return self._registry_finish(seen, diff)
+
+    @property
+    def last_registry_diff(self) -> RegistryDiff | None:
+        """Return the things added, removed and changed by the last refresh."""
+        return self._last_registry_diff
+
+    def _use_list_refresh(
+        self, thing_uris: list[str], list_threshold: int | None
+    ) -> bool:
+        """Return True if one thing list call is cheaper than a GET per thing."""
         if self._things is None:
-            raise ValueError("Refresh things first")
-        thing_uri = next(
-            (t.thing_uri for t in self._things if t.compare_name(thing)), None
-        )
-        if thing_uri is None:
-            raise ValueError("Unknown thing: " + thing)
-        return thing_uri
+            return True
+        if list_threshold is None:
+            list_threshold = max(
+                FLEET_REFRESH_MIN_THINGS,
+                int(len(self._things) * FLEET_REFRESH_RATIO),
+            )
+        return len(thing_uris) >= list_threshold
+
+    @staticmethod
+    def _has_arrived(state: Thing, position: int) -> bool:
+        """Check if a thing is at a position, blinds often stop one off."""
+        return abs(state.current_position - position) <= ARRIVAL_TOLERANCE
+
+    def _resolve_thing_uri(self, thing: str) -> str:
+        """Get the thing_uri for a group member, given either a thing_uri or a name."""
+        with self._lock:
+            if self._things is None:
+                raise ValueError("Refresh things first")
+            if any(t.thing_uri == thing for t in self._things):
+                return thing
+            return self._get_thing_uri_from_thing(thing)
+
+    def add_group(self, name: str, things: list[str]) -> None:
+        """Add (or replace) a named group of things.
+
+        :param name: the name of the group, for instance "south facade"
+        :param things: the names or thing_uris of the things in the group
+        :raises: ValueError if the group is empty.
+        """
+        if not things:
+            raise ValueError("A group needs at least one thing.")
+        self._groups[name] = list(things)
+
+    def remove_group(self, name: str) -> None:
+        """Remove a named group."""
+        if self._groups.pop(name, None) is None:
+            raise ValueError("Unknown group: " + name)
+
+    @property
+    def groups(self) -> dict[str, list[str]]:
+        """Return the groups."""
+        return {name: list(things) for name, things in self._groups.items()}
+
+    def add_scene(self, name: str, positions: dict[str, int]) -> None:
+        """Add (or replace) a named scene, a requested position for each thing.
+
+        :param name: the name of the scene, for instance "evening"
+        :param positions: dict with the names or thing_uris of the things and
+            the position (0-100) they should move to.
+        :raises: ValueError if the scene is empty or a position is not
+            between 0 and 100.
+        """
+        if not positions:
+            raise ValueError("A scene needs at least one thing.")
+        for position in positions.values():
+            if int(position) < 0 or int(position) > 100:
+                raise ValueError("Please set the position between 0 and 100.")
+        self._scenes[name] = {thing: int(pos) for thing, pos in positions.items()}
+
+    def remove_scene(self, name: str) -> None:
+        """Remove a named scene."""
+        if self._scenes.pop(name, None) is None:
+            raise ValueError("Unknown scene: " + name)
+
+    @property
+    def scenes(self) -> dict[str, dict[str, int]]:
+        """Return the scenes."""
+        return {name: dict(positions) for name, positions in self._scenes.items()}
+
+    def _prepare_group(self, group: str, request_position: int) -> dict[str, int]:
+        """Get the thing_uri and position for each member of a group."""
+        if group not in self._groups:
+            raise ValueError("Unknown group: " + group)
+        return {
+            self._resolve_thing_uri(thing): int(request_position)
+            for thing in self._groups[group]
+        }
+
+    def _prepare_scene(self, scene: str) -> dict[str, int]:
+        """Get the thing_uri and position for each member of a scene."""
+        if scene not in self._scenes:
+            raise ValueError("Unknown scene: " + scene)
+        return {
+            self._resolve_thing_uri(thing): position
+            for thing, position in self._scenes[scene].items()
+        }
 
     @property
     def last_requested_positions(self) -> dict[str, int]:
         """Return the last requested positions."""
-        if self._things is None:
-            raise ValueError("Refresh things first")
-        ret = {
-            t.thing_uri: int(t.request_position)
-            for t in self._things
-            if t.thing_uri is not None
-        }
-        if self._last_requested_position is not None:
-            ret.update(self._last_requested_position)
-        return ret
+        with self._lock:
+            if self._things is None:
+                raise ValueError("Refresh things first")
+            ret = {
+                t.thing_uri: int(t.request_position)
+                for t in self._things
+                if t.thing_uri is not None
+            }
+            if self._last_requested_position is not None:
+                ret.update(self._last_requested_position)
+            return ret
 
 
 class BruntClient(BaseClient):
@@ -121,18 +526,44 @@ class BruntClient(BaseClient):
         username: str = None,
         password: str = None,
         session: Session = None,
+        elide_writes: bool = False,
+        elide_max_age: float = DEFAULT_ELIDE_MAX_AGE,
+        timeout: float = None,
+        history_size: int = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        http: BruntHttp = None,
     ):
         """Construct for the API wrapper.
 
         If you supply username and password here, they are stored, but not used.
         Auto logging in then does work when calling another method,
             no explicit login needed.
+        The client can be shared by many threads, they use one connection pool.
 
         :param username: the username of your Brunt account
         :param password: the password of your Brunt account
+        :param session: requests Session
+        :param elide_writes: skip position changes that match the known target,
+            unless force is used.
+        :param elide_max_age: seconds the cached state is trusted for eliding writes
+        :param timeout: default deadline in seconds for each call, including
+            the login and thing lookup it needs, None waits forever.
+        :param history_size: number of states kept per thing, None for no history.
+        :param pool_size: the number of connections kept open per host, when no
+            session is given; set it to at least the number of threads.
+        :param http: BruntHttp transport to use instead of a new one, for
+            instance a RecordingHttp or ReplayHttp.
         """
-        super().__init__(username, password)
-        self._http = BruntHttp(session=session)
+        super().__init__(
+            username, password, elide_writes, elide_max_age, timeout, history_size
+        )
+        self._http = (
+            http
+            if http is not None
+            else BruntHttp(session=session, pool_size=pool_size)
+        )
+        self._login_lock = threading.Lock()
+        self._things_lock = threading.Lock()
 
     def __enter__(self) -> BruntClient:
         """Enter the context manager."""
@@ -149,31 +580,91 @@ class BruntClient(BaseClient):
 
     def close(self) -> None:
         """Close the session."""
-        self._http.session.close()
+        self._http.close()
+
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the session cookies, to reuse the login in another client.
+
+        :return: list of cookie dicts, for import_session.
+        """
+        return self._http.export_session()
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Load session cookies from export_session, so no new login is needed.
+
+        :param cookies: list of cookie dicts from export_session.
+        """
+        self._http.import_session(cookies)
+
+    def _request(self, data: dict, request_type: RequestTypes) -> dict | list:
+        """Do a request within the remaining time of the current deadline."""
+        return self._http.request(data, request_type, timeout=remaining_timeout())
+
+    @staticmethod
+    @contextmanager
+    def _hold(lock: threading.Lock) -> Iterator[None]:
+        """Hold a lock, waiting at most the remaining time of the current deadline."""
+        timeout = remaining_timeout()
+        if not lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError("Deadline passed while waiting for another thread")
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def _ensure_login(self) -> None:
+        """Login when there is no valid session, once for all threads."""
+        if self._http.is_logged_in:
+            return
+        with self._hold(self._login_lock):
+            if not self._http.is_logged_in:
+                self.login()
 
-    def login(self, username: str = None, password: str = None) -> bool:
+    @profiled("login")
+    def login(
+        self, username: str = None, password: str = None, timeout: float = None
+    ) -> bool:
         """Login method using username and password.
 
         :param username: the username of your Brunt account
         :param password: the password of your Brunt account
+        :param timeout: deadline in seconds, defaults to the client timeout.
         :return: True if successfull
-        :raises: errors from Requests call
+        :raises: errors from Requests call, TimeoutError when the deadline passed.
         """
-        self._http.request(self._prepare_login(username, password), RequestTypes.POST)
+        with deadline_scope(self._call_timeout(timeout)):
+            self._request(self._prepare_login(username, password), RequestTypes.POST)
         self._last_login = datetime.utcnow()
         return True
 
-    def get_things(self, force: bool = False) -> list[Thing]:
+    @profiled("get_things")
+    def get_things(self, force: bool = False, timeout: float = None) -> list[Thing]:
         """Get all the things.
 
         Check if there are things in memory. otherwise first do the getThings call
         and then return _things.
 
+        :param timeout: deadline in seconds, defaults to the client timeout.
         :return: dict with things registered (without API call status)
         """
         if not self._things or force:
-            return self._get_things()
-        return self._things
+            with deadline_scope(self._call_timeout(timeout)):
+                with self._hold(self._things_lock):
+                    if not self._things or force:
+                        return self._get_things()
+        return self._things  # type: ignore
+
+    def refresh_things(self, timeout: float = None) -> RegistryDiff:
+        """Refresh the things and return what changed.
+
+        Only the things whose record changed are rebuilt, the other Thing
+        objects are kept as they are.
+
+        :param timeout: deadline in seconds, defaults to the client timeout.
+        :return: RegistryDiff with the added, removed and changed things.
+        """
+        self.get_things(force=True, timeout=timeout)
+        return self._last_registry_diff or RegistryDiff()
 
     def _get_things(self) -> list[Thing]:
         """Get the things registered in your account.
@@ -181,36 +672,113 @@ class BruntClient(BaseClient):
         :return: dict with things registered in the logged in account
             and API call status
         """
-        if not self._http.is_logged_in:
-            self.login()
-        resp = self._http.request(MAIN_THINGS_PATH, RequestTypes.GET)
+        self._ensure_login()
+        resp = self._request(MAIN_THINGS_PATH, RequestTypes.GET)
         if isinstance(resp, list):
-            self._things = [Thing.create_from_dict(r) for r in resp]
-            return self._things
+            self._update_registry(resp)
+            return self._things  # type: ignore
         return []
 
-    def get_state(self, thing: str = None, thing_uri: str = None) -> Thing:
+    def iter_things(self, timeout: float = None) -> Iterator[Thing]:
+        """Get the things registered in your account, one by one.
+
+        The response is parsed while it streams in, each Thing is yielded and
+        added to the registry as soon as its record is complete. Things that
+        are no longer in the account are removed once the stream is done.
+
+        :param timeout: deadline in seconds, defaults to the client timeout.
+        :return: iterator of Things
+        :raises: errors from Requests call, ValueError for an invalid response.
+        """
+        timeout = self._call_timeout(timeout)
+        deadline = Deadline(timeout) if timeout is not None else None
+        with deadline_scope(deadline.remaining() if deadline else None):
+            self._ensure_login()
+        seen: set[str] = set()
+        diff = RegistryDiff()
+        for record in self._http.iter_request(
+            MAIN_THINGS_PATH,
+            RequestTypes.GET,
+            timeout=deadline.remaining() if deadline else None,
+        ):
+            thing = self._registry_apply(record, seen, diff)
+            if thing is not None:
+                yield thing
+        self._registry_finish(seen, diff)
+
+    @profiled("refresh_states")
+    def refresh_states(
+        self,
+        things: list[str] = None,
+        list_threshold: int = None,
+        timeout: float = None,
+    ) -> dict[str, Thing]:
+        """Refresh the state of many things at once.
+
+        The thing list already contains the state of each thing, so when
+        enough things are needed the states come from one thing list call,
+        otherwise from a get_state call per thing.
+
+        :param things: the names or thing_uris of the things, None for all.
+        :param list_threshold: the number of things from which the thing list
+            is used, defaults to 10% of the registry with a minimum of 2.
+        :param timeout: deadline in seconds, defaults to the client timeout.
+        :return: dict with the thing_uri and the fresh Thing.
+        :raises: ValueError if a requested thing does not exists.
+        """
+        with deadline_scope(self._call_timeout(timeout)):
+            fetched = not self._things
+            self.get_things()
+            thing_uris = (
+                None if things is None else [self._resolve_thing_uri(t) for t in things]
+            )
+            if thing_uris is None or self._use_list_refresh(
+                thing_uris, list_threshold
+            ):
+                fresh = {
+                    t.thing_uri: t
+                    for t in self.get_things(force=not fetched)
+                    if t.thing_uri is not None
+                }
+                if thing_uris is None:
+                    return fresh
+                return {uri: fresh[uri] for uri in thing_uris if uri in fresh}
+            return {uri: self.get_state(thing_uri=uri) for uri in thing_uris}
+
+    @profiled("get_state")
+    def get_state(
+        self, thing: str = None, thing_uri: str = None, timeout: float = None
+    ) -> Thing:
         """Get the state of a thing.
 
         :param thing: a string with the name of the thing, which is then
             checked using getThings.
         :param thing_uri: Uri (string) of the thing you are getting the state from,
             not checked against getThings.
+        :param timeout: deadline in seconds for the whole call, including login
+            and thing lookup, defaults to the client timeout.
         :return: a dict with the state of the Thing.
         :raises: ValueError if the requested thing does not exists.
             NameError if not logged in.
             SyntaxError when not exactly one of the params is given.
+            TimeoutError when the deadline passed.
         """
-        if not self._http.is_logged_in:
-            self.login()
-        self.get_things()
-        resp = self._http.request(
-            self._prepare_state(thing=thing, thing_uri=thing_uri), RequestTypes.GET
-        )
-        return Thing.create_from_dict(resp)  # type: ignore
+        with deadline_scope(self._call_timeout(timeout)):
+            self._ensure_login()
+            self.get_things()
+            resp = self._request(
+                self._prepare_state(thing=thing, thing_uri=thing_uri), RequestTypes.GET
+            )
+        return self._observe_thing(Thing.create_from_dict(resp))  # type: ignore
 
+    @profiled("change_key")
     def change_key(
-        self, key: str, value: Any, thing: str = None, thing_uri: str = None
+        self,
+        key: str,
+        value: Any,
+        thing: str = None,
+        thing_uri: str = None,
+        timeout: float = None,
     ) -> dict | list:
         """Change a variable of the thing.  Mostly included for future additions.
 
@@ -220,24 +788,33 @@ class BruntClient(BaseClient):
             checked using getThings.
         :param thing_uri: Uri (string) of the thing you are getting the state from,
             not checked against getThings.
+        :param timeout: deadline in seconds for the whole call, including login
+            and thing lookup, defaults to the client timeout.
         :return: a dict with the state of the Thing.
         :raises: ValueError if the requested thing does not exists or the position is
             not between 0 and 100.
             NameError if not logged in.
             SyntaxError when not exactly one of the params is given.
+            TimeoutError when the deadline passed.
         """
-        if not self._http.is_logged_in:
-            self.login()
-        self.get_things()
-        return self._http.request(
-            self._prepare_change_key(
+        with deadline_scope(self._call_timeout(timeout)):
+            self._ensure_login()
+            self.get_things()
+            request = self._prepare_change_key(
                 key=key, value=value, thing=thing, thing_uri=thing_uri
-            ),
-            RequestTypes.PUT,
-        )
+            )
+            resp = self._request(request, RequestTypes.PUT)
+        self._apply_change(request)
+        return resp
 
+    @profiled("change_request_position")
     def change_request_position(
-        self, request_position: int, thing: str = None, thing_uri: str = None
+        self,
+        request_position: int,
+        thing: str = None,
+        thing_uri: str = None,
+        force: bool = False,
+        timeout: float = None,
     ) -> dict | list:
         """Change the position of the thing.
 
@@ -246,19 +823,168 @@ class BruntClient(BaseClient):
             using getThings.
         :param thing_uri: Uri (string) of the thing you are getting the state from,
             not checked against getThings.
-        :return: a dict with the state of the Thing.
+        :param force: always send the change, even when write elision is on.
+        :param timeout: deadline in seconds for the whole call, including login
+            and thing lookup, defaults to the client timeout.
+        :return: a dict with the state of the Thing, with result "skipped" when
+            the write was elided.
         :raises: ValueError if the requested thing does not exists or the position
             is not between 0 and 100.
             NameError if not logged in. SyntaxError when not exactly one of the params
-                is given.
+                is given. TimeoutError when the deadline passed.
         """
+        if not force and self._should_elide(request_position, thing, thing_uri):
+            return {"result": "skipped"}
         return self.change_key(
             key=REQUEST_POSITION_KEY,
             value=request_position,
             thing=thing,
             thing_uri=thing_uri,
+            timeout=timeout,
         )
 
+    def _map(
+        self, call: Callable[..., Any], args: dict[str, Any], max_workers: int
+    ) -> dict[str, Any]:
+        """Run a call for each thing_uri in a thread pool."""
+        if max_workers < 1:
+            raise ValueError("max_workers should be at least 1.")
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="brunt"
+        ) as pool:
+            futures = {uri: pool.submit(call, uri, arg) for uri, arg in args.items()}
+            return {uri: future.result() for uri, future in futures.items()}
+
+    def map_get_state(
+        self,
+        things: list[str],
+        max_workers: int = DEFAULT_MAP_WORKERS,
+        timeout: float = None,
+    ) -> dict[str, Thing]:
+        """Get the state of many things, with a get_state call per thing in threads.
+
+        :param things: the names or thing_uris of the things.
+        :param max_workers: the number of threads, so calls in flight at once.
+        :param timeout: deadline in seconds for each call, defaults to the
+            client timeout.
+        :return: dict with the thing_uri and the Thing.
+        :raises: ValueError if a thing does not exists, the first error of the
+            calls after all calls are done.
+        """
+        self.get_things(timeout=timeout)
+        thing_uris = {self._resolve_thing_uri(t): None for t in things}
+        return self._map(
+            lambda uri, _: self.get_state(thing_uri=uri, timeout=timeout),
+            thing_uris,
+            max_workers,
+        )
+
+    def map_change_request_position(
+        self,
+        positions: dict[str, int],
+        max_workers: int = DEFAULT_MAP_WORKERS,
+        force: bool = False,
+        timeout: float = None,
+    ) -> dict[str, dict | list]:
+        """Move many things, with a change_request_position call per thing in threads.
+
+        :param positions: dict with the names or thing_uris of the things and
+            the position (0-100) they should move to.
+        :param max_workers: the number of threads, so calls in flight at once.
+        :param force: always send the changes, even when write elision is on.
+        :param timeout: deadline in seconds for each call, defaults to the
+            client timeout.
+        :return: dict with the thing_uri and the result of the change call.
+        :raises: ValueError if a thing does not exists or a position is not
+            between 0 and 100, the first error of the calls after all calls
+            are done.
+        """
+        self.get_things(timeout=timeout)
+        targets = {self._resolve_thing_uri(t): int(p) for t, p in positions.items()}
+        for position in targets.values():
+            if position < 0 or position > 100:
+                raise ValueError("Please set the position between 0 and 100.")
+        return self._map(
+            lambda uri, position: self.change_request_position(
+                position, thing_uri=uri, force=force, timeout=timeout
+            ),
+            targets,
+            max_workers,
+        )
+
+    def apply_positions(
+        self,
+        positions: dict[str, int],
+        stagger: float = 0.0,
+        wait_for_arrival: bool = False,
+        arrival_timeout: float = DEFAULT_ARRIVAL_TIMEOUT,
+        poll_interval: float = DEFAULT_ARRIVAL_POLL_INTERVAL,
+    ) -> dict[str, Any]:
+        """Move a set of things, one after the other.
+
+        :param positions: dict with the names or thing_uris of the things and
+            the position (0-100) they should move to.
+        :param stagger: seconds to wait between starting two moves.
+        :param wait_for_arrival: if True, poll the state until every thing
+            reached its position, within ARRIVAL_TOLERANCE.
+        :param arrival_timeout: seconds to wait for all things to arrive.
+        :param poll_interval: seconds between two state polls while waiting.
+        :return: dict with the thing_uri and the result of the change call,
+            or the final Thing when waiting for arrival.
+        :raises: ValueError if a thing does not exists or a position is not
+            between 0 and 100. TimeoutError when the things did not arrive in time.
+        """
+        self.get_things()
+        targets = {self._resolve_thing_uri(t): int(p) for t, p in positions.items()}
+        results: dict[str, Any] = {}
+        for idx, (thing_uri, position) in enumerate(targets.items()):
+            if idx and stagger:
+                time.sleep(stagger)
+            results[thing_uri] = self.change_request_position(
+                position, thing_uri=thing_uri
+            )
+        if not wait_for_arrival:
+            return results
+        deadline = time.monotonic() + arrival_timeout
+        waiting = dict(targets)
+        while waiting:
+            for thing_uri in list(waiting):
+                state = self.get_state(thing_uri=thing_uri)
+                if self._has_arrived(state, waiting[thing_uri]):
+                    results[thing_uri] = state
+                    del waiting[thing_uri]
+            if not waiting:
+                break
+            if time.monotonic() + poll_interval > deadline:
+                raise TimeoutError(f"Things did not arrive in time: {list(waiting)}")
+            time.sleep(poll_interval)
+        return results
+
+    def change_group_position(
+        self, group: str, request_position: int, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Move all things in a group to the same position.
+
+        :param group: the name of the group.
+        :param request_position: The new position for the slides (0-100)
+        :param kwargs: see apply_positions.
+        :return: see apply_positions.
+        """
+        self.get_things()
+        return self.apply_positions(
+            self._prepare_group(group, request_position), **kwargs
+        )
+
+    def apply_scene(self, scene: str, **kwargs: Any) -> dict[str, Any]:
+        """Move all things in a scene to their position.
+
+        :param scene: the name of the scene.
+        :param kwargs: see apply_positions.
+        :return: see apply_positions.
+        """
+        self.get_things()
+        return self.apply_positions(self._prepare_scene(scene), **kwargs)
+
 
 class BruntClientAsync(BaseClient):
     """Class for the Brunt API."""
@@ -268,6 +994,16 @@ class BruntClientAsync(BaseClient):
         username: str = None,
         password: str = None,
         session: ClientSession = None,
+        elide_writes: bool = False,
+        elide_max_age: float = DEFAULT_ELIDE_MAX_AGE,
+        scheduler: PriorityScheduler = None,
+        timeout: float = None,
+        hedge_percentile: float = None,
+        history_size: int = None,
+        outbox: Outbox = None,
+        adaptive_limit: bool = False,
+        http: BruntHttpAsync = None,
+        pipelines: DevicePipelines = None,
     ):
         """Construct for the API wrapper.
 
@@ -278,9 +1014,140 @@ class BruntClientAsync(BaseClient):
         :param username: the username of your Brunt account
         :param password: the password of your Brunt account
         :parm session: aiohttp ClientSession
+        :param elide_writes: skip position changes that match the known target,
+            unless force is used.
+        :param elide_max_age: seconds the cached state is trusted for eliding writes
+        :param scheduler: PriorityScheduler that limits the requests in flight
+            per priority, a default one is created when not supplied.
+        :param timeout: default deadline in seconds for each call, including
+            the login and thing lookup it needs, None uses the session default.
+        :param hedge_percentile: when set (0-1), a get_state request that takes
+            longer than this percentile of the recent latencies gets a second
+            request, the first answer is used.
+        :param history_size: number of states kept per thing, None for no history.
+        :param outbox: Outbox for submitted commands, use a FileOutbox to keep
+            them over restarts, defaults to an in memory Outbox.
+        :param adaptive_limit: limit the requests in flight per host to a limit
+            that follows the latency and errors of the host, off by default.
+        :param http: BruntHttpAsync transport to use instead of a new one, for
+            instance a RecordingHttpAsync or ReplayHttpAsync.
+        :param pipelines: DevicePipelines that run the writes to each thing in
+            order, a default one is created when not supplied.
+        """
+        super().__init__(
+            username, password, elide_writes, elide_max_age, timeout, history_size
+        )
+        self._http = (
+            http
+            if http is not None
+            else BruntHttpAsync(session=session, adaptive_limit=adaptive_limit)
+        )
+        self._scheduler = scheduler if scheduler else PriorityScheduler()
+        self._pipelines = pipelines if pipelines else DevicePipelines()
+        self._hedge_percentile = hedge_percentile
+        self._state_latency = LatencyTracker()
+        self.hedged_requests = 0
+        self._poller: PollScheduler | None = None
+        self._poll_callback: Callable[[dict[str, Thing]], Any] | None = None
+        self._login_lock: asyncio.Lock | None = None
+        self._things_lock: asyncio.Lock | None = None
+        self._outbox = outbox if outbox is not None else Outbox()
+        self._outbox_futures: dict[str, asyncio.Future[dict | list]] = {}
+        self._outbox_task: asyncio.Task[None] | None = None
+        self._outbox_event: asyncio.Event | None = None
+
+    @property
+    def scheduler(self) -> PriorityScheduler:
+        """Return the request scheduler, for its queue metrics."""
+        return self._scheduler
+
+    @property
+    def pipelines(self) -> DevicePipelines:
+        """Return the write pipelines, for their queue depths."""
+        return self._pipelines
+
+    @property
+    def concurrency_limits(self) -> dict[str, int]:
+        """Return the current adaptive limit of the requests in flight per host."""
+        return self._http.limits
+
+    @property
+    def limiter_stats(self) -> dict[str, LimiterStats]:
+        """Return the metrics of the adaptive limiter per host."""
+        return {host: limiter.stats for host, limiter in self._http.limiters.items()}
+
+    async def _async_acquire(self, priority: RequestPriority) -> None:
+        """Wait for a scheduler slot, at most until the current deadline."""
+        timeout = remaining_timeout()
+        with stage("scheduler_wait"):
+            if timeout is None:
+                await self._scheduler.acquire(priority)
+            else:
+                try:
+                    await asyncio.wait_for(self._scheduler.acquire(priority), timeout)
+                except asyncio.TimeoutError as exc:
+                    raise TimeoutError("Deadline exceeded.") from exc
+
+    async def _async_request(
+        self, data: dict, request_type: RequestTypes, priority: RequestPriority
+    ) -> dict | list:
+        """Do a request once the scheduler hands out a slot for its priority.
+
+        Waiting for the slot and the request itself are both bounded by the
+        current deadline.
         """
-        super().__init__(username, password)
-        self._http = BruntHttpAsync(session=session)
+        await self._async_acquire(priority)
+        try:
+            return await self._http.async_request(
+                data, request_type, timeout=remaining_timeout()
+            )
+        finally:
+            self._scheduler.release(priority)
+
+    async def _async_timed_request(
+        self, data: dict, request_type: RequestTypes, priority: RequestPriority
+    ) -> dict | list:
+        """Do a request and record its latency."""
+        start = time.monotonic()
+        resp = await self._async_request(data, request_type, priority)
+        self._state_latency.add(time.monotonic() - start)
+        return resp
+
+    async def _async_hedged_request(
+        self, data: dict, priority: RequestPriority
+    ) -> dict | list:
+        """Do a GET, with a second one when the first is slower than usual."""
+        delay = (
+            self._state_latency.percentile(self._hedge_percentile)
+            if self._hedge_percentile is not None
+            else None
+        )
+        if delay is None:
+            return await self._async_timed_request(data, RequestTypes.GET, priority)
+        first = asyncio.ensure_future(
+            self._async_timed_request(data, RequestTypes.GET, priority)
+        )
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        self.hedged_requests += 1
+        _LOGGER.debug("Hedging GET %s after %.3fs", data["path"], delay)
+        second = asyncio.ensure_future(
+            self._async_timed_request(data, RequestTypes.GET, priority)
+        )
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    if task.exception() is None or not pending:
+                        return task.result()
+        finally:
+            for task in (first, second):
+                task.cancel()
+        raise RuntimeError("Unreachable")  # pragma: no cover
 
     async def __aenter__(self) -> BruntClientAsync:
         """Enter the context manager."""
@@ -297,95 +1164,386 @@ class BruntClientAsync(BaseClient):
 
     async def async_close(self) -> None:
         """Close the session."""
-        await self._http.session.close()
+        await self.async_stop_polling()
+        await self._async_stop_outbox()
+        await self._http.async_close()
+
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the session cookies, to reuse the login in another client.
+
+        :return: list of cookie dicts, for import_session.
+        """
+        return self._http.export_session()
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Load session cookies from export_session, so no new login is needed.
+
+        :param cookies: list of cookie dicts from export_session.
+        """
+        self._http.import_session(cookies)
+
+    @property
+    def poller(self) -> PollScheduler | None:
+        """Return the poll scheduler, for its lag metrics, None when not polling."""
+        return self._poller
+
+    async def async_start_polling(
+        self,
+        interval: float,
+        things: list[str] = None,
+        callback: Callable[[dict[str, Thing]], Any] = None,
+        tick: float = DEFAULT_TICK,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        jitter: float = DEFAULT_JITTER,
+        max_batches: int = DEFAULT_MAX_BATCHES,
+    ) -> PollScheduler:
+        """Poll the state of things in the background.
+
+        All things are polled from one task with a timing wheel, the polls are
+        spread over the interval and the things that are due at the same time
+        are refreshed together in batches with async_refresh_states, at
+        BACKGROUND priority. Call again to add things or change their interval,
+        a callback given then replaces the current one; the settings of the
+        wheel can only be changed after async_stop_polling.
 
-    async def async_login(self, username: str = None, password: str = None) -> bool:
+        :param interval: seconds between two polls of a thing.
+        :param things: the names or thing_uris of the things, None for all.
+        :param callback: called with the dict of fresh Things of each batch.
+        :param tick: seconds per slot of the timing wheel.
+        :param batch_size: maximum number of things refreshed together.
+        :param jitter: fraction of the interval used as random jitter.
+        :param max_batches: maximum number of batches refreshed at once.
+        :return: the PollScheduler, with its lag metrics in stats.
+        :raises: ValueError if a thing does not exists, or when tick,
+            batch_size, jitter or max_batches differ from the running poller.
+        """
+        if self._poller is not None and (
+            self._poller.tick,
+            self._poller.batch_size,
+            self._poller.jitter,
+            self._poller.max_batches,
+        ) != (tick, batch_size, jitter, max_batches):
+            raise ValueError(
+                "Stop polling first to change tick, batch_size, jitter or max_batches."
+            )
+        things_list = await self.async_get_things()
+        thing_uris = (
+            [t.thing_uri for t in things_list if t.thing_uri is not None]
+            if things is None
+            else [self._resolve_thing_uri(t) for t in things]
+        )
+        if callback is not None or self._poller is None:
+            self._poll_callback = callback
+
+        async def _poll(batch: list[str]) -> None:
+            states = await self.async_refresh_states(
+                batch, priority=RequestPriority.BACKGROUND
+            )
+            if self._poll_callback is not None:
+                self._poll_callback(states)
+
+        if self._poller is None:
+            self._poller = PollScheduler(
+                _poll,
+                tick=tick,
+                batch_size=batch_size,
+                jitter=jitter,
+                max_batches=max_batches,
+            )
+        for thing_uri in thing_uris:
+            self._poller.add(thing_uri, interval)
+        self._poller.start()
+        return self._poller
+
+    async def async_stop_polling(self) -> None:
+        """Stop polling the things."""
+        if self._poller is not None:
+            await self._poller.stop()
+            self._poller = None
+
+    @profiled("login")
+    async def async_login(
+        self, username: str = None, password: str = None, timeout: float = None
+    ) -> bool:
         """Login method using username and password.
 
         :param username: the username of your Brunt account
         :param password: the password of your Brunt account
+        :param timeout: deadline in seconds, defaults to the client timeout.
         :return: True if successfull
-        :raises: errors from Requests call
+        :raises: errors from Requests call, TimeoutError when the deadline passed.
         """
-        await self._http.async_request(
-            self._prepare_login(username, password), RequestTypes.POST
-        )
+        with deadline_scope(self._call_timeout(timeout)):
+            await self._async_request(
+                self._prepare_login(username, password),
+                RequestTypes.POST,
+                RequestPriority.INTERACTIVE_WRITE,
+            )
         self._last_login = datetime.utcnow()
         return True
 
-    async def async_get_things(self, force: bool = False) -> list[Thing]:
+    @staticmethod
+    @asynccontextmanager
+    async def _async_hold(lock: asyncio.Lock) -> AsyncIterator[None]:
+        """Hold a lock, waiting at most the remaining time of the current deadline."""
+        timeout = remaining_timeout()
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout)
+        except asyncio.TimeoutError as exc:
+            raise TimeoutError("Deadline passed waiting for another call") from exc
+        try:
+            yield
+        finally:
+            lock.release()
+
+    async def _async_ensure_login(self, timeout: float = None) -> None:
+        """Login when there is no valid session, concurrent calls share one login."""
+        if self._http.is_logged_in:
+            return
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        with deadline_scope(timeout):
+            async with self._async_hold(self._login_lock):
+                if not self._http.is_logged_in:
+                    await self.async_login()
+
+    @profiled("get_things")
+    async def async_get_things(
+        self,
+        force: bool = False,
+        priority: RequestPriority = RequestPriority.INTERACTIVE_READ,
+        timeout: float = None,
+    ) -> list[Thing]:
         """Get the things registered in your account.
 
         :param force: force a refresh from the server, otherwise get from variable.
+        :param priority: the priority of the request, use BACKGROUND for polling.
+        :param timeout: deadline in seconds, defaults to the client timeout.
         :return: list with things registered in the logged in account and API call status
         """
         if not self._things or force:
-            return await self._async_get_things()
-        return self._things
+            if self._things_lock is None:
+                self._things_lock = asyncio.Lock()
+            with deadline_scope(self._call_timeout(timeout)):
+                # concurrent calls with a cold registry share one list request.
+                async with self._async_hold(self._things_lock):
+                    if not self._things or force:
+                        return await self._async_get_things(priority)
+        return self._things  # type: ignore
 
-    async def _async_get_things(self) -> list[Thing]:
+    async def async_refresh_things(
+        self,
+        priority: RequestPriority = RequestPriority.INTERACTIVE_READ,
+        timeout: float = None,
+    ) -> RegistryDiff:
+        """Refresh the things and return what changed.
+
+        Only the things whose record changed are rebuilt, the other Thing
+        objects are kept as they are.
+
+        :param priority: the priority of the request, use BACKGROUND for polling.
+        :param timeout: deadline in seconds, defaults to the client timeout.
+        :return: RegistryDiff with the added, removed and changed things.
+        """
+        await self.async_get_things(force=True, priority=priority, timeout=timeout)
+        return self._last_registry_diff or RegistryDiff()
+
+    async def _async_get_things(
+        self, priority: RequestPriority = RequestPriority.INTERACTIVE_READ
+    ) -> list[Thing]:
         """Get the things.
 
         Check if there are things in memory, otherwise first do the getThings call and
         then return _things.
         """
-        if not self._http.is_logged_in:
-            await self.async_login()
-        resp = await self._http.async_request(MAIN_THINGS_PATH, RequestTypes.GET)
+        await self._async_ensure_login()
+        resp = await self._async_request(MAIN_THINGS_PATH, RequestTypes.GET, priority)
         if isinstance(resp, list):
-            self._things = [Thing.create_from_dict(r) for r in resp]
-            return self._things
+            self._update_registry(resp)
+            return self._things  # type: ignore
         return []
 
-    async def async_get_state(self, thing: str = None, thing_uri: str = None) -> Thing:
+    async def async_iter_things(
+        self,
+        priority: RequestPriority = RequestPriority.INTERACTIVE_READ,
+        timeout: float = None,
+    ) -> AsyncGenerator[Thing, None]:
+        """Get the things registered in your account, one by one.
+
+        The response is parsed while it streams in, each Thing is yielded and
+        added to the registry as soon as its record is complete. Things that
+        are no longer in the account are removed once the stream is done.
+        The request holds a scheduler slot until the iterator is done, so
+        consume it right away and do not keep it open between things.
+
+        :param priority: the priority of the request, use BACKGROUND for polling.
+        :param timeout: deadline in seconds, defaults to the client timeout.
+        :return: async iterator of Things
+        :raises: errors from aiohttp, ValueError for an invalid response,
+            TimeoutError when the deadline passed waiting for a slot.
+        """
+        timeout = self._call_timeout(timeout)
+        deadline = Deadline(timeout) if timeout is not None else None
+        await self._async_ensure_login(deadline.remaining() if deadline else None)
+        seen: set[str] = set()
+        diff = RegistryDiff()
+        with deadline_scope(deadline.remaining() if deadline else None):
+            await self._async_acquire(priority)
+        try:
+            async for record in self._http.async_iter_request(
+                MAIN_THINGS_PATH,
+                RequestTypes.GET,
+                timeout=deadline.remaining() if deadline else None,
+            ):
+                thing = self._registry_apply(record, seen, diff)
+                if thing is not None:
+                    yield thing
+        finally:
+            self._scheduler.release(priority)
+        self._registry_finish(seen, diff)
+
+    @profiled("refresh_states")
+    async def async_refresh_states(
+        self,
+        things: list[str] = None,
+        list_threshold: int = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE_READ,
+        timeout: float = None,
+    ) -> dict[str, Thing]:
+        """Refresh the state of many things at once.
+
+        The thing list already contains the state of each thing, so when
+        enough things are needed the states come from one thing list call,
+        otherwise from concurrent get_state calls.
+
+        :param things: the names or thing_uris of the things, None for all.
+        :param list_threshold: the number of things from which the thing list
+            is used, defaults to 10% of the registry with a minimum of 2.
+        :param priority: the priority of the requests, use BACKGROUND for polling.
+        :param timeout: deadline in seconds, defaults to the client timeout.
+        :return: dict with the thing_uri and the fresh Thing.
+        :raises: ValueError if a requested thing does not exists.
+        """
+        with deadline_scope(self._call_timeout(timeout)):
+            fetched = not self._things
+            await self.async_get_things(priority=priority)
+            thing_uris = (
+                None if things is None else [self._resolve_thing_uri(t) for t in things]
+            )
+            if thing_uris is None or self._use_list_refresh(
+                thing_uris, list_threshold
+            ):
+                fresh = {
+                    t.thing_uri: t
+                    for t in await self.async_get_things(
+                        force=not fetched, priority=priority
+                    )
+                    if t.thing_uri is not None
+                }
+                if thing_uris is None:
+                    return fresh
+                return {uri: fresh[uri] for uri in thing_uris if uri in fresh}
+            states = await asyncio.gather(
+                *(
+                    self.async_get_state(thing_uri=uri, priority=priority)
+                    for uri in thing_uris
+                )
+            )
+            return dict(zip(thing_uris, states))
+
+    @profiled("get_state")
+    async def async_get_state(
+        self,
+        thing: str = None,
+        thing_uri: str = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE_READ,
+        timeout: float = None,
+    ) -> Thing:
         """Get the state of a thing.
 
         :param thing: a string with the name of the thing, which is then checked
             using getThings.
         :param thing_uri: Uri (string) of the thing you are getting the state from,
             not checked against getThings.
+        :param priority: the priority of the request, use BACKGROUND for polling.
+        :param timeout: deadline in seconds for the whole call, including login
+            and thing lookup, defaults to the client timeout.
         :return: a dict with the state of the Thing.
         :raises: ValueError if the requested thing does not exists.
             NameError if not logged in. SyntaxError when
             not exactly one of the params is given.
+            TimeoutError when the deadline passed.
         """
-        if not self._http.is_logged_in:
-            await self.async_login()
-        await self.async_get_things()
-        resp = await self._http.async_request(
-            self._prepare_state(thing=thing, thing_uri=thing_uri), RequestTypes.GET
-        )
-        return Thing.create_from_dict(resp)  # type: ignore
+        with deadline_scope(self._call_timeout(timeout)):
+            await self._async_ensure_login()
+            await self.async_get_things(priority=priority)
+            resp = await self._async_hedged_request(
+                self._prepare_state(thing=thing, thing_uri=thing_uri), priority
+            )
+        return self._observe_thing(Thing.create_from_dict(resp))  # type: ignore
 
+    @profiled("change_key")
     async def async_change_key(
-        self, key: str, value: Any, thing: str = None, thing_uri: str = None
+        self,
+        key: str,
+        value: Any,
+        thing: str = None,
+        thing_uri: str = None,
+        timeout: float = None,
     ) -> dict | list:
         """Change a variable of the thing.  Mostly included for future additions.
 
+        Changes to one thing are sent in the order of the calls, changes to
+        different things in parallel, see DevicePipelines.
+
         :param key: The value you want to change
         :param value: The new value
         :param thing: a string with the name of the thing, which is then checked
             using getThings.
         :param thing_uri: Uri (string) of the thing you are getting the state from,
             not checked against getThings.
-        :return: a dict with the state of the Thing.
+        :param timeout: deadline in seconds for the whole call, including login
+            and thing lookup, defaults to the client timeout.
+        :return: a dict with the state of the Thing, with result "superseded"
+            when the pipelines supersede and a later position change replaced
+            it before it was sent.
         :raises: ValueError if the requested thing does not exists or the position is
             not between 0 and 100.
             NameError if not logged in. SyntaxError when not exactly one of
-                the params is given.
+                the params is given. TimeoutError when the deadline passed.
+                RuntimeError when the pipeline of the thing is full.
         """
-        if not self._http.is_logged_in:
-            await self.async_login()
-        await self.async_get_things()
-        return await self._http.async_request(
-            self._prepare_change_key(
+        with deadline_scope(self._call_timeout(timeout)):
+            if thing_uri is None and not self._things:
+                # the name is looked up first, the loads are single-flight so
+                # the calls come out of them in the order they went in.
+                await self._async_ensure_login()
+                await self.async_get_things()
+            request = self._prepare_change_key(
                 key=key, value=value, thing=thing, thing_uri=thing_uri
-            ),
-            RequestTypes.PUT,
-        )
+            )
+            # take the place in the pipeline before awaiting anything else.
+            write = self._pipelines.reserve(request["path"], key)
+
+            async def _send() -> dict | list:
+                await self._async_ensure_login()
+                await self.async_get_things()
+                resp = await self._async_request(
+                    request, RequestTypes.PUT, RequestPriority.INTERACTIVE_WRITE
+                )
+                self._apply_change(request)
+                return resp
 
+            return await self._pipelines.run(write, _send)
+
+    @profiled("change_request_position")
     async def async_change_request_position(
-        self, request_position: int, thing: str = None, thing_uri: str = None
+        self,
+        request_position: int,
+        thing: str = None,
+        thing_uri: str = None,
+        force: bool = False,
+        timeout: float = None,
     ) -> dict | list:
         """Change the position of the thing.
 
@@ -394,15 +1552,277 @@ class BruntClientAsync(BaseClient):
             using getThings.
         :param thing_uri: Uri (string) of the thing you are getting the state from,
             not checked against getThings.
-        :return: a dict with the state of the Thing.
+        :param force: always send the change, even when write elision is on.
+        :param timeout: deadline in seconds for the whole call, including login
+            and thing lookup, defaults to the client timeout.
+        :return: a dict with the state of the Thing, with result "skipped" when
+            the write was elided, or "superseded" when the pipelines supersede
+            and a later position change replaced it before it was sent.
         :raises: ValueError if the requested thing does not exists or the position
             is not between 0 and 100.
             NameError if not logged in. SyntaxError when not exactly one of the
-                params is given.
+                params is given. TimeoutError when the deadline passed.
+                RuntimeError when the pipeline of the thing is full.
         """
+        if not force and self._should_elide(request_position, thing, thing_uri):
+            return {"result": "skipped"}
         return await self.async_change_key(
             key=REQUEST_POSITION_KEY,
             value=request_position,
             thing=thing,
             thing_uri=thing_uri,
+            timeout=timeout,
+        )
+
+    @property
+    def outbox(self) -> Outbox:
+        """Return the outbox with the submitted commands that are not done yet."""
+        return self._outbox
+
+    def submit_change_key(
+        self, key: str, value: Any, thing: str = None, thing_uri: str = None
+    ) -> asyncio.Future[dict | list]:
+        """Put a change in the outbox and return at once.
+
+        The outbox is sent in the background, in batches, with the changes
+        for each thing in submit order. Failed sends because of connection
+        problems are retried.
+
+        :param key: The value you want to change
+        :param value: The new value
+        :param thing: a string with the name of the thing, the things must
+            be loaded already.
+        :param thing_uri: Uri (string) of the thing.
+        :return: a Future with the result of the change call.
+        :raises: ValueError if the requested thing does not exists or the position
+            is not between 0 and 100.
+            SyntaxError when not exactly one of the params is given.
+        """
+        if thing is None and thing_uri is None:
+            raise SyntaxError(
+                "Please provide either the 'thing' name or the 'thing_uri',\
+                     the thing_uri is used first when given."
+            )
+        if thing_uri is None and thing is not None:
+            thing_uri = self._get_thing_uri_from_thing(thing)
+        if key == REQUEST_POSITION_KEY and not 0 <= int(value) <= 100:
+            raise ValueError("Please set the position between 0 and 100.")
+        entry = OutboxEntry(thing_uri, key, value)  # type: ignore
+        self._outbox.add(entry)
+        future = self._outbox_future(entry.entry_id)
+        self._start_outbox()
+        return future
+
+    def submit_change_request_position(
+        self, request_position: int, thing: str = None, thing_uri: str = None
+    ) -> asyncio.Future[dict | list]:
+        """Put a position change in the outbox and return at once.
+
+        :param request_position: The new position for the slide (0-100)
+        :param thing: a string with the name of the thing, the things must
+            be loaded already.
+        :param thing_uri: Uri (string) of the thing.
+        :return: a Future with the result of the change call.
+        :raises: ValueError if the requested thing does not exists or the position
+            is not between 0 and 100.
+            SyntaxError when not exactly one of the params is given.
+        """
+        return self.submit_change_key(
+            REQUEST_POSITION_KEY, request_position, thing=thing, thing_uri=thing_uri
         )
+
+    async def async_start_outbox(self) -> list[asyncio.Future[dict | list]]:
+        """Start sending the outbox, for instance the commands left by a restart.
+
+        :return: the Futures of all commands in the outbox.
+        """
+        futures = [self._outbox_future(e.entry_id) for e in self._outbox.pending()]
+        self._start_outbox()
+        return futures
+
+    async def async_flush_outbox(self) -> None:
+        """Wait until all commands submitted so far are done."""
+        futures = [self._outbox_future(e.entry_id) for e in self._outbox.pending()]
+        self._start_outbox()
+        await asyncio.gather(*futures, return_exceptions=True)
+
+    def _outbox_future(self, entry_id: str) -> asyncio.Future[dict | list]:
+        """Return the Future of a command in the outbox."""
+        if entry_id not in self._outbox_futures:
+            future = asyncio.get_running_loop().create_future()
+            self._outbox_futures[entry_id] = future
+        return self._outbox_futures[entry_id]
+
+    def _start_outbox(self) -> None:
+        """Start the background task that sends the outbox, and wake it."""
+        if self._outbox_event is None:
+            self._outbox_event = asyncio.Event()
+        if self._outbox_task is None or self._outbox_task.done():
+            self._outbox_task = asyncio.ensure_future(self._async_run_outbox())
+        self._outbox_event.set()
+
+    async def _async_stop_outbox(self) -> None:
+        """Stop sending the outbox, the unfinished commands stay in it.
+
+        The Futures of the unfinished commands are cancelled, a FileOutbox
+        still has the commands for async_start_outbox after a restart.
+        """
+        if self._outbox_task is not None:
+            self._outbox_task.cancel()
+            try:
+                await self._outbox_task
+            except asyncio.CancelledError:
+                pass
+            self._outbox_task = None
+        for future in self._outbox_futures.values():
+            future.cancel()
+        self._outbox_futures.clear()
+        self._outbox.close()
+
+    async def _async_run_outbox(self) -> None:
+        """Send the outbox in batches, in order per thing."""
+        assert self._outbox_event is not None
+        while True:
+            await self._outbox_event.wait()
+            self._outbox_event.clear()
+            while len(self._outbox):
+                batch = self._outbox.pending(OUTBOX_BATCH_SIZE)
+                per_thing: dict[str, list[OutboxEntry]] = {}
+                for entry in batch:
+                    per_thing.setdefault(entry.thing_uri, []).append(entry)
+                await asyncio.gather(
+                    *(self._async_send_outbox(e) for e in per_thing.values())
+                )
+
+    async def _async_send_outbox(self, entries: list[OutboxEntry]) -> None:
+        """Send the commands for one thing, one after the other."""
+        for entry in entries:
+            future = self._outbox_future(entry.entry_id)
+            while True:
+                entry.attempts += 1
+                try:
+                    result = await self.async_change_key(
+                        entry.key, entry.value, thing_uri=entry.thing_uri
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:  # pylint: disable=broad-except
+                    transient = isinstance(
+                        exc, (ClientError, asyncio.TimeoutError, TimeoutError)
+                    ) and not (
+                        isinstance(exc, ClientResponseError) and exc.status < 500
+                    )
+                    if transient and entry.attempts < OUTBOX_MAX_ATTEMPTS:
+                        _LOGGER.debug("Retrying %s after: %s", entry.entry_id, exc)
+                        await asyncio.sleep(OUTBOX_RETRY_DELAY * entry.attempts)
+                        continue
+                    self._outbox.complete(entry.entry_id)
+                    del self._outbox_futures[entry.entry_id]
+                    if not future.done():
+                        future.set_exception(exc)
+                    break
+                self._outbox.complete(entry.entry_id)
+                del self._outbox_futures[entry.entry_id]
+                if not future.done():
+                    future.set_result(result)
+                break
+
+    async def async_apply_positions(
+        self,
+        positions: dict[str, int],
+        max_concurrency: int = DEFAULT_GROUP_CONCURRENCY,
+        stagger: float = 0.0,
+        wait_for_arrival: bool = False,
+        arrival_timeout: float = DEFAULT_ARRIVAL_TIMEOUT,
+        poll_interval: float = DEFAULT_ARRIVAL_POLL_INTERVAL,
+    ) -> dict[str, Any]:
+        """Move a set of things concurrently.
+
+        :param positions: dict with the names or thing_uris of the things and
+            the position (0-100) they should move to.
+        :param max_concurrency: the maximum number of moves in flight at once.
+        :param stagger: seconds between starting two moves, spreads the load
+            on the motors and the API.
+        :param wait_for_arrival: if True, poll the state until every thing
+            reached its position, within ARRIVAL_TOLERANCE.
+        :param arrival_timeout: seconds to wait for all things to arrive.
+        :param poll_interval: seconds between two state polls while waiting.
+        :return: dict with the thing_uri and the result of the change call,
+            or the final Thing when waiting for arrival.
+        :raises: ValueError if a thing does not exists or a position is not
+            between 0 and 100. TimeoutError when the things did not arrive in time.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency should be at least 1.")
+        await self.async_get_things()
+        targets = {self._resolve_thing_uri(t): int(p) for t, p in positions.items()}
+        semaphore = asyncio.Semaphore(max_concurrency)
+        arrived: set[str] = set()
+
+        async def _move(idx: int, thing_uri: str, position: int) -> Any:
+            if stagger:
+                await asyncio.sleep(idx * stagger)
+            result: Any
+            async with semaphore:
+                result = await self.async_change_request_position(
+                    position, thing_uri=thing_uri
+                )
+            if wait_for_arrival:
+                result = await self._async_wait_for_arrival(
+                    thing_uri, position, poll_interval
+                )
+            arrived.add(thing_uri)
+            return result
+
+        tasks = [
+            asyncio.ensure_future(_move(idx, thing_uri, position))
+            for idx, (thing_uri, position) in enumerate(targets.items())
+        ]
+        try:
+            done = await asyncio.wait_for(
+                asyncio.gather(*tasks),
+                timeout=arrival_timeout if wait_for_arrival else None,
+            )
+        except asyncio.TimeoutError as exc:
+            # the tasks are cancelled by now, so use the things that arrived.
+            waiting = [uri for uri in targets if uri not in arrived]
+            raise TimeoutError(f"Things did not arrive in time: {waiting}") from exc
+        finally:
+            for task in tasks:
+                task.cancel()
+        return dict(zip(targets, done))
+
+    async def _async_wait_for_arrival(
+        self, thing_uri: str, position: int, poll_interval: float
+    ) -> Thing:
+        """Poll the state of a thing until it reached the position."""
+        while True:
+            state = await self.async_get_state(thing_uri=thing_uri)
+            if self._has_arrived(state, position):
+                return state
+            await asyncio.sleep(poll_interval)
+
+    async def async_change_group_position(
+        self, group: str, request_position: int, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Move all things in a group to the same position.
+
+        :param group: the name of the group.
+        :param request_position: The new position for the slides (0-100)
+        :param kwargs: see async_apply_positions.
+        :return: see async_apply_positions.
+        """
+        await self.async_get_things()
+        return await self.async_apply_positions(
+            self._prepare_group(group, request_position), **kwargs
+        )
+
+    async def async_apply_scene(self, scene: str, **kwargs: Any) -> dict[str, Any]:
+        """Move all things in a scene to their position.
+
+        :param scene: the name of the scene.
+        :param kwargs: see async_apply_positions.
+        :return: see async_apply_positions.
+        """
+        await self.async_get_things()
+        return await self.async_apply_positions(self._prepare_scene(scene), **kwargs)
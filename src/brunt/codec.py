@@ -0,0 +1,74 @@
+"""JSON codecs for the Brunt requests and responses."""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JsonCodec:
+    """Class for a JSON codec, based on the json module of the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object to JSON bytes."""
+        return json.dumps(obj).encode()
+
+    def loads(self, data: bytes) -> Any:
+        """Decode JSON bytes.
+
+        :raises: ValueError for invalid JSON.
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Class for a JSON codec based on orjson."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        """Initialize the codec.
+
+        :raises: ImportError when orjson is not installed.
+        """
+        if orjson is None:
+            raise ImportError("Install orjson to use the orjson codec.")
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object to JSON bytes."""
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        """Decode JSON bytes.
+
+        :raises: ValueError for invalid JSON.
+        """
+        return orjson.loads(data)
+
+
+_default_codec: JsonCodec = OrjsonCodec() if orjson is not None else JsonCodec()
+
+
+def get_default_codec() -> JsonCodec:
+    """Return the codec used by new http objects, orjson when it is installed."""
+    return _default_codec
+
+
+def set_default_codec(codec: JsonCodec) -> None:
+    """Set the codec used by new http objects.
+
+    :param codec: the codec, for instance JsonCodec() to always use the
+        standard library.
+    """
+    global _default_codec  # pylint: disable=global-statement
+    _LOGGER.debug("Using the %s codec", codec.name)
+    _default_codec = codec
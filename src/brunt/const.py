@@ -6,3 +6,16 @@ THINGS_HOST = "https://thing.brunt.co:8080"
 REQUEST_POSITION_KEY = "requestPosition"
 DT_FORMAT_STRING = r"%a, %d-%b-%Y %H:%M:%S %Z"
 COOKIE_DOMAIN = "brunt.co"
+DEFAULT_GROUP_CONCURRENCY = 4
+DEFAULT_ARRIVAL_TIMEOUT = 120.0
+DEFAULT_ARRIVAL_POLL_INTERVAL = 2.0
+ARRIVAL_TOLERANCE = 1
+DEFAULT_ELIDE_MAX_AGE = 30.0
+PENDING_MAX_AGE = 10.0
+FLEET_REFRESH_MIN_THINGS = 2
+FLEET_REFRESH_RATIO = 0.1
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 1.0
+DEFAULT_POOL_SIZE = 16
+DEFAULT_MAP_WORKERS = 8
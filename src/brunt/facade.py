@@ -0,0 +1,460 @@
+"""Blocking Brunt client that runs the async client on a background event loop."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from types import TracebackType
+from typing import Any, Awaitable, Iterator, Type, TypeVar
+
+from .client import BruntClientAsync
+from .const import (
+    DEFAULT_ARRIVAL_POLL_INTERVAL,
+    DEFAULT_ARRIVAL_TIMEOUT,
+    DEFAULT_ELIDE_MAX_AGE,
+    DEFAULT_GROUP_CONCURRENCY,
+    DEFAULT_MAP_WORKERS,
+)
+from .history import ThingHistory
+from .http import BruntHttpAsync
+from .outbox import Outbox
+from .pipeline import DevicePipelines
+from .scheduler import PriorityScheduler
+from .thing import RegistryDiff, Thing
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class BruntClientLoop:
+    """Class for the Brunt API, blocking calls backed by a BruntClientAsync.
+
+    The async client runs on an event loop in a dedicated thread, so calls
+    from many threads, and the batch calls, share its connections, scheduler
+    and concurrency.
+    """
+
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        elide_writes: bool = False,
+        elide_max_age: float = DEFAULT_ELIDE_MAX_AGE,
+        scheduler: PriorityScheduler = None,
+        timeout: float = None,
+        hedge_percentile: float = None,
+        history_size: int = None,
+        outbox: Outbox = None,
+        adaptive_limit: bool = False,
+        pipelines: DevicePipelines = None,
+        http: BruntHttpAsync = None,
+    ):
+        """Construct for the API wrapper and start the event loop thread.
+
+        If you supply username and password here, they are stored, but not used.
+        Auto logging in then does work when calling another method,
+            no explicit login needed.
+
+        :param username: the username of your Brunt account
+        :param password: the password of your Brunt account
+        :param elide_writes: skip position changes that match the known target,
+            unless force is used.
+        :param elide_max_age: seconds the cached state is trusted for eliding writes
+        :param scheduler: PriorityScheduler for the requests of this client.
+        :param timeout: default deadline in seconds for each call, including
+            the login and thing lookup it needs, None waits forever.
+        :param hedge_percentile: latency percentile (0-1) after which a
+            get_state request is sent a second time, None to disable hedging.
+        :param history_size: number of states kept per thing, None for no history.
+        :param outbox: Outbox for submitted commands, defaults to an in memory
+            Outbox.
+        :param adaptive_limit: limit the requests in flight per host to a limit
+            that follows the latency and errors of the host, off by default.
+        :param pipelines: DevicePipelines that run the writes to each thing in
+            order.
+        :param http: BruntHttpAsync transport to use instead of a new one, for
+            instance a RecordingHttpAsync or ReplayHttpAsync; it is used on the
+            event loop thread.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="brunt-loop", daemon=True
+        )
+        self._thread.start()
+
+        async def _create() -> BruntClientAsync:
+            # the aiohttp session has to be created on the loop that uses it.
+            return BruntClientAsync(
+                username,
+                password,
+                elide_writes=elide_writes,
+                elide_max_age=elide_max_age,
+                scheduler=scheduler,
+                timeout=timeout,
+                hedge_percentile=hedge_percentile,
+                history_size=history_size,
+                outbox=outbox,
+                adaptive_limit=adaptive_limit,
+                http=http,
+                pipelines=pipelines,
+            )
+
+        try:
+            self._client = self._run(_create())
+        except BaseException:
+            self._stop_loop()
+            raise
+
+    def __enter__(self) -> BruntClientLoop:
+        """Enter the context manager."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the context manager."""
+        self.close()
+
+    def _run(self, awaitable: Awaitable[_T]) -> _T:
+        """Run an awaitable on the event loop and wait for the result."""
+        if not self._thread.is_alive() or threading.current_thread() is self._thread:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            if not self._thread.is_alive():
+                raise RuntimeError("The client is closed.")
+            raise RuntimeError("Blocking calls can not be made from the event loop.")
+
+        async def _await() -> _T:
+            return await awaitable
+
+        return asyncio.run_coroutine_threadsafe(_await(), self._loop).result()
+
+    @property
+    def client(self) -> BruntClientAsync:
+        """Return the async client, only use it on the event loop."""
+        return self._client
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the event loop the async client runs on."""
+        return self._loop
+
+    def close(self) -> None:
+        """Close the session and stop the event loop thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._run(self._client.async_close())
+        finally:
+            self._stop_loop()
+
+    def _stop_loop(self) -> None:
+        """Stop the event loop thread and close the loop."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the session cookies, to reuse the login in another client.
+
+        :return: list of cookie dicts, for import_session.
+        """
+        return self._client.export_session()
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Load session cookies from export_session, so no new login is needed.
+
+        :param cookies: list of cookie dicts from export_session.
+        """
+
+        async def _import() -> None:
+            self._client.import_session(cookies)
+
+        self._run(_import())
+
+    def login(
+        self, username: str = None, password: str = None, timeout: float = None
+    ) -> bool:
+        """Login method using username and password, see BruntClient.login."""
+        return self._run(self._client.async_login(username, password, timeout))
+
+    def get_things(self, force: bool = False, timeout: float = None) -> list[Thing]:
+        """Get all the things, see BruntClient.get_things."""
+        return self._run(self._client.async_get_things(force=force, timeout=timeout))
+
+    def refresh_things(self, timeout: float = None) -> RegistryDiff:
+        """Refresh the things and return what changed, see BruntClient."""
+        return self._run(self._client.async_refresh_things(timeout=timeout))
+
+    def iter_things(self, timeout: float = None) -> Iterator[Thing]:
+        """Get the things one by one while they stream in, see BruntClient."""
+        things = self._client.async_iter_things(timeout=timeout)
+        try:
+            while True:
+                try:
+                    yield self._run(things.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            if self._thread.is_alive():
+                self._run(things.aclose())
+
+    def refresh_states(
+        self,
+        things: list[str] = None,
+        list_threshold: int = None,
+        timeout: float = None,
+    ) -> dict[str, Thing]:
+        """Refresh the state of many things at once, see BruntClient."""
+        return self._run(
+            self._client.async_refresh_states(
+                things, list_threshold=list_threshold, timeout=timeout
+            )
+        )
+
+    def get_state(
+        self, thing: str = None, thing_uri: str = None, timeout: float = None
+    ) -> Thing:
+        """Get the state of a thing, see BruntClient.get_state."""
+        return self._run(
+            self._client.async_get_state(
+                thing=thing, thing_uri=thing_uri, timeout=timeout
+            )
+        )
+
+    def change_key(
+        self,
+        key: str,
+        value: Any,
+        thing: str = None,
+        thing_uri: str = None,
+        timeout: float = None,
+    ) -> dict | list:
+        """Change a variable of the thing, see BruntClient.change_key."""
+        return self._run(
+            self._client.async_change_key(
+                key, value, thing=thing, thing_uri=thing_uri, timeout=timeout
+            )
+        )
+
+    def change_request_position(
+        self,
+        request_position: int,
+        thing: str = None,
+        thing_uri: str = None,
+        force: bool = False,
+        timeout: float = None,
+    ) -> dict | list:
+        """Change the position of the thing, see BruntClient."""
+        return self._run(
+            self._client.async_change_request_position(
+                request_position,
+                thing=thing,
+                thing_uri=thing_uri,
+                force=force,
+                timeout=timeout,
+            )
+        )
+
+    def map_get_state(
+        self,
+        things: list[str],
+        max_workers: int = DEFAULT_MAP_WORKERS,
+        timeout: float = None,
+    ) -> dict[str, Thing]:
+        """Get the state of many things, with concurrent get_state calls.
+
+        :param things: the names or thing_uris of the things.
+        :param max_workers: the number of calls in flight at once.
+        :param timeout: deadline in seconds for each call, defaults to the
+            client timeout.
+        :return: dict with the thing_uri and the Thing.
+        :raises: ValueError if a thing does not exists, the first error of the
+            calls after all calls are done.
+        """
+        return self._run(self._map_get_state(things, max_workers, timeout))
+
+    async def _map_get_state(
+        self, things: list[str], max_workers: int, timeout: float | None
+    ) -> dict[str, Thing]:
+        """Get the state of many things on the event loop."""
+        if max_workers < 1:
+            raise ValueError("max_workers should be at least 1.")
+        await self._client.async_get_things(timeout=timeout)
+        resolve = self._client._resolve_thing_uri  # pylint: disable=protected-access
+        thing_uris = list(dict.fromkeys(resolve(t) for t in things))
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _get(thing_uri: str) -> Thing:
+            async with semaphore:
+                return await self._client.async_get_state(
+                    thing_uri=thing_uri, timeout=timeout
+                )
+
+        states = await asyncio.gather(*(_get(uri) for uri in thing_uris))
+        return dict(zip(thing_uris, states))
+
+    def map_change_request_position(
+        self,
+        positions: dict[str, int],
+        max_workers: int = DEFAULT_MAP_WORKERS,
+        force: bool = False,
+        timeout: float = None,
+    ) -> dict[str, dict | list]:
+        """Move many things, with concurrent change_request_position calls.
+
+        :param positions: dict with the names or thing_uris of the things and
+            the position (0-100) they should move to.
+        :param max_workers: the number of calls in flight at once.
+        :param force: always send the changes, even when write elision is on.
+        :param timeout: deadline in seconds for each call, defaults to the
+            client timeout.
+        :return: dict with the thing_uri and the result of the change call.
+        :raises: ValueError if a thing does not exists or a position is not
+            between 0 and 100, the first error of the calls after all calls
+            are done.
+        """
+        return self._run(
+            self._map_change_request_position(positions, max_workers, force, timeout)
+        )
+
+    async def _map_change_request_position(
+        self,
+        positions: dict[str, int],
+        max_workers: int,
+        force: bool,
+        timeout: float | None,
+    ) -> dict[str, dict | list]:
+        """Move many things on the event loop."""
+        if max_workers < 1:
+            raise ValueError("max_workers should be at least 1.")
+        await self._client.async_get_things(timeout=timeout)
+        resolve = self._client._resolve_thing_uri  # pylint: disable=protected-access
+        targets = {resolve(t): int(p) for t, p in positions.items()}
+        for position in targets.values():
+            if position < 0 or position > 100:
+                raise ValueError("Please set the position between 0 and 100.")
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _move(thing_uri: str, position: int) -> dict | list:
+            async with semaphore:
+                return await self._client.async_change_request_position(
+                    position, thing_uri=thing_uri, force=force, timeout=timeout
+                )
+
+        results = await asyncio.gather(*(_move(u, p) for u, p in targets.items()))
+        return dict(zip(targets, results))
+
+    def apply_positions(
+        self,
+        positions: dict[str, int],
+        max_concurrency: int = DEFAULT_GROUP_CONCURRENCY,
+        stagger: float = 0.0,
+        wait_for_arrival: bool = False,
+        arrival_timeout: float = DEFAULT_ARRIVAL_TIMEOUT,
+        poll_interval: float = DEFAULT_ARRIVAL_POLL_INTERVAL,
+    ) -> dict[str, Any]:
+        """Move a set of things concurrently, see BruntClientAsync."""
+        return self._run(
+            self._client.async_apply_positions(
+                positions,
+                max_concurrency=max_concurrency,
+                stagger=stagger,
+                wait_for_arrival=wait_for_arrival,
+                arrival_timeout=arrival_timeout,
+                poll_interval=poll_interval,
+            )
+        )
+
+    def change_group_position(
+        self, group: str, request_position: int, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Move all things in a group to the same position, see apply_positions."""
+        return self._run(
+            self._client.async_change_group_position(group, request_position, **kwargs)
+        )
+
+    def apply_scene(self, scene: str, **kwargs: Any) -> dict[str, Any]:
+        """Move all things in a scene to their position, see apply_positions."""
+        return self._run(self._client.async_apply_scene(scene, **kwargs))
+
+    def submit_change_request_position(
+        self, request_position: int, thing: str = None, thing_uri: str = None
+    ) -> Future[dict | list]:
+        """Put a position change in the outbox, see BruntClientAsync.
+
+        :return: a concurrent.futures Future with the result of the change call.
+        :raises: ValueError if the requested thing does not exists or the position
+            is not between 0 and 100.
+            SyntaxError when not exactly one of the params is given.
+        """
+
+        async def _submit() -> asyncio.Future[dict | list]:
+            return self._client.submit_change_request_position(
+                request_position, thing=thing, thing_uri=thing_uri
+            )
+
+        future = self._run(_submit())
+
+        async def _wait() -> dict | list:
+            return await future
+
+        return asyncio.run_coroutine_threadsafe(_wait(), self._loop)
+
+    def flush_outbox(self) -> None:
+        """Wait until all commands submitted so far are done."""
+        self._run(self._client.async_flush_outbox())
+
+    def get_cached_thing(self, thing: str = None, thing_uri: str = None) -> Thing:
+        """Get the cached state of a thing, without calling the API."""
+        return self._client.get_cached_thing(thing=thing, thing_uri=thing_uri)
+
+    @property
+    def pending_changes(self) -> dict[str, dict[str, Any]]:
+        """Return the changed fields per thing_uri not yet confirmed by the server."""
+        return self._client.pending_changes
+
+    @property
+    def last_requested_positions(self) -> dict[str, int]:
+        """Return the last requested positions."""
+        return self._client.last_requested_positions
+
+    @property
+    def last_registry_diff(self) -> RegistryDiff | None:
+        """Return the things added, removed and changed by the last refresh."""
+        return self._client.last_registry_diff
+
+    def history(self, thing: str = None, thing_uri: str = None) -> ThingHistory:
+        """Get the position history of a thing."""
+        return self._client.history(thing=thing, thing_uri=thing_uri)
+
+    def add_group(self, name: str, things: list[str]) -> None:
+        """Add (or replace) a named group of things."""
+        self._client.add_group(name, things)
+
+    def remove_group(self, name: str) -> None:
+        """Remove a named group."""
+        self._client.remove_group(name)
+
+    @property
+    def groups(self) -> dict[str, list[str]]:
+        """Return the groups."""
+        return self._client.groups
+
+    def add_scene(self, name: str, positions: dict[str, int]) -> None:
+        """Add (or replace) a named scene, a requested position for each thing."""
+        self._client.add_scene(name, positions)
+
+    def remove_scene(self, name: str) -> None:
+        """Remove a named scene."""
+        self._client.remove_scene(name)
+
+    @property
+    def scenes(self) -> dict[str, dict[str, int]]:
+        """Return the scenes."""
+        return self._client.scenes
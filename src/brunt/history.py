@@ -0,0 +1,170 @@
+"""Position history for Brunt things."""
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import time
+from array import array
+from typing import Iterator, NamedTuple, TextIO
+
+from .thing import Thing
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HistorySample(NamedTuple):
+    """Class for one state of a thing."""
+
+    timestamp: float
+    current_position: int
+    request_position: int
+    move_state: int
+
+
+class Movement(NamedTuple):
+    """Class for one movement of a thing, from start to arrival."""
+
+    start: float
+    end: float
+    start_position: int
+    end_position: int
+
+    @property
+    def duration(self) -> float:
+        """Return the duration of the movement in seconds."""
+        return self.end - self.start
+
+    @property
+    def distance(self) -> int:
+        """Return the travelled distance in percent."""
+        return abs(self.end_position - self.start_position)
+
+
+class ThingHistory:
+    """Class that keeps the latest states of a thing in a fixed size ring buffer.
+
+    The states are stored in typed arrays, so the memory use is fixed at
+    14 bytes per sample and appending is O(1), the oldest sample is
+    overwritten when the buffer is full.
+    """
+
+    def __init__(self, size: int):
+        """Initialize the history.
+
+        :param size: the maximum number of samples kept.
+        """
+        if size < 1:
+            raise ValueError("The history size should be at least 1.")
+        self.size = size
+        self._timestamps = array("d", [0.0]) * size
+        self._current = array("h", [0]) * size
+        self._request = array("h", [0]) * size
+        self._move_state = array("h", [0]) * size
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+        return self._count
+
+    def __iter__(self) -> Iterator[HistorySample]:
+        """Iterate over the samples, oldest first."""
+        start = (self._next - self._count) % self.size
+        for offset in range(self._count):
+            idx = (start + offset) % self.size
+            yield HistorySample(
+                self._timestamps[idx],
+                self._current[idx],
+                self._request[idx],
+                self._move_state[idx],
+            )
+
+    def append(
+        self,
+        timestamp: float,
+        current_position: int,
+        request_position: int,
+        move_state: int,
+    ) -> bool:
+        """Add a sample, returns False when it equals the latest sample."""
+        if self._count:
+            last = (self._next - 1) % self.size
+            if (
+                self._timestamps[last] == timestamp
+                and self._current[last] == current_position
+                and self._request[last] == request_position
+                and self._move_state[last] == move_state
+            ):
+                return False
+        self._timestamps[self._next] = timestamp
+        self._current[self._next] = current_position
+        self._request[self._next] = request_position
+        self._move_state[self._next] = move_state
+        self._next = (self._next + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+        return True
+
+    def append_thing(self, thing: Thing) -> bool:
+        """Add the state of a Thing, timed by its TIMESTAMP when it has one."""
+        timestamp = (
+            thing.timestamp / 1000 if thing.timestamp is not None else time.time()
+        )
+        return self.append(
+            timestamp,
+            int(thing.current_position),
+            int(thing.request_position),
+            int(thing.move_state),
+        )
+
+    def samples(self, since: float = None) -> list[HistorySample]:
+        """Return the samples, oldest first, optionally only those since a time."""
+        return [s for s in self if since is None or s.timestamp >= since]
+
+    def movements(self) -> Iterator[Movement]:
+        """Iterate over the completed movements, oldest first.
+
+        A movement starts at the first sample where the requested position
+        differs from the current position and ends at the first sample after
+        that where the thing reached the requested position.
+        """
+        start: HistorySample | None = None
+        previous: HistorySample | None = None
+        for sample in self:
+            if start is None:
+                if sample.request_position != sample.current_position:
+                    start = previous if previous is not None else sample
+            elif sample.current_position == sample.request_position:
+                yield Movement(
+                    start.timestamp,
+                    sample.timestamp,
+                    start.current_position,
+                    sample.current_position,
+                )
+                start = None
+            previous = sample
+
+    def recent_movements(self, limit: int = 10) -> list[Movement]:
+        """Return the latest completed movements, newest first."""
+        return list(reversed(list(self.movements())))[:limit]
+
+    def average_travel_time(self) -> float | None:
+        """Return the average seconds per percent of travel, None without data."""
+        duration = 0.0
+        distance = 0
+        for movement in self.movements():
+            if movement.distance:
+                duration += movement.duration
+                distance += movement.distance
+        return duration / distance if distance else None
+
+    def to_csv(self, file: TextIO) -> None:
+        """Write the samples as CSV, with a header row."""
+        writer = csv.writer(file)
+        writer.writerow(HistorySample._fields)
+        writer.writerows(self)
+
+    def to_ndjson(self, file: TextIO) -> None:
+        """Write the samples as newline delimited JSON."""
+        for sample in self:
+            file.write(json.dumps(sample._asdict()) + "\n")
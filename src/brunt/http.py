@@ -1,20 +1,32 @@
 """Main code for brunt http."""
 from __future__ import annotations
 
-import json
+import asyncio
+import calendar
 import logging
+import time
 from abc import abstractmethod, abstractproperty
 from datetime import datetime
-from typing import Final
+from http.cookies import SimpleCookie
+from typing import Any, AsyncIterator, Final, Iterator
 
 import requests
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientResponseError, ClientSession, ClientTimeout
+from requests.adapters import HTTPAdapter
+from yarl import URL
 
-from .const import COOKIE_DOMAIN, DT_FORMAT_STRING
+from .codec import JsonCodec, get_default_codec
+from .const import COOKIE_DOMAIN, DEFAULT_POOL_SIZE, DT_FORMAT_STRING
+from .limiter import AdaptiveLimiter
+from .profiling import profiled, stage
+from .stream import JsonArrayStream
 from .utils import RequestTypes
 
 _LOGGER = logging.getLogger(__name__)
 
+STREAM_CHUNK_SIZE: Final = 16384
+TEMPLATE_CACHE_SIZE: Final = 1024
+EXPORT_DT_FORMAT: Final = "%a, %d-%b-%Y %H:%M:%S GMT"
 DEFAULT_HEADER: Final = {
     "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
     "Origin": "https://sky.brunt.co",
@@ -28,40 +40,118 @@ AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E216",
 class BaseBruntHTTP:
     """Base class for Brunt HTTP."""
 
-    @staticmethod
-    def _prepare_request(data: dict) -> dict:
-        """Prepare the payload and add the length to the header, payload might be empty."""
-        payload = ""
-        headers = DEFAULT_HEADER.copy()
-        if "data" in data:
-            payload = json.dumps(data["data"])
-            headers = {"Content-Length": str(len(payload))}
+    # extra headers for requests with a payload.
+    _payload_headers: dict[str, str] = {}
+
+    def __init__(self, codec: JsonCodec = None):
+        """Initialize the codec and the request templates.
+
+        :param codec: JsonCodec for the payloads and responses, defaults to
+            get_default_codec().
+        """
+        self._codec = codec if codec is not None else get_default_codec()
+        self._templates: dict[tuple[str, str], tuple[str, dict[str, str]]] = {}
+
+    @property
+    def codec(self) -> JsonCodec:
+        """Return the JSON codec."""
+        return self._codec
+
+    @profiled("prepare")
+    def _prepare_request(self, data: dict) -> dict:
+        """Prepare the payload and add the length to the header, payload might be empty.
+
+        The url and the headers without payload are prepared once per host and path.
+        """
+        key = (data["host"], data["path"])
+        template = self._templates.get(key)
+        if template is None:
+            if len(self._templates) >= TEMPLATE_CACHE_SIZE:
+                self._templates.clear()
+            template = (data["host"] + data["path"], DEFAULT_HEADER.copy())
+            self._templates[key] = template
+        url, headers = template
+        if "data" not in data:
+            return {"url": url, "data": "", "headers": headers}
+        payload = self._codec.dumps(data["data"])
+        return {
+            "url": url,
+            "data": payload,
+            "headers": {**self._payload_headers, "Content-Length": str(len(payload))},
+        }
 
-        return {"url": data["host"] + data["path"], "data": payload, "headers": headers}
+    @profiled("decode")
+    def _decode(self, body: bytes) -> dict | list:
+        """Decode a response body, an empty body is a success."""
+        if not body or body.isspace():
+            return {"result": "success"}
+        return self._codec.loads(body)  # type: ignore
 
     @abstractmethod
-    def request(self, data: dict, request_type: RequestTypes) -> dict | list:
+    def request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
         """Return the request response - abstract."""
 
     @abstractmethod
     async def async_request(
-        self, data: dict, request_type: RequestTypes
+        self, data: dict, request_type: RequestTypes, timeout: float = None
     ) -> dict | list:
         """Return the request response - abstract."""
 
+    @abstractmethod
+    def iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Iterator[Any]:
+        """Yield the elements of a JSON array response - abstract."""
+
+    @abstractmethod
+    def async_iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> AsyncIterator[Any]:
+        """Yield the elements of a JSON array response - abstract."""
+
     @abstractproperty
     def is_logged_in(self) -> bool:
         """Return True if there is a session and the cookie is still valid."""
 
+    @abstractmethod
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the Brunt session cookies, to reuse them later - abstract."""
+
+    @abstractmethod
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Load Brunt session cookies from export_session - abstract."""
+
 
 class BruntHttp(BaseBruntHTTP):
     """Class for brunt http calls."""
 
-    def __init__(self, session: requests.Session = None):
-        """Initialize the BruntHTTP object."""
-        self.session = session if session else requests.Session()
+    def __init__(
+        self,
+        session: requests.Session = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        codec: JsonCodec = None,
+    ):
+        """Initialize the BruntHTTP object.
+
+        :param session: requests Session, used as is when given.
+        :param pool_size: the number of connections kept open per host for a
+            new session, shared by all threads.
+        :param codec: JsonCodec for the payloads and responses.
+        """
+        super().__init__(codec)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session = session
+
+    def close(self) -> None:
+        """Close the session."""
+        self.session.close()
 
     @property
+    @profiled("is_logged_in")
     def is_logged_in(self) -> bool:
         """Return True if there is a session and the cookie is still valid."""
         if not self.session.cookies:
@@ -70,48 +160,187 @@ class BruntHttp(BaseBruntHTTP):
         for cookie in self.session.cookies:
             if cookie.domain == COOKIE_DOMAIN:
                 if cookie.expires is not None:
+                    # the cookiejar keeps expires as a unix timestamp.
+                    if isinstance(cookie.expires, int):
+                        return cookie.expires > time.time()
                     return (
                         datetime.strptime(str(cookie.expires), DT_FORMAT_STRING)
                         > datetime.utcnow()
                     )
         return False
 
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the Brunt session cookies, to reuse them later."""
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": datetime.utcfromtimestamp(cookie.expires).strftime(
+                    EXPORT_DT_FORMAT
+                )
+                if cookie.expires is not None
+                else None,
+            }
+            for cookie in self.session.cookies
+            if cookie.domain.endswith(COOKIE_DOMAIN)
+        ]
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Load Brunt session cookies from export_session."""
+        for cookie in cookies:
+            expires = None
+            if cookie.get("expires"):
+                expires = calendar.timegm(
+                    datetime.strptime(cookie["expires"], DT_FORMAT_STRING).timetuple()
+                )
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie["domain"],
+                path=cookie.get("path") or "/",
+                expires=expires,
+            )
+
     async def async_request(
-        self, data: dict, request_type: RequestTypes
+        self, data: dict, request_type: RequestTypes, timeout: float = None
     ) -> dict | list:
         """Raise error for using this call with sync."""
         raise NotImplementedError("You are using the sync version, please use request.")
 
-    def request(self, data: dict, request_type: RequestTypes) -> dict | list:
+    def request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
         """Request the data.
 
         :param session: session object from the Requests package
         :param data: internal data of your API call
         :param request: the type of request, based on the RequestType enum
+        :param timeout: seconds to wait for the server, None waits forever
         :returns: dict with sessionid for a login and the dict of the things for the other calls,
             or just success for PUT
-        :raises: raises errors from Requests through the raise_for_status function
+        :raises: raises errors from Requests through the raise_for_status function,
+            ValueError when the body is not valid JSON.
+        """
+        prepared = self._prepare_request(data)
+        with stage("network"):
+            resp = self.session.request(request_type.value, **prepared, timeout=timeout)
+            # raise an error if it occured in the Request.
+            resp.raise_for_status()
+            body = resp.content
+        return self._decode(body)
+
+    def iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Iterator[Any]:
+        """Request the data and yield the elements of the JSON array response.
+
+        The body is parsed while it streams in, so each element is yielded as
+        soon as it is complete.
+
+        :param data: internal data of your API call
+        :param request: the type of request, based on the RequestType enum
+        :param timeout: seconds to wait for the server, None waits forever
+        :raises: raises errors from Requests through the raise_for_status function,
+            ValueError when the response is not an array, or it is incomplete
+            or invalid.
         """
-        resp = self.session.request(
+        with self.session.request(
             request_type.value,
-            **BaseBruntHTTP._prepare_request(data),
+            **self._prepare_request(data),
+            timeout=timeout,
+            stream=True,
+        ) as resp:
+            resp.raise_for_status()
+            parser = JsonArrayStream()
+            for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                yield from parser.feed(chunk)
+            yield from parser.close()
+
+    def async_iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> AsyncIterator[Any]:
+        """Raise error for using this call with sync."""
+        raise NotImplementedError(
+            "You are using the sync version, please use iter_request."
         )
-        # raise an error if it occured in the Request.
-        resp.raise_for_status()
-        # check if there is something in the response body
-        if len(resp.text) == 0:
-            return {"result": "success"}
-        return resp.json()
 
 
 class BruntHttpAsync(BaseBruntHTTP):
     """Class for async brunt http calls."""
 
-    def __init__(self, session: ClientSession = None):
-        """Initialize the BruntHTTP object."""
+    # aiohttp sets a content type for the payload when there is none.
+    _payload_headers = {"Content-Type": "text/plain; charset=utf-8"}
+
+    def __init__(
+        self,
+        session: ClientSession = None,
+        codec: JsonCodec = None,
+        adaptive_limit: bool = False,
+    ):
+        """Initialize the BruntHTTP object.
+
+        :param session: aiohttp ClientSession, used as is when given.
+        :param codec: JsonCodec for the payloads and responses.
+        :param adaptive_limit: limit the requests in flight per host with an
+            AdaptiveLimiter, that follows the latency and errors of the host,
+            off by default.
+        """
+        super().__init__(codec)
         self.session = session if session else ClientSession()
+        self._adaptive_limit = adaptive_limit
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+
+    async def async_close(self) -> None:
+        """Close the session."""
+        await self.session.close()
+
+    @property
+    def limiters(self) -> dict[str, AdaptiveLimiter]:
+        """Return the adaptive limiter per host."""
+        return dict(self._limiters)
+
+    @property
+    def limits(self) -> dict[str, int]:
+        """Return the current limit of the requests in flight per host."""
+        return {host: limiter.limit for host, limiter in self._limiters.items()}
+
+    def _get_limiter(self, host: str) -> AdaptiveLimiter | None:
+        """Return the limiter for a host, None when adaptive limits are off."""
+        if not self._adaptive_limit:
+            return None
+        if host not in self._limiters:
+            self._limiters[host] = AdaptiveLimiter()
+        return self._limiters[host]
+
+    @staticmethod
+    async def _acquire(
+        limiter: AdaptiveLimiter | None, timeout: float | None
+    ) -> float | None:
+        """Wait for the limiter and return the time left of the timeout."""
+        if limiter is None:
+            return timeout
+        if timeout is None:
+            await limiter.acquire()
+            return None
+        start = time.monotonic()
+        await asyncio.wait_for(limiter.acquire(), timeout)
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            limiter.release()
+            raise asyncio.TimeoutError()
+        return remaining
+
+    @staticmethod
+    def _is_congestion(exc: BaseException) -> bool:
+        """Return True if an error says the host is overloaded or unreachable."""
+        if isinstance(exc, ClientResponseError):
+            return exc.status >= 500 or exc.status == 429
+        return isinstance(exc, (ClientError, asyncio.TimeoutError))
 
     @property
+    @profiled("is_logged_in")
     def is_logged_in(self) -> bool:
         """Return True if there is a session and the cookie is still valid."""
         if not self.session.cookie_jar:
@@ -125,30 +354,122 @@ class BruntHttpAsync(BaseBruntHTTP):
                     )
         return False
 
-    def request(self, data: dict, request_type: RequestTypes) -> dict | list:
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the Brunt session cookies, to reuse them later."""
+        return [
+            {
+                "name": cookie.key,
+                "value": cookie.value,
+                "domain": cookie.get("domain"),
+                "path": cookie.get("path"),
+                "expires": cookie.get("expires"),
+            }
+            for cookie in self.session.cookie_jar
+            if str(cookie.get("domain", "")).endswith(COOKIE_DOMAIN)
+        ]
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Load Brunt session cookies from export_session."""
+        for cookie in cookies:
+            morsels: SimpleCookie = SimpleCookie()
+            morsels[cookie["name"]] = cookie["value"]
+            for attribute in ("domain", "path", "expires"):
+                if cookie.get(attribute):
+                    morsels[cookie["name"]][attribute] = cookie[attribute]
+            self.session.cookie_jar.update_cookies(
+                morsels, URL(f"https://{cookie['domain']}")
+            )
+
+    def request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
         """Raise error for using this call with async."""
         raise NotImplementedError(
             "You are using the Async version, please use async_request."
         )
 
+    def iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Iterator[Any]:
+        """Raise error for using this call with async."""
+        raise NotImplementedError(
+            "You are using the Async version, please use async_iter_request."
+        )
+
     async def async_request(
-        self, data: dict, request_type: RequestTypes
+        self, data: dict, request_type: RequestTypes, timeout: float = None
     ) -> dict | list:
         """Request the data.
 
         :param session: session object from the Requests package
         :param data: internal data of your API call
         :param request: the type of request, based on the RequestType enum
+        :param timeout: total seconds for the request, None uses the session default
         :returns: dict with sessionid for a login and the dict of the things for
             the other calls, or just success for PUT
-        :raises: raises errors from Requests through the raise_for_status function
+        :raises: raises errors from Requests through the raise_for_status function,
+            ValueError when the body is not valid JSON.
         """
-        async with self.session.request(
-            request_type.value,
-            **BaseBruntHTTP._prepare_request(data),
-            raise_for_status=True,
-        ) as resp:
-            try:
-                return await resp.json(content_type=None)
-            except json.JSONDecodeError:
-                return {"result": "success"}
+        prepared = self._prepare_request(data)
+        limiter = self._get_limiter(data["host"])
+        with stage("limiter_wait"):
+            timeout = await self._acquire(limiter, timeout)
+        kwargs: dict[str, Any] = {}
+        if timeout is not None:
+            kwargs["timeout"] = ClientTimeout(total=timeout)
+        start = time.monotonic()
+        try:
+            with stage("network"):
+                async with self.session.request(
+                    request_type.value, **prepared, raise_for_status=True, **kwargs
+                ) as resp:
+                    body = await resp.read()
+        except BaseException as exc:
+            if limiter is not None:
+                limiter.release(error=self._is_congestion(exc))
+            raise
+        if limiter is not None:
+            limiter.release(rtt=time.monotonic() - start)
+        return self._decode(body)
+
+    async def async_iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> AsyncIterator[Any]:
+        """Request the data and yield the elements of the JSON array response.
+
+        The body is parsed while it streams in, so each element is yielded as
+        soon as it is complete.
+
+        :param data: internal data of your API call
+        :param request: the type of request, based on the RequestType enum
+        :param timeout: total seconds for the request, None uses the session default
+        :raises: raises errors from aiohttp through raise_for_status,
+            ValueError when the response is not an array, or it is incomplete
+            or invalid.
+        """
+        limiter = self._get_limiter(data["host"])
+        timeout = await self._acquire(limiter, timeout)
+        kwargs: dict[str, Any] = {}
+        if timeout is not None:
+            kwargs["timeout"] = ClientTimeout(total=timeout)
+        error = False
+        try:
+            async with self.session.request(
+                request_type.value,
+                **self._prepare_request(data),
+                raise_for_status=True,
+                **kwargs,
+            ) as resp:
+                parser = JsonArrayStream()
+                async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    for element in parser.feed(chunk):
+                        yield element
+                for element in parser.close():
+                    yield element
+        except BaseException as exc:
+            error = self._is_congestion(exc)
+            raise
+        finally:
+            # a stream gives no useful latency sample, only its errors count.
+            if limiter is not None:
+                limiter.release(error=error)
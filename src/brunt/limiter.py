@@ -0,0 +1,180 @@
+"""Adaptive concurrency limit for the Brunt requests."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Final
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_LIMIT: Final = 8
+DEFAULT_MIN_LIMIT: Final = 1
+DEFAULT_MAX_LIMIT: Final = 256
+DEFAULT_BACKOFF: Final = 0.5
+DEFAULT_TOLERANCE: Final = 2.0
+DEFAULT_RTT_WINDOW: Final = 500
+
+
+@dataclass
+class LimiterStats:
+    """Class for the metrics of an adaptive limiter."""
+
+    limit: int
+    in_flight: int = 0
+    queue_depth: int = 0
+    min_rtt: float | None = None
+    successes: int = 0
+    errors: int = 0
+    decreases: int = 0
+
+
+class AdaptiveLimiter:
+    """Class that limits the requests in flight, with a limit that follows the latency.
+
+    The limit works like TCP congestion control (AIMD): it starts by doubling
+    every round trip (slow start) and then grows by one every round trip
+    while the latency stays close to the lowest latency seen and the limit
+    is used. When the latency rises above tolerance times that baseline, or
+    a request fails because of the server or the connection, the limit is
+    multiplied by backoff, at most once per round trip.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = DEFAULT_MIN_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        backoff: float = DEFAULT_BACKOFF,
+        tolerance: float = DEFAULT_TOLERANCE,
+        rtt_window: int = DEFAULT_RTT_WINDOW,
+    ):
+        """Initialize the limiter.
+
+        :param initial_limit: the limit to start with.
+        :param min_limit: the lowest limit.
+        :param max_limit: the highest limit.
+        :param backoff: the factor (0-1) the limit is multiplied with on congestion.
+        :param tolerance: the latency, as a multiple of the baseline latency,
+            above which the server counts as congested.
+        :param rtt_window: number of samples after which the baseline latency
+            is measured again, so it follows a slower network.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Use 1 <= min_limit <= initial_limit <= max_limit.")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff should be between 0 and 1.")
+        if tolerance <= 1:
+            raise ValueError("tolerance should be larger than 1.")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.rtt_window = rtt_window
+        self._limit = float(initial_limit)
+        self._slow_start = True
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._min_rtt: float | None = None
+        self._window_min_rtt: float | None = None
+        self._window_samples = 0
+        self._last_decrease = 0.0
+        self._stats = LimiterStats(limit=initial_limit)
+
+    @property
+    def limit(self) -> int:
+        """Return the current limit."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of requests in flight."""
+        return self._in_flight
+
+    @property
+    def stats(self) -> LimiterStats:
+        """Return the metrics of the limiter."""
+        self._stats.limit = self.limit
+        self._stats.in_flight = self._in_flight
+        self._stats.queue_depth = len(self._waiters)
+        self._stats.min_rtt = self._min_rtt
+        return self._stats
+
+    async def acquire(self) -> None:
+        """Wait until a request can start."""
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was granted just before the cancel, hand it back.
+                self._in_flight -= 1
+                self._dispatch()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def release(self, rtt: float = None, error: bool = False) -> None:
+        """Release a request and adjust the limit to its outcome.
+
+        :param rtt: seconds the request took, None when it gives no latency
+            sample (for instance a client error).
+        :param error: True if the request failed because of the server or
+            the connection.
+        """
+        self._in_flight -= 1
+        if error:
+            self._stats.errors += 1
+            self._decrease()
+        elif rtt is not None:
+            self._stats.successes += 1
+            self._sample(rtt)
+        self._dispatch()
+
+    def _sample(self, rtt: float) -> None:
+        """Adjust the limit to the latency of a successful request."""
+        self._window_samples += 1
+        if self._window_min_rtt is None or rtt < self._window_min_rtt:
+            self._window_min_rtt = rtt
+        if self._min_rtt is None or rtt < self._min_rtt:
+            self._min_rtt = rtt
+        if self._window_samples >= self.rtt_window:
+            self._min_rtt = self._window_min_rtt
+            self._window_min_rtt = None
+            self._window_samples = 0
+        if self._min_rtt is not None and rtt > self._min_rtt * self.tolerance:
+            self._decrease(rtt)
+            return
+        # only grow a limit that is used, an idle limit says nothing.
+        if self._in_flight + 1 < self.limit * self.backoff:
+            return
+        if self._slow_start:
+            self._limit = min(self.max_limit, self._limit + 1)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def _decrease(self, rtt: float = None) -> None:
+        """Cut the limit, at most once per round trip."""
+        now = time.monotonic()
+        if now - self._last_decrease < (rtt or self._min_rtt or 0.0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self._stats.decreases += 1
+        _LOGGER.debug("Concurrency limit lowered to %s", self.limit)
+
+    def _dispatch(self) -> None:
+        """Start waiting requests while there is room under the limit."""
+        while self._waiters and self._in_flight < self.limit:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
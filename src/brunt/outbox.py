@@ -0,0 +1,145 @@
+"""Outbox for Brunt commands that are not yet sent."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Final
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_AFTER: Final = 1000
+
+
+@dataclass
+class OutboxEntry:
+    """Class for a command in the outbox."""
+
+    thing_uri: str
+    key: str
+    value: Any
+    entry_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created: float = field(default_factory=time.time)
+    attempts: int = 0
+
+
+class Outbox:
+    """Class for an in memory outbox, commands are kept in submit order."""
+
+    def __init__(self) -> None:
+        """Initialize the outbox."""
+        self._entries: dict[str, OutboxEntry] = {}
+
+    def __len__(self) -> int:
+        """Return the number of unfinished commands."""
+        return len(self._entries)
+
+    def add(self, entry: OutboxEntry) -> None:
+        """Add a command."""
+        self._entries[entry.entry_id] = entry
+
+    def complete(self, entry_id: str) -> None:
+        """Remove a command that is done, successfully or not."""
+        self._entries.pop(entry_id, None)
+
+    def pending(self, limit: int = None) -> list[OutboxEntry]:
+        """Return the unfinished commands, oldest first."""
+        entries = list(self._entries.values())
+        return entries if limit is None else entries[:limit]
+
+    def close(self) -> None:
+        """Close the outbox."""
+
+
+class FileOutbox(Outbox):
+    """Class for an outbox backed by an append only log file.
+
+    Each added and completed command is appended to the file as a JSON line,
+    so the unfinished commands survive a restart and are loaded again when
+    the outbox is opened. The file is rewritten with only the unfinished
+    commands once compact_after commands completed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync: bool = False,
+        compact_after: int = DEFAULT_COMPACT_AFTER,
+    ):
+        """Open the outbox and load the unfinished commands from the file.
+
+        :param path: the path of the log file, created when it does not exist.
+        :param fsync: fsync the file after each write, slower but safe against
+            power loss, not only process restarts.
+        :param compact_after: the number of completed commands after which the
+            file is rewritten.
+        """
+        super().__init__()
+        self.path = path
+        self.fsync = fsync
+        self.compact_after = compact_after
+        self._completed = 0
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")  # pylint: disable=R1732
+        if self._completed:
+            self.compact()
+
+    def _load(self) -> None:
+        """Replay the log file."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    _LOGGER.warning("Skipping invalid outbox line: %s", line)
+                    continue
+                if record.pop("op") == "add":
+                    super().add(OutboxEntry(**record))
+                else:
+                    super().complete(record["entry_id"])
+                    self._completed += 1
+        _LOGGER.debug("Loaded %s unfinished commands from %s", len(self), self.path)
+
+    def _write(self, record: dict[str, Any]) -> None:
+        """Append a record to the log file."""
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def add(self, entry: OutboxEntry) -> None:
+        """Add a command and log it."""
+        super().add(entry)
+        self._write({"op": "add", **asdict(entry)})
+
+    def complete(self, entry_id: str) -> None:
+        """Remove a command and log it."""
+        if entry_id not in self._entries:
+            return
+        super().complete(entry_id)
+        self._write({"op": "done", "entry_id": entry_id})
+        self._completed += 1
+        if self._completed >= self.compact_after:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the log file with only the unfinished commands."""
+        self._file.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            for entry in self._entries.values():
+                file.write(json.dumps({"op": "add", **asdict(entry)}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")  # pylint: disable=R1732
+        self._completed = 0
+
+    def close(self) -> None:
+        """Close the log file."""
+        self._file.close()
@@ -0,0 +1,149 @@
+"""Ordered write pipelines per Brunt device."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Final, TypeVar
+
+from .const import REQUEST_POSITION_KEY
+from .utils import remaining_timeout
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PIPELINE_DEPTH: Final = 8
+SUPERSEDED: Final = {"result": "superseded"}
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class PipelineWrite:
+    """Class for one reserved write, turn is set to True when it may be sent."""
+
+    device: str
+    key: str
+    turn: asyncio.Future[bool]
+
+
+class DevicePipelines:
+    """Class that runs the writes to one device strictly in order.
+
+    Writes to different devices run in parallel. The order of the writes to
+    a device is the order in which they are reserved, reserve does not wait,
+    so a caller can take its place before it awaits anything else. Each
+    device has a queue of at most max_depth writes, the first one is being
+    sent, a write reserved when the queue is full is refused. With supersede
+    a new position write replaces the queued position writes that are not
+    sent yet, those return {"result": "superseded"}. The queue of a device is
+    removed once it is empty.
+    """
+
+    def __init__(
+        self, max_depth: int = DEFAULT_PIPELINE_DEPTH, supersede: bool = False
+    ):
+        """Initialize the pipelines.
+
+        :param max_depth: the maximum number of writes queued per device,
+            including the one being sent.
+        :param supersede: let a position write replace the queued position
+            writes for the same device.
+        """
+        if max_depth < 1:
+            raise ValueError("max_depth should be at least 1.")
+        self.max_depth = max_depth
+        self.supersede = supersede
+        self.superseded = 0
+        self._queues: dict[str, deque[PipelineWrite]] = {}
+
+    @property
+    def depths(self) -> dict[str, int]:
+        """Return the number of queued writes per device with writes."""
+        return {device: len(queue) for device, queue in self._queues.items()}
+
+    def reserve(self, device: str, key: str) -> PipelineWrite:
+        """Take the next place in the order of the writes to a device.
+
+        Pass the reserved write to run, which always has to be called.
+
+        :param device: the id of the device, for instance its path.
+        :param key: the key that is changed.
+        :return: the reserved write.
+        :raises: RuntimeError when max_depth writes are queued for the device.
+        """
+        if self.supersede and key == REQUEST_POSITION_KEY:
+            self._supersede(device)
+        queue = self._queues.setdefault(device, deque())
+        if len(queue) >= self.max_depth:
+            raise RuntimeError(f"The pipeline for {device} is full.")
+        write = PipelineWrite(device, key, asyncio.get_running_loop().create_future())
+        queue.append(write)
+        self._advance(device)
+        return write
+
+    async def run(
+        self, write: PipelineWrite, call: Callable[[], Awaitable[_T]]
+    ) -> _T | dict[str, Any]:
+        """Run a reserved write once the earlier writes to its device are done.
+
+        The call is made in the task of the caller, so it keeps its deadline.
+
+        :param write: the write returned by reserve.
+        :param call: function that returns the awaitable that sends the write.
+        :return: the result of the call, or {"result": "superseded"} when a
+            later position write replaced it before it was sent.
+        :raises: TimeoutError when the deadline passed while waiting.
+        """
+        try:
+            if not await self._wait(write.turn):
+                return dict(SUPERSEDED)
+            return await call()
+        finally:
+            self._leave(write)
+
+    async def async_run(
+        self, device: str, key: str, call: Callable[[], Awaitable[_T]]
+    ) -> _T | dict[str, Any]:
+        """Reserve a write and run it, see reserve and run."""
+        return await self.run(self.reserve(device, key), call)
+
+    @staticmethod
+    async def _wait(future: asyncio.Future[Any]) -> Any:
+        """Wait for a future within the current deadline."""
+        timeout = remaining_timeout()
+        if timeout is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError as exc:
+            raise TimeoutError("Deadline exceeded.") from exc
+
+    def _supersede(self, device: str) -> None:
+        """Resolve the queued position writes that are not sent yet."""
+        queue = self._queues.get(device, deque())
+        for write in list(queue)[1:]:
+            if write.key == REQUEST_POSITION_KEY and not write.turn.done():
+                queue.remove(write)
+                write.turn.set_result(False)
+                self.superseded += 1
+                _LOGGER.debug("Superseded a queued position write for %s", device)
+
+    def _leave(self, write: PipelineWrite) -> None:
+        """Remove a write from the queue of its device and start the next one."""
+        queue = self._queues.get(write.device)
+        if queue is not None and write in queue:
+            queue.remove(write)
+        self._advance(write.device)
+
+    def _advance(self, device: str) -> None:
+        """Hand the turn to the first write, skipping writes no one waits for."""
+        queue = self._queues.get(device)
+        if queue is None:
+            return
+        while queue and queue[0].turn.cancelled():
+            queue.popleft()
+        if queue and not queue[0].turn.done():
+            queue[0].turn.set_result(True)
+        if not queue:
+            del self._queues[device]
@@ -0,0 +1,222 @@
+"""Fleet wide poll scheduler for Brunt."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Final
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TICK: Final = 0.5
+DEFAULT_WHEEL_SIZE: Final = 512
+DEFAULT_BATCH_SIZE: Final = 50
+DEFAULT_JITTER: Final = 0.1
+DEFAULT_MAX_BATCHES: Final = 8
+
+
+@dataclass
+class _PollEntry:
+    """Class for one polled thing in the wheel."""
+
+    thing_uri: str
+    interval: float
+    due: float
+    rounds: int = 0
+    slot: int = 0
+
+
+@dataclass
+class PollStats:
+    """Class for the metrics of the poll scheduler."""
+
+    polled: int = 0
+    batches: int = 0
+    errors: int = 0
+    skipped: int = 0
+    in_flight: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    total_lag: float = 0.0
+
+    @property
+    def average_lag(self) -> float:
+        """Return the average seconds a poll started after it was due."""
+        return self.total_lag / self.polled if self.polled else 0.0
+
+
+class PollScheduler:
+    """Class that polls many things from one task, using a hashed timing wheel.
+
+    Each thing has its own poll interval. Instead of a timer per thing, the
+    things are put in the slot of the wheel in which they are due, the wheel
+    advances one slot every tick and the things that are due are polled in
+    batches of at most batch_size. The first poll of a thing is spread over its
+    interval and each next poll gets some jitter, so polls do not come in bursts.
+    The batches run as tasks, at most max_batches at once, so the wheel keeps
+    ticking while polls are in flight. A thing that is due while its previous
+    poll has not finished is skipped for that round.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[list[str]], Awaitable[object]],
+        tick: float = DEFAULT_TICK,
+        wheel_size: int = DEFAULT_WHEEL_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        jitter: float = DEFAULT_JITTER,
+        max_batches: int = DEFAULT_MAX_BATCHES,
+    ):
+        """Initialize the poll scheduler.
+
+        :param poll: coroutine function that polls a batch of thing_uris.
+        :param tick: seconds per slot of the wheel, the timing resolution.
+        :param wheel_size: number of slots in the wheel.
+        :param batch_size: maximum number of things polled in one call.
+        :param jitter: fraction of the interval that is randomly added or
+            subtracted from each next poll.
+        :param max_batches: maximum number of batches polled at once.
+        """
+        if tick <= 0 or wheel_size < 1 or batch_size < 1 or max_batches < 1:
+            raise ValueError(
+                "tick, wheel_size, batch_size and max_batches should be positive."
+            )
+        self._poll = poll
+        self.tick = tick
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self.max_batches = max_batches
+        self._wheel: list[dict[str, _PollEntry]] = [{} for _ in range(wheel_size)]
+        self._entries: dict[str, _PollEntry] = {}
+        self._cursor = 0
+        self._started: float | None = None
+        self._ticks = 0
+        self._task: asyncio.Task[None] | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+        self._busy: set[str] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+        self.stats = PollStats()
+
+    def __len__(self) -> int:
+        """Return the number of polled things."""
+        return len(self._entries)
+
+    @property
+    def running(self) -> bool:
+        """Return True if the scheduler is running."""
+        return self._task is not None and not self._task.done()
+
+    def _now(self) -> float:
+        """Return the current time of the wheel."""
+        return asyncio.get_running_loop().time()
+
+    def _place(self, entry: _PollEntry, now: float) -> None:
+        """Put an entry in the slot in which it is due."""
+        ticks = max(1, round((entry.due - now) / self.tick))
+        entry.slot = (self._cursor + ticks) % len(self._wheel)
+        entry.rounds = (ticks - 1) // len(self._wheel)
+        self._wheel[entry.slot][entry.thing_uri] = entry
+
+    def add(self, thing_uri: str, interval: float) -> None:
+        """Add a thing to poll every interval seconds, or change its interval.
+
+        The first poll is at a random moment within the interval.
+        """
+        if interval <= 0:
+            raise ValueError("The poll interval should be positive.")
+        self.remove(thing_uri)
+        now = self._now()
+        entry = _PollEntry(thing_uri, interval, now + random.uniform(0, interval))
+        self._entries[thing_uri] = entry
+        self._place(entry, now)
+
+    def remove(self, thing_uri: str) -> None:
+        """Stop polling a thing."""
+        entry = self._entries.pop(thing_uri, None)
+        if entry is not None:
+            self._wheel[entry.slot].pop(thing_uri, None)
+
+    def start(self) -> None:
+        """Start polling in a background task."""
+        if not self.running:
+            self._started = self._now()
+            self._ticks = 0
+            self._semaphore = asyncio.Semaphore(self.max_batches)
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling and cancel the running batches."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        for batch in self._batches:
+            batch.cancel()
+        await asyncio.gather(self._task, *self._batches, return_exceptions=True)
+        self._task = None
+        self._batches = set()
+        self._busy = set()
+
+    def _advance(self, now: float) -> list[tuple[str, float]]:
+        """Move the wheel one slot and return the due things with their due time."""
+        self._cursor = (self._cursor + 1) % len(self._wheel)
+        slot = self._wheel[self._cursor]
+        due = [entry for entry in slot.values() if entry.rounds == 0]
+        for entry in slot.values():
+            if entry.rounds:
+                entry.rounds -= 1
+        polls = []
+        for entry in due:
+            del slot[entry.thing_uri]
+            if entry.thing_uri in self._busy:
+                self.stats.skipped += 1
+            else:
+                polls.append((entry.thing_uri, entry.due))
+            spread = entry.interval * self.jitter
+            entry.due = now + entry.interval + random.uniform(-spread, spread)
+            self._place(entry, now)
+        return polls
+
+    async def _poll_batch(self, batch: list[tuple[str, float]]) -> None:
+        """Poll a batch, errors are logged and do not stop the scheduler."""
+        assert self._semaphore is not None
+        thing_uris = [thing_uri for thing_uri, _ in batch]
+        try:
+            async with self._semaphore:
+                now = self._now()
+                for _, due in batch:
+                    lag = max(0.0, now - due)
+                    self.stats.last_lag = lag
+                    self.stats.max_lag = max(self.stats.max_lag, lag)
+                    self.stats.total_lag += lag
+                self.stats.batches += 1
+                self.stats.polled += len(batch)
+                self.stats.in_flight += 1
+                try:
+                    await self._poll(thing_uris)
+                finally:
+                    self.stats.in_flight -= 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            self.stats.errors += 1
+            _LOGGER.warning("Polling %s things failed: %s", len(thing_uris), exc)
+        finally:
+            self._busy.difference_update(thing_uris)
+
+    async def _run(self) -> None:
+        """Advance the wheel every tick and poll the due things."""
+        assert self._started is not None
+        while True:
+            self._ticks += 1
+            delay = self._started + self._ticks * self.tick - self._now()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            due = self._advance(self._now())
+            self._busy.update(thing_uri for thing_uri, _ in due)
+            for idx in range(0, len(due), self.batch_size):
+                batch = asyncio.ensure_future(
+                    self._poll_batch(due[idx : idx + self.batch_size])
+                )
+                self._batches.add(batch)
+                batch.add_done_callback(self._batches.discard)
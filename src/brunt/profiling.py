@@ -0,0 +1,260 @@
+"""Profiling of the internal stages of the Brunt client calls."""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import TracebackType
+from typing import IO, Any, Callable, ContextManager, Final, Type, TypeVar, cast
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_ENV: Final = "BRUNT_PROFILE"
+PROFILE_OUTPUT_ENV: Final = "BRUNT_PROFILE_OUTPUT"
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+_NULL_STAGE: Final = contextlib.nullcontext()
+_STACK: ContextVar[tuple[_Stage, ...]] = ContextVar("brunt_profile_stack", default=())
+
+
+@dataclass
+class StageStats:
+    """Class for the aggregated measurements of one stack of stages."""
+
+    calls: int = 0
+    total_ns: int = 0
+    self_ns: int = 0
+    alloc_bytes: int = 0
+    self_alloc_bytes: int = 0
+
+
+class _Stage:
+    """Class for one running stage, the time and memory of its children are kept."""
+
+    __slots__ = (
+        "profiler",
+        "name",
+        "path",
+        "start",
+        "memory",
+        "child_ns",
+        "child_bytes",
+        "token",
+    )
+
+    def __init__(self, profiler: Profiler, name: str):
+        """Initialize the stage."""
+        self.profiler = profiler
+        self.name = name
+        self.path: tuple[str, ...] = ()
+        self.start = 0
+        self.memory = 0
+        self.child_ns = 0
+        self.child_bytes = 0
+        self.token: Any = None
+
+    def __enter__(self) -> _Stage:
+        """Start measuring."""
+        stack = _STACK.get()
+        self.path = (stack[-1].path if stack else ()) + (self.name,)
+        self.token = _STACK.set(stack + (self,))
+        if self.profiler.trace_memory:
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop measuring and add the measurements to the profiler."""
+        elapsed = time.perf_counter_ns() - self.start
+        allocated = 0
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            allocated = max(0, tracemalloc.get_traced_memory()[0] - self.memory)
+        _STACK.reset(self.token)
+        stack = _STACK.get()
+        if stack:
+            stack[-1].child_ns += elapsed
+            stack[-1].child_bytes += allocated
+        self.profiler.add(
+            self.path,
+            elapsed,
+            max(0, elapsed - self.child_ns),
+            allocated,
+            max(0, allocated - self.child_bytes),
+        )
+
+
+class Profiler:
+    """Class that aggregates the time (and allocations) per stack of stages.
+
+    Stages are nested with contextvars, so the stack is kept per thread and
+    per asyncio task. When the profiler is off a stage is a shared null
+    context, so the hot paths only pay for one attribute check.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the profiler, it starts disabled."""
+        self.enabled = False
+        self.trace_memory = False
+        self._started_tracemalloc = False
+        self._stats: dict[tuple[str, ...], StageStats] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """Start profiling.
+
+        :param trace_memory: also record the memory allocated in each stage
+            with tracemalloc, which slows the client down considerably.
+        """
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.trace_memory = trace_memory
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop profiling, the measurements are kept until reset."""
+        self.enabled = False
+        self.trace_memory = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        """Remove all measurements."""
+        with self._lock:
+            self._stats = {}
+
+    def stage(self, name: str) -> ContextManager[Any]:
+        """Return a context manager that measures a stage.
+
+        :param name: the name of the stage, nested in the running stages.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add(
+        self,
+        path: tuple[str, ...],
+        total_ns: int,
+        self_ns: int,
+        alloc_bytes: int = 0,
+        self_alloc_bytes: int = 0,
+    ) -> None:
+        """Add the measurements of one run of a stack of stages."""
+        with self._lock:
+            stats = self._stats.get(path)
+            if stats is None:
+                stats = self._stats[path] = StageStats()
+            stats.calls += 1
+            stats.total_ns += total_ns
+            stats.self_ns += self_ns
+            stats.alloc_bytes += alloc_bytes
+            stats.self_alloc_bytes += self_alloc_bytes
+
+    @property
+    def stats(self) -> dict[str, StageStats]:
+        """Return a copy of the measurements, per stack joined with ';'."""
+        with self._lock:
+            return {
+                ";".join(path): StageStats(**vars(stats))
+                for path, stats in self._stats.items()
+            }
+
+    def write_collapsed(self, file: IO[str], memory: bool = False) -> None:
+        """Write the measurements in the collapsed stack format of flamegraph tools.
+
+        Each line is a stack of stages and its self time in microseconds,
+        or the self allocated bytes when memory is True.
+
+        :param file: file like object to write to.
+        :param memory: write the allocations instead of the time.
+        """
+        for path, stats in sorted(self.stats.items()):
+            value = stats.self_alloc_bytes if memory else stats.self_ns // 1000
+            if value:
+                file.write(f"{path} {value}\n")
+
+    def summary(self) -> str:
+        """Return a table with the calls, total and self time per stack."""
+        lines = [f"{'calls':>8} {'total ms':>10} {'self ms':>10} {'mean ms':>9}  stage"]
+        for path, stats in sorted(
+            self.stats.items(), key=lambda item: item[1].total_ns, reverse=True
+        ):
+            lines.append(
+                f"{stats.calls:>8} {stats.total_ns / 1e6:>10.2f} "
+                f"{stats.self_ns / 1e6:>10.2f} "
+                f"{stats.total_ns / stats.calls / 1e6:>9.3f}  {path}"
+            )
+        return "\n".join(lines)
+
+
+profiler = Profiler()
+
+
+def stage(name: str) -> ContextManager[Any]:
+    """Return a context manager that measures a stage with the profiler."""
+    if not profiler.enabled:
+        return _NULL_STAGE
+    return _Stage(profiler, name)
+
+
+def profiled(name: str) -> Callable[[_F], _F]:
+    """Decorate a function or coroutine function to measure it as a stage.
+
+    :param name: the name of the stage.
+    """
+
+    def _decorator(func: _F) -> _F:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not profiler.enabled:
+                    return await func(*args, **kwargs)
+                with _Stage(profiler, name):
+                    return await func(*args, **kwargs)
+
+            return cast(_F, _async_wrapper)
+
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with _Stage(profiler, name):
+                return func(*args, **kwargs)
+
+        return cast(_F, _wrapper)
+
+    return _decorator
+
+
+def _write_at_exit(path: str) -> None:
+    """Write the collapsed stacks, and allocations when traced, when Python exits."""
+    try:
+        with open(path, "w", encoding="utf-8") as file:
+            profiler.write_collapsed(file)
+        if profiler.trace_memory:
+            with open(f"{path}.memory", "w", encoding="utf-8") as file:
+                profiler.write_collapsed(file, memory=True)
+    except OSError as exc:
+        _LOGGER.warning("Could not write the profile to %s: %s", path, exc)
+
+
+if os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes", "on", "memory"):
+    profiler.enable(trace_memory=os.environ[PROFILE_ENV].lower() == "memory")
+    if os.environ.get(PROFILE_OUTPUT_ENV):
+        atexit.register(_write_at_exit, os.environ[PROFILE_OUTPUT_ENV])
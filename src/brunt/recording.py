@@ -0,0 +1,553 @@
+"""Record and replay the Brunt http traffic, for offline performance tests."""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import IO, Any, AsyncIterator, Final, Iterator
+
+import requests
+from aiohttp import (
+    ClientConnectionError,
+    ClientResponseError,
+    ClientSession,
+    RequestInfo,
+)
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from .client import BruntClientAsync
+from .codec import JsonCodec
+from .const import DEFAULT_POOL_SIZE
+from .http import BruntHttp, BruntHttpAsync
+from .utils import RequestTypes
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORDING_VERSION: Final = 1
+SCRUB_KEYS: Final = ("ID", "PASS")
+SCRUBBED: Final = "***"
+LOGIN_PATH: Final = "/session"
+
+
+@dataclass
+class RecordedExchange:
+    """Class for one recorded request and its response."""
+
+    offset: float
+    method: str
+    host: str
+    path: str
+    data: dict[str, Any] | None
+    elapsed: float
+    response: Any = None
+    stream: bool = False
+    status: int | None = None
+    error: str | None = None
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    """Open a recording, gzipped when the path ends with .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore
+    return open(path, mode, encoding="utf-8")
+
+
+def _scrub(data: dict[str, Any] | None) -> dict[str, Any] | None:
+    """Replace the credentials in a payload."""
+    if data is None:
+        return None
+    return {k: SCRUBBED if k in SCRUB_KEYS else v for k, v in data.items()}
+
+
+def load_recording(path: str) -> list[RecordedExchange]:
+    """Load the exchanges of a recording file.
+
+    :param path: the file written by a recording transport.
+    :return: the exchanges, in the order the requests were sent.
+    :raises: ValueError when the file is not a recording of a known version.
+    """
+    exchanges = []
+    with _open(path, "r") as file:
+        header = json.loads(file.readline() or "{}")
+        if header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unknown recording version: {header.get('version')}")
+        for line in file:
+            if line.strip():
+                exchanges.append(RecordedExchange(**json.loads(line)))
+    exchanges.sort(key=lambda exchange: exchange.offset)
+    return exchanges
+
+
+class RecordingWriter:
+    """Class that appends exchanges to a recording file, from any thread."""
+
+    def __init__(self, path: str):
+        """Open the file and write the header.
+
+        :param path: the file to write, gzipped when it ends with .gz.
+        """
+        self.path = path
+        self._file = _open(path, "w")
+        self._file.write(json.dumps({"version": RECORDING_VERSION}) + "\n")
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def offset(self) -> float:
+        """Return the seconds since the recording started."""
+        return time.monotonic() - self._start
+
+    def write(self, exchange: RecordedExchange) -> None:
+        """Write one exchange, with the credentials and the login response scrubbed."""
+        exchange.data = _scrub(exchange.data)
+        if exchange.path == LOGIN_PATH and exchange.response is not None:
+            # the login response holds the session id, replay only needs the timing.
+            exchange.response = SCRUBBED
+        line = json.dumps(asdict(exchange), separators=(",", ":"), default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def close(self) -> None:
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+
+def _exchange(
+    writer: RecordingWriter, data: dict, request_type: RequestTypes, stream: bool
+) -> RecordedExchange:
+    """Start an exchange for a request."""
+    return RecordedExchange(
+        offset=round(writer.offset(), 6),
+        method=request_type.value,
+        host=data["host"],
+        path=data["path"],
+        data=data.get("data"),
+        elapsed=0.0,
+        stream=stream,
+    )
+
+
+def _finish(
+    writer: RecordingWriter,
+    exchange: RecordedExchange,
+    response: Any = None,
+    status: int = None,
+    error: BaseException = None,
+) -> None:
+    """Write an exchange with its response or error."""
+    exchange.elapsed = round(writer.offset() - exchange.offset, 6)
+    exchange.response = response
+    exchange.status = status
+    if error is not None:
+        exchange.error = f"{type(error).__name__}: {error}"
+    writer.write(exchange)
+
+
+class RecordingHttp(BruntHttp):
+    """Class for brunt http calls that records all requests to a file."""
+
+    def __init__(
+        self,
+        path: str,
+        session: requests.Session = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        codec: JsonCodec = None,
+    ):
+        """Initialize the recording transport.
+
+        :param path: the file to record to, gzipped when it ends with .gz.
+        :param session: requests Session, used as is when given.
+        :param pool_size: the number of connections kept open per host.
+        :param codec: JsonCodec for the payloads and responses.
+        """
+        super().__init__(session=session, pool_size=pool_size, codec=codec)
+        self.recording = RecordingWriter(path)
+
+    def close(self) -> None:
+        """Close the session and the recording."""
+        try:
+            super().close()
+        finally:
+            self.recording.close()
+
+    def request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
+        """Request the data and record the exchange."""
+        exchange = _exchange(self.recording, data, request_type, False)
+        try:
+            response = super().request(data, request_type, timeout=timeout)
+        except requests.HTTPError as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            _finish(self.recording, exchange, status=status, error=exc)
+            raise
+        except Exception as exc:
+            _finish(self.recording, exchange, error=exc)
+            raise
+        _finish(self.recording, exchange, response=response)
+        return response
+
+    def iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Iterator[Any]:
+        """Request the data, yield the elements and record the exchange."""
+        exchange = _exchange(self.recording, data, request_type, True)
+        elements = []
+        try:
+            for element in super().iter_request(data, request_type, timeout=timeout):
+                elements.append(element)
+                yield element
+        except requests.HTTPError as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            _finish(self.recording, exchange, status=status, error=exc)
+            raise
+        except Exception as exc:
+            _finish(self.recording, exchange, error=exc)
+            raise
+        _finish(self.recording, exchange, response=elements)
+
+
+class RecordingHttpAsync(BruntHttpAsync):
+    """Class for async brunt http calls that records all requests to a file."""
+
+    def __init__(
+        self,
+        path: str,
+        session: ClientSession = None,
+        codec: JsonCodec = None,
+        adaptive_limit: bool = False,
+    ):
+        """Initialize the recording transport.
+
+        :param path: the file to record to, gzipped when it ends with .gz.
+        :param session: aiohttp ClientSession, used as is when given.
+        :param codec: JsonCodec for the payloads and responses.
+        :param adaptive_limit: limit the requests in flight per host.
+        """
+        super().__init__(session=session, codec=codec, adaptive_limit=adaptive_limit)
+        self.recording = RecordingWriter(path)
+
+    async def async_close(self) -> None:
+        """Close the session and the recording."""
+        try:
+            await super().async_close()
+        finally:
+            self.recording.close()
+
+    async def async_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
+        """Request the data and record the exchange."""
+        exchange = _exchange(self.recording, data, request_type, False)
+        try:
+            response = await super().async_request(data, request_type, timeout=timeout)
+        except ClientResponseError as exc:
+            _finish(self.recording, exchange, status=exc.status, error=exc)
+            raise
+        except Exception as exc:
+            _finish(self.recording, exchange, error=exc)
+            raise
+        _finish(self.recording, exchange, response=response)
+        return response
+
+    async def async_iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> AsyncIterator[Any]:
+        """Request the data, yield the elements and record the exchange."""
+        exchange = _exchange(self.recording, data, request_type, True)
+        elements = []
+        try:
+            async for element in super().async_iter_request(
+                data, request_type, timeout=timeout
+            ):
+                elements.append(element)
+                yield element
+        except ClientResponseError as exc:
+            _finish(self.recording, exchange, status=exc.status, error=exc)
+            raise
+        except Exception as exc:
+            _finish(self.recording, exchange, error=exc)
+            raise
+        _finish(self.recording, exchange, response=elements)
+
+
+class _Replay:
+    """Class that finds the recorded exchange for each request."""
+
+    def __init__(
+        self, recording: str | list[RecordedExchange], speed: float | None, cycle: bool
+    ):
+        """Load the recording and index the exchanges per request."""
+        if speed is not None and speed <= 0:
+            raise ValueError("speed should be larger than 0, or None for no delay.")
+        self.exchanges = (
+            load_recording(recording) if isinstance(recording, str) else recording
+        )
+        self.speed = speed
+        self.cycle = cycle
+        self._queues: dict[tuple, deque[RecordedExchange]] = {}
+        for exchange in self.exchanges:
+            self._queues.setdefault(self._key(exchange), deque()).append(exchange)
+        self._lock = threading.Lock()
+        # without a recorded login the session was imported.
+        self.logged_in = not any(e.path == LOGIN_PATH for e in self.exchanges)
+
+    @staticmethod
+    def _key(exchange: RecordedExchange) -> tuple:
+        """Return the key that matches a request with its exchanges."""
+        data = _scrub(exchange.data)
+        payload = None if data is None else sorted((k, str(v)) for k, v in data.items())
+        return (exchange.method, exchange.host, exchange.path, str(payload))
+
+    def next(self, data: dict, request_type: RequestTypes) -> RecordedExchange:
+        """Return the next recorded exchange for a request.
+
+        :raises: ValueError when there is no (more) recorded exchange for it.
+        """
+        key = self._key(
+            RecordedExchange(
+                0.0,
+                request_type.value,
+                data["host"],
+                data["path"],
+                data.get("data"),
+                0.0,
+            )
+        )
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise ValueError(
+                    f"No recorded response for {request_type.value} {data['path']}"
+                )
+            exchange = queue.popleft()
+            if self.cycle or not queue:
+                # the last response keeps being served, like a steady server.
+                queue.append(exchange)
+        if data["path"] == LOGIN_PATH and exchange.error is None:
+            self.logged_in = True
+        return exchange
+
+    def delay(self, exchange: RecordedExchange) -> float:
+        """Return the seconds to wait before the response is served."""
+        return 0.0 if self.speed is None else exchange.elapsed / self.speed
+
+
+class _ReplaySession:
+    """Class standing in for the requests Session of a replay transport."""
+
+    cookies: list = []
+
+    def close(self) -> None:
+        """Close nothing."""
+
+
+class _ReplaySessionAsync:
+    """Class standing in for the aiohttp ClientSession of a replay transport."""
+
+    cookie_jar: list = []
+
+    async def close(self) -> None:
+        """Close nothing."""
+
+
+class ReplayHttp(BruntHttp):
+    """Class that serves recorded responses to the sync client, without network."""
+
+    def __init__(
+        self,
+        recording: str | list[RecordedExchange],
+        speed: float | None = 1.0,
+        cycle: bool = False,
+    ):
+        """Initialize the replay transport.
+
+        :param recording: the recording file or its loaded exchanges.
+        :param speed: how much faster than recorded the responses are served,
+            None to serve them without delay.
+        :param cycle: serve the recorded responses of a request round robin,
+            by default the last one is repeated once they are used.
+        """
+        super().__init__(session=_ReplaySession())  # type: ignore
+        self.replay = _Replay(recording, speed, cycle)
+
+    @property
+    def is_logged_in(self) -> bool:
+        """Return True once the recorded login was replayed."""
+        return self.replay.logged_in
+
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return no cookies."""
+        return []
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Ignore the cookies, the session is replayed."""
+
+    def _serve(self, data: dict, request_type: RequestTypes) -> RecordedExchange:
+        """Wait like the recorded request and raise its recorded error."""
+        exchange = self.replay.next(data, request_type)
+        time.sleep(self.replay.delay(exchange))
+        if exchange.status is not None:
+            response = requests.Response()
+            response.status_code = exchange.status
+            raise requests.HTTPError(exchange.error, response=response)
+        if exchange.error is not None:
+            if exchange.error.startswith("ValueError"):
+                raise ValueError(exchange.error)
+            if exchange.error.startswith(("Timeout", "ReadTimeout", "ConnectTimeout")):
+                raise requests.Timeout(exchange.error)
+            raise requests.ConnectionError(exchange.error)
+        return exchange
+
+    def request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
+        """Return the recorded response."""
+        return self._serve(data, request_type).response
+
+    def iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Iterator[Any]:
+        """Yield the recorded elements."""
+        yield from self._serve(data, request_type).response or []
+
+
+class ReplayHttpAsync(BruntHttpAsync):
+    """Class that serves recorded responses to the async client, without network."""
+
+    def __init__(
+        self,
+        recording: str | list[RecordedExchange],
+        speed: float | None = 1.0,
+        cycle: bool = False,
+    ):
+        """Initialize the replay transport.
+
+        :param recording: the recording file or its loaded exchanges.
+        :param speed: how much faster than recorded the responses are served,
+            None to serve them without delay.
+        :param cycle: serve the recorded responses of a request round robin,
+            by default the last one is repeated once they are used.
+        """
+        super().__init__(session=_ReplaySessionAsync())  # type: ignore
+        self.replay = _Replay(recording, speed, cycle)
+
+    @property
+    def is_logged_in(self) -> bool:
+        """Return True once the recorded login was replayed."""
+        return self.replay.logged_in
+
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return no cookies."""
+        return []
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Ignore the cookies, the session is replayed."""
+
+    async def _serve(self, data: dict, request_type: RequestTypes) -> RecordedExchange:
+        """Wait like the recorded request and raise its recorded error."""
+        exchange = self.replay.next(data, request_type)
+        await asyncio.sleep(self.replay.delay(exchange))
+        url = URL(data["host"] + data["path"])
+        if exchange.status is not None:
+            raise ClientResponseError(
+                RequestInfo(url, request_type.value, CIMultiDictProxy(CIMultiDict())),
+                (),
+                status=exchange.status,
+                message=exchange.error or "",
+            )
+        if exchange.error is not None:
+            if exchange.error.startswith("ValueError"):
+                raise ValueError(exchange.error)
+            if exchange.error.startswith("TimeoutError"):
+                raise asyncio.TimeoutError(exchange.error)
+            raise ClientConnectionError(exchange.error)
+        return exchange
+
+    async def async_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> dict | list:
+        """Return the recorded response."""
+        return (await self._serve(data, request_type)).response
+
+    async def async_iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> AsyncIterator[Any]:
+        """Yield the recorded elements."""
+        for element in (await self._serve(data, request_type)).response or []:
+            yield element
+
+
+@dataclass
+class ReplayResult:
+    """Class for the outcome of one replayed call."""
+
+    exchange: RecordedExchange
+    latency: float
+    error: str | None = None
+
+
+async def _async_call(client: BruntClientAsync, exchange: RecordedExchange) -> Any:
+    """Make the client call that sends the recorded request."""
+    thing_uri = exchange.path[len("/thing") :]
+    if exchange.method == RequestTypes.GET.value and exchange.path == "/thing":
+        return await client.async_get_things(force=True)
+    if exchange.method == RequestTypes.GET.value:
+        return await client.async_get_state(thing_uri=thing_uri)
+    if exchange.method == RequestTypes.PUT.value:
+        return [
+            await client.async_change_key(key, value, thing_uri=thing_uri)
+            for key, value in (exchange.data or {}).items()
+        ]
+    raise ValueError(f"Can not replay {exchange.method} {exchange.path}")
+
+
+async def async_replay_traffic(
+    client: BruntClientAsync,
+    recording: str | list[RecordedExchange],
+    speed: float | None = 1.0,
+) -> list[ReplayResult]:
+    """Send the recorded requests again as client calls, at the recorded moments.
+
+    Use a client with a ReplayHttpAsync to measure the client offline, or a
+    normal client to replay the traffic against the cloud. The logins are
+    not replayed, the client logs in when it needs to.
+
+    :param client: the client that makes the calls.
+    :param recording: the recording file or its loaded exchanges.
+    :param speed: how much faster than recorded the calls are started, None
+        to start them all at once.
+    :return: the latency and error of each call, in the recorded order.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed should be larger than 0, or None for no delay.")
+    exchanges = [
+        exchange
+        for exchange in (
+            load_recording(recording) if isinstance(recording, str) else recording
+        )
+        if exchange.path != LOGIN_PATH
+    ]
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def _replay(exchange: RecordedExchange) -> ReplayResult:
+        if speed is not None:
+            await asyncio.sleep(max(0.0, start + exchange.offset / speed - loop.time()))
+        sent = loop.time()
+        try:
+            await _async_call(client, exchange)
+        except Exception as exc:  # pylint: disable=broad-except
+            return ReplayResult(
+                exchange, loop.time() - sent, f"{type(exc).__name__}: {exc}"
+            )
+        return ReplayResult(exchange, loop.time() - sent)
+
+    return list(await asyncio.gather(*(_replay(e) for e in exchanges)))
@@ -0,0 +1,176 @@
+"""Priority scheduler for Brunt requests."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Final
+
+from .utils import RequestPriority
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY: Final = 32
+DEFAULT_SHARES: Final = {
+    RequestPriority.INTERACTIVE_WRITE: 16,
+    RequestPriority.INTERACTIVE_READ: 16,
+    RequestPriority.BACKGROUND: 8,
+}
+DEFAULT_STARVATION_TIMEOUT: Final = 2.0
+
+
+@dataclass
+class PriorityStats:
+    """Class for the metrics of one priority class."""
+
+    share: int
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    in_flight: int = 0
+    granted: int = 0
+    promoted: int = 0
+    total_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """Return the average time in seconds a request waited for a slot."""
+        return self.total_wait / self.granted if self.granted else 0.0
+
+
+class PriorityScheduler:
+    """Class that hands out request slots by priority.
+
+    Each priority class can have at most its share of requests in flight and
+    all classes together at most max_concurrency. Free slots go to the most
+    urgent class first, unless a request of a less urgent class has been
+    waiting longer than starvation_timeout, then that one goes first.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        shares: dict[RequestPriority, int] = None,
+        starvation_timeout: float = DEFAULT_STARVATION_TIMEOUT,
+    ):
+        """Initialize the scheduler.
+
+        :param max_concurrency: the maximum number of requests in flight.
+        :param shares: the maximum number of requests in flight per priority.
+        :param starvation_timeout: seconds after which a waiting request is
+            served before requests of more urgent classes.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency should be at least 1.")
+        self.max_concurrency = max_concurrency
+        self.starvation_timeout = starvation_timeout
+        shares = {**DEFAULT_SHARES, **(shares or {})}
+        self._stats = {
+            priority: PriorityStats(share=max(1, min(share, max_concurrency)))
+            for priority, share in sorted(shares.items(), key=lambda i: i[0].value)
+        }
+        self._waiters: dict[
+            RequestPriority, deque[tuple[float, asyncio.Future[None]]]
+        ] = {priority: deque() for priority in self._stats}
+        self._in_flight = 0
+
+    @property
+    def stats(self) -> dict[RequestPriority, PriorityStats]:
+        """Return the metrics per priority class."""
+        return self._stats
+
+    @property
+    def in_flight(self) -> int:
+        """Return the total number of requests in flight."""
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the context."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: RequestPriority) -> None:
+        """Wait for a slot for a request of the given priority."""
+        stats = self._stats[priority]
+        waiters = self._waiters[priority]
+        if not any(self._waiters.values()) and self._has_capacity(priority):
+            self._grant(priority, 0.0)
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        entry = (time.monotonic(), future)
+        waiters.append(entry)
+        stats.queue_depth = len(waiters)
+        stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was granted just before the cancel, hand it back.
+                self.release(priority)
+            elif entry in waiters:
+                waiters.remove(entry)
+                stats.queue_depth = len(waiters)
+            raise
+
+    def release(self, priority: RequestPriority) -> None:
+        """Release a slot and hand it to the next waiting request."""
+        self._in_flight -= 1
+        self._stats[priority].in_flight -= 1
+        self._dispatch()
+
+    def _has_capacity(self, priority: RequestPriority) -> bool:
+        """Return True if a request of this priority can start now."""
+        stats = self._stats[priority]
+        return self._in_flight < self.max_concurrency and stats.in_flight < stats.share
+
+    def _grant(self, priority: RequestPriority, waited: float) -> None:
+        """Book a slot for a request."""
+        stats = self._stats[priority]
+        self._in_flight += 1
+        stats.in_flight += 1
+        stats.granted += 1
+        stats.total_wait += waited
+
+    def _next_priority(self, now: float) -> RequestPriority | None:
+        """Return the priority class that gets the next free slot."""
+        starved = [
+            (waiters[0][0], priority)
+            for priority, waiters in self._waiters.items()
+            if waiters
+            and now - waiters[0][0] >= self.starvation_timeout
+            and self._has_capacity(priority)
+        ]
+        if starved:
+            priority = min(starved, key=lambda s: s[0])[1]
+            self._stats[priority].promoted += 1
+            return priority
+        return next(
+            (
+                priority
+                for priority, waiters in self._waiters.items()
+                if waiters and self._has_capacity(priority)
+            ),
+            None,
+        )
+
+    def _dispatch(self) -> None:
+        """Hand out free slots to waiting requests."""
+        now = time.monotonic()
+        while self._in_flight < self.max_concurrency:
+            priority = self._next_priority(now)
+            if priority is None:
+                return
+            waiters = self._waiters[priority]
+            enqueued, future = waiters.popleft()
+            self._stats[priority].queue_depth = len(waiters)
+            if future.done():
+                continue
+            self._grant(priority, now - enqueued)
+            future.set_result(None)
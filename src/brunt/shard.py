@@ -0,0 +1,380 @@
+"""Multi process sharding of Brunt accounts."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Future
+from types import TracebackType
+from typing import Any, Callable, Type
+
+from .client import BruntClientAsync
+from .thing import Thing
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _dump(message: tuple) -> bytes:
+    """Pickle a result message, unpicklable errors and values become RuntimeErrors."""
+    try:
+        return pickle.dumps(message)
+    except Exception as exc:  # pylint: disable=broad-except
+        kind, request_id = message[0], message[1]
+        return pickle.dumps(
+            (kind, request_id, False, RuntimeError(f"Unpicklable result: {exc}"))
+        )
+
+
+class _ShardWorker:
+    """Class that runs the async clients of the accounts of one shard."""
+
+    def __init__(
+        self,
+        shard_id: int,
+        commands: multiprocessing.Queue,
+        results: multiprocessing.Queue,
+        sessions: Any,
+        client_kwargs: dict[str, Any],
+    ):
+        """Initialize the worker."""
+        self.shard_id = shard_id
+        self.commands = commands
+        self.results = results
+        self.sessions = sessions
+        self.client_kwargs = client_kwargs
+        self.clients: dict[str, BruntClientAsync] = {}
+        self.tasks: dict[str, set[asyncio.Task]] = {}
+
+    def _send_updates(self, account: str, value: Any) -> None:
+        """Send the Things in a result to the coordinator."""
+        if isinstance(value, dict):
+            things = list(value.values())
+        elif isinstance(value, list):
+            things = value
+        else:
+            things = [value]
+        for thing in things:
+            if isinstance(thing, Thing):
+                self.results.put(_dump(("update", account, thing)))
+
+    def _save_session(self, account: str) -> None:
+        """Put the session of an account in the shared store."""
+        client = self.clients.get(account)
+        if client is not None and client._http.is_logged_in:
+            self.sessions[account] = client.export_session()
+
+    async def _add(self, account: str, username: str, password: str) -> bool:
+        """Create the client of an account, reusing its stored session."""
+        client = BruntClientAsync(username, password, **self.client_kwargs)
+        cookies = self.sessions.get(account)
+        if cookies:
+            client.import_session(cookies)
+        self.clients[account] = client
+        self.tasks[account] = set()
+        return True
+
+    async def _remove(self, account: str) -> bool:
+        """Store the session of an account and close its client."""
+        pending = self.tasks.pop(account, set())
+        if pending:
+            await asyncio.wait(pending)
+        self._save_session(account)
+        client = self.clients.pop(account, None)
+        if client is not None:
+            await client.async_close()
+        return True
+
+    async def _call(self, account: str, method: str, args: tuple, kwargs: dict) -> Any:
+        """Call a method of the client of an account."""
+        client = self.clients[account]
+        if not method.startswith("async_") or not hasattr(client, method):
+            raise AttributeError(f"Unknown client method: {method}")
+        last_login = client._last_login
+        if method == "async_start_polling":
+            kwargs["callback"] = lambda states: self._send_updates(account, states)
+            await client.async_start_polling(*args, **kwargs)
+            result = None
+        else:
+            result = await getattr(client, method)(*args, **kwargs)
+            self._send_updates(account, result)
+        if client._last_login != last_login:
+            self._save_session(account)
+        return result
+
+    async def _handle(self, request_id: int, command: str, args: tuple) -> None:
+        """Run a command and send its result."""
+        try:
+            if command == "add":
+                value = await self._add(*args)
+            elif command == "remove":
+                value = await self._remove(*args)
+            else:
+                value = await self._call(*args)
+            self.results.put(_dump(("result", request_id, True, value)))
+        except Exception as exc:  # pylint: disable=broad-except
+            self.results.put(_dump(("result", request_id, False, exc)))
+
+    async def run(self) -> None:
+        """Read and run commands until the stop command."""
+        loop = asyncio.get_running_loop()
+        running: set[asyncio.Task] = set()
+        while True:
+            message = await loop.run_in_executor(None, self.commands.get)
+            if message is None:
+                break
+            request_id, command, args = message
+            task = asyncio.ensure_future(self._handle(request_id, command, args))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            if command == "call":
+                account_tasks = self.tasks.get(args[0])
+                if account_tasks is not None:
+                    account_tasks.add(task)
+                    task.add_done_callback(account_tasks.discard)
+        if running:
+            await asyncio.wait(running)
+        for account in list(self.clients):
+            await self._remove(account)
+
+
+def _shard_main(
+    shard_id: int,
+    commands: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    sessions: Any,
+    client_kwargs: dict[str, Any],
+) -> None:
+    """Run a shard worker process."""
+    worker = _ShardWorker(shard_id, commands, results, sessions, client_kwargs)
+    asyncio.run(worker.run())
+
+
+class ShardedRunner:
+    """Class that spreads accounts over a pool of worker processes.
+
+    Each worker process runs its own event loop with a BruntClientAsync per
+    account, so the JSON decoding and Thing creation are spread over the CPUs.
+    The runner routes the calls for an account to its shard and gathers the
+    Things the workers see. The sessions are kept in a store shared by all
+    processes, so an account logs in only once, also when it moves to another
+    shard with rebalance.
+    """
+
+    def __init__(
+        self,
+        shards: int = None,
+        on_update: Callable[[str, Thing], Any] = None,
+        client_kwargs: dict[str, Any] = None,
+        start_method: str = None,
+    ):
+        """Initialize the runner.
+
+        :param shards: the number of worker processes, defaults to the CPU count.
+        :param on_update: called with the account and each Thing the workers
+            see, from a background thread of the runner.
+        :param client_kwargs: extra keyword arguments for each BruntClientAsync.
+        :param start_method: the multiprocessing start method, None for the default.
+        """
+        self.shards = shards if shards else (os.cpu_count() or 1)
+        self._on_update = on_update
+        self._client_kwargs = client_kwargs or {}
+        self._context: Any = multiprocessing.get_context(start_method)
+        self._accounts: dict[str, tuple[str, str]] = {}
+        self._assignment: dict[str, int] = {}
+        self._polling: dict[str, list[tuple[tuple, dict[str, Any]]]] = {}
+        self._routing = threading.Lock()
+        self._futures: dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._processes: list[Any] = []
+        self._commands: list[Any] = []
+        self._results: Any = None
+        self._reader: threading.Thread | None = None
+        self._manager: Any = None
+        self._sessions: Any = None
+
+    def __enter__(self) -> ShardedRunner:
+        """Start the runner in a context manager."""
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop the runner."""
+        self.stop()
+
+    @property
+    def loads(self) -> list[int]:
+        """Return the number of accounts per shard."""
+        loads = [0] * self.shards
+        for shard in self._assignment.values():
+            loads[shard] += 1
+        return loads
+
+    def shard_of(self, account: str) -> int:
+        """Return the shard of an account."""
+        if account not in self._assignment:
+            raise ValueError("Unknown account: " + account)
+        return self._assignment[account]
+
+    def start(self) -> None:
+        """Start the worker processes."""
+        if self._processes:
+            return
+        self._manager = self._context.Manager()
+        self._sessions = self._manager.dict()
+        self._results = self._context.Queue()
+        for shard_id in range(self.shards):
+            commands = self._context.Queue()
+            process = self._context.Process(
+                target=_shard_main,
+                args=(
+                    shard_id,
+                    commands,
+                    self._results,
+                    self._sessions,
+                    self._client_kwargs,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._commands.append(commands)
+            self._processes.append(process)
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def stop(self) -> None:
+        """Stop the worker processes, after their running calls are done."""
+        if not self._processes:
+            return
+        for commands in self._commands:
+            commands.put(None)
+        for process in self._processes:
+            process.join()
+        self._results.put(None)
+        if self._reader is not None:
+            self._reader.join()
+        self._manager.shutdown()
+        self._processes = []
+        self._commands = []
+        self._assignment = {}
+        self._polling = {}
+        with self._lock:
+            for future in self._futures.values():
+                future.set_exception(RuntimeError("The runner was stopped."))
+            self._futures = {}
+
+    def _read_results(self) -> None:
+        """Resolve the futures with the results from the workers."""
+        while True:
+            payload = self._results.get()
+            if payload is None:
+                return
+            message = pickle.loads(payload)
+            if message[0] == "update":
+                if self._on_update is not None:
+                    try:
+                        self._on_update(message[1], message[2])
+                    except Exception:  # pylint: disable=broad-except
+                        _LOGGER.exception("Error in on_update callback")
+                continue
+            _, request_id, success, value = message
+            with self._lock:
+                future = self._futures.pop(request_id, None)
+            if future is None:
+                continue
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _send(self, shard: int, command: str, args: tuple) -> Future:
+        """Send a command to a shard."""
+        if not self._processes:
+            raise RuntimeError("Start the runner first.")
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._futures[request_id] = future
+        self._commands[shard].put((request_id, command, args))
+        return future
+
+    def add_account(self, account: str, username: str, password: str) -> int:
+        """Add an account to the shard with the fewest accounts.
+
+        :param account: the key used to route calls for this account.
+        :param username: the username of the Brunt account
+        :param password: the password of the Brunt account
+        :return: the shard of the account.
+        """
+        with self._routing:
+            if account in self._assignment:
+                raise ValueError("Account already added: " + account)
+            shard = min(range(self.shards), key=lambda idx: self.loads[idx])
+            self._accounts[account] = (username, password)
+            self._assignment[account] = shard
+            self._send(shard, "add", (account, username, password)).result()
+        return shard
+
+    def remove_account(self, account: str) -> None:
+        """Remove an account, after its running calls are done."""
+        with self._routing:
+            shard = self.shard_of(account)
+            self._send(shard, "remove", (account,)).result()
+            del self._assignment[account]
+            del self._accounts[account]
+            self._polling.pop(account, None)
+            self._sessions.pop(account, None)
+
+    def submit(self, account: str, method: str, *args: Any, **kwargs: Any) -> Future:
+        """Call a BruntClientAsync method for an account on its shard.
+
+        :param account: the account, as given to add_account.
+        :param method: the name of the async client method, like "async_get_state".
+        :return: a concurrent.futures Future with the result of the call.
+        """
+        with self._routing:
+            shard = self.shard_of(account)
+            if method == "async_start_polling":
+                # kept to start polling again when the account moves.
+                self._polling.setdefault(account, []).append((args, dict(kwargs)))
+            elif method == "async_stop_polling":
+                self._polling.pop(account, None)
+            return self._send(shard, "call", (account, method, args, kwargs))
+
+    def rebalance(self) -> dict[str, tuple[int, int]]:
+        """Move accounts until the shards differ at most one account in size.
+
+        The session of a moved account goes through the shared store, so it
+        does not log in again on its new shard, and its polling is started
+        again on the new shard. Calls submitted during a move wait for it.
+
+        :return: dict with the moved accounts and their old and new shard.
+        """
+        moves: dict[str, tuple[int, int]] = {}
+        while True:
+            loads = self.loads
+            source = max(range(self.shards), key=lambda idx: loads[idx])
+            target = min(range(self.shards), key=lambda idx: loads[idx])
+            if loads[source] - loads[target] <= 1:
+                return moves
+            account = next(a for a, s in self._assignment.items() if s == source)
+            with self._routing:
+                self._send(source, "remove", (account,)).result()
+                self._send(target, "add", (account, *self._accounts[account])).result()
+                self._assignment[account] = target
+                for args, kwargs in self._polling.get(account, []):
+                    self._send(
+                        target,
+                        "call",
+                        (account, "async_start_polling", args, dict(kwargs)),
+                    ).result()
+            moves[account] = (moves.get(account, (source, target))[0], target)
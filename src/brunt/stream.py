@@ -0,0 +1,93 @@
+"""Incremental parsing of JSON arrays for Brunt."""
+from __future__ import annotations
+
+import codecs
+import json
+import logging
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonArrayStream:
+    """Class that parses a JSON array from chunks, element by element.
+
+    Feed it the chunks of a response body as they arrive and it returns the
+    elements of the top level array that are complete, without keeping the
+    whole body or the whole decoded array in memory.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+        self.is_array = True
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Add a chunk of the body and return the elements completed by it.
+
+        :raises: ValueError when the body is not a JSON array.
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._parse()
+
+    def close(self) -> list[Any]:
+        """Finish the body, raises ValueError when the array is incomplete."""
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        elements = self._parse(final=True)
+        if self.is_array and not self._finished:
+            raise ValueError("Incomplete JSON array in response.")
+        return elements
+
+    def _skip(self, pos: int) -> int:
+        """Return the position of the next non whitespace character."""
+        while pos < len(self._buffer) and self._buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _parse(self, final: bool = False) -> list[Any]:
+        """Parse the complete elements in the buffer."""
+        elements: list[Any] = []
+        pos = self._skip(0)
+        if not self.is_array or self._finished or pos >= len(self._buffer):
+            self._buffer = self._buffer[pos:]
+            return elements
+        if not self._started:
+            if self._buffer[pos] != "[":
+                self.is_array = False
+                raise ValueError("Response is not a JSON array.")
+            self._started = True
+            pos = self._skip(pos + 1)
+            if pos < len(self._buffer) and self._buffer[pos] == "]":
+                self._finished = True
+                return elements
+        while pos < len(self._buffer):
+            if self._buffer[pos] == "]":
+                self._finished = True
+                pos += 1
+                break
+            if self._buffer[pos] == ",":
+                pos = self._skip(pos + 1)
+                if pos >= len(self._buffer):
+                    break
+            try:
+                element, end = self._decoder.raw_decode(self._buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise ValueError("Invalid JSON array in response.") from None
+                break
+            end = self._skip(end)
+            if end >= len(self._buffer) or self._buffer[end] not in ",]":
+                # a number at the end of the buffer might still continue.
+                if final:
+                    raise ValueError("Invalid JSON array in response.")
+                break
+            elements.append(element)
+            pos = end
+        self._buffer = self._buffer[pos:]
+        return elements
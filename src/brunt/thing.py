@@ -2,10 +2,12 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from typing import Any
 
+from .profiling import profiled
+
 _LOGGER = logging.getLogger(__name__)
 
 MAPPING = {
@@ -57,9 +59,15 @@ class Thing:
     button_control: str | None = None
 
     @classmethod
+    @profiled("create_thing")
     def create_from_dict(cls, input_dict: dict[str, Any]) -> Thing:
         """Create a Thing from a dict."""
         _LOGGER.debug("Creating Thing from dict: %s", input_dict)
+        return Thing(**cls._map_dict(input_dict))
+
+    @classmethod
+    def _map_dict(cls, input_dict: dict[str, Any]) -> dict[str, Any]:
+        """Map the keys and values of an API dict to the Thing fields."""
         class_fields = {f.name: f.type for f in fields(cls)}
         thing = {}
         for key, value in input_dict.items():
@@ -77,7 +85,16 @@ class Thing:
                     _LOGGER.warning("%s not an int, value was: %s", key, value)
                     continue
             thing[new_key] = value
-        return Thing(**thing)
+        return thing
+
+    def update_from_dict(self, input_dict: dict[str, Any]) -> dict[str, Any]:
+        """Update the Thing in place from a dict, returns the changed fields."""
+        _LOGGER.debug("Updating Thing %s from dict: %s", self.name, input_dict)
+        updates = self._map_dict(input_dict)
+        for key, value in updates.items():
+            setattr(self, key, value)
+        self.__post_init__()
+        return updates
 
     def __post_init__(self) -> None:
         """Do post init work."""
@@ -89,3 +106,26 @@ class Thing:
     def compare_name(self, name: str) -> bool:
         """Compare name to name."""
         return self.name == name
+
+    @staticmethod
+    def uri_from_dict(input_dict: dict[str, Any]) -> str | None:
+        """Get the thing_uri of a Thing dict, without creating the Thing."""
+        thing_uri = input_dict.get("thingUri")
+        if thing_uri is None and input_dict.get("SERIAL") is not None:
+            thing_uri = f"/hub/{input_dict['SERIAL']}"
+        return thing_uri
+
+
+@dataclass
+class RegistryDiff:
+    """Class for the things added, removed and changed by a registry refresh."""
+
+    added: list[Thing] = field(default_factory=list)
+    removed: list[Thing] = field(default_factory=list)
+    changed: list[Thing] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        """Return True if any thing was added, removed or changed."""
+        return bool(self.added or self.removed or self.changed)
@@ -1,5 +1,12 @@
 """Util classes for Brunt."""
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from enum import Enum
+from typing import Iterator
 
 
 class RequestTypes(Enum):
@@ -8,3 +15,86 @@ class RequestTypes(Enum):
     POST = "POST"
     GET = "GET"
     PUT = "PUT"
+
+
+class RequestPriority(Enum):
+    """Enum class for the priority of requests, lower is more urgent."""
+
+    INTERACTIVE_WRITE = 0
+    INTERACTIVE_READ = 1
+    BACKGROUND = 2
+
+
+class Deadline:
+    """Class for a point in time by which a call should be done."""
+
+    def __init__(self, timeout: float):
+        """Initialize the deadline, timeout seconds from now."""
+        self.expires = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Return the seconds left, raises TimeoutError when the deadline passed."""
+        remaining = self.expires - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Deadline exceeded.")
+        return remaining
+
+
+_DEADLINE: ContextVar[Deadline | None] = ContextVar("brunt_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(timeout: float | None) -> Iterator[Deadline | None]:
+    """Set the deadline for all requests done in this context.
+
+    Nested scopes keep the tighter of the two deadlines, so a deadline set by
+    a call also covers the login and thing lookup it does.
+    """
+    current = _DEADLINE.get()
+    if timeout is None:
+        yield current
+        return
+    deadline = Deadline(timeout)
+    if current is not None and current.expires <= deadline.expires:
+        yield current
+        return
+    token = _DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining_timeout() -> float | None:
+    """Return the seconds left for the current deadline, None when there is none."""
+    deadline = _DEADLINE.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+class LatencyTracker:
+    """Class that keeps a window of latencies to calculate percentiles."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """Initialize the tracker.
+
+        :param window: the number of latest samples kept.
+        :param min_samples: the number of samples needed before percentiles are given.
+        """
+        self._samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        """Add a latency sample in seconds."""
+        self._samples.append(latency)
+
+    def percentile(self, percentile: float) -> float | None:
+        """Return the latency at the percentile (0-1), None with too few samples."""
+        if len(self._samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(percentile * len(ordered)))
+        return ordered[idx]
@@ -1,10 +1,162 @@
-# -*- coding: utf-8 -*-
-"""
-    Dummy conftest.py for brunt.
+"""Fixtures for the brunt tests, with a fake Brunt cloud."""
+from __future__ import annotations
 
-    If you don't know what this is for, just leave it empty.
-    Read more about conftest.py under:
-    https://pytest.org/latest/plugins.html
-"""
+import asyncio
+from typing import Any, AsyncIterator, Iterator
 
-# import pytest
+import pytest
+
+from brunt.utils import RequestTypes
+
+
+def make_records(count: int) -> list[dict[str, str]]:
+    """Return the thing list of a fake account."""
+    return [
+        {
+            "NAME": f"Blind{idx}",
+            "MODEL": "ZB",
+            "FW_VERSION": "1.0",
+            "SERIAL": f"S{idx}",
+            "thingUri": f"/hub/S{idx}",
+            "requestPosition": "0",
+            "currentPosition": "0",
+            "moveState": "0",
+            "TIMESTAMP": str(1600000000000 + idx),
+        }
+        for idx in range(count)
+    ]
+
+
+class FakeServer:
+    """Class for a fake Brunt cloud that keeps the state of its things."""
+
+    def __init__(self, count: int = 3, delay: float = 0.0):
+        """Initialize the server with count things."""
+        self.things = {r["thingUri"]: r for r in make_records(count)}
+        self.delay = delay
+        self.calls: list[tuple[str, str, dict | None]] = []
+        self.logged_in = False
+        self.list_body: Any = None
+
+    def handle(self, data: dict, request_type: RequestTypes) -> Any:
+        """Return the response to a request."""
+        self.calls.append((request_type.value, data["path"], data.get("data")))
+        if data["path"] == "/session":
+            self.logged_in = True
+            return {"result": "success"}
+        if data["path"] == "/thing":
+            if self.list_body is not None:
+                return self.list_body
+            return [dict(r) for r in self.things.values()]
+        thing = self.things[data["path"][len("/thing") :]]
+        if request_type == RequestTypes.PUT:
+            for key, value in data["data"].items():
+                thing[key] = value
+                if key == "requestPosition":
+                    thing["currentPosition"] = value
+            return {"result": "success"}
+        return dict(thing)
+
+    def puts(self, path: str = None) -> list[dict]:
+        """Return the payloads of the PUT requests, for one path when given."""
+        return [
+            payload
+            for method, call_path, payload in self.calls
+            if method == "PUT" and (path is None or call_path == path)
+        ]
+
+
+class FakeSession:
+    """Class for a session that has nothing to close."""
+
+    async def close(self) -> None:
+        """Close nothing."""
+
+
+class FakeHttp:
+    """Class for a sync http layer backed by a FakeServer."""
+
+    def __init__(self, server: FakeServer):
+        """Initialize the http layer."""
+        self.server = server
+
+    @property
+    def is_logged_in(self) -> bool:
+        """Return if the server saw a login."""
+        return self.server.logged_in
+
+    def close(self) -> None:
+        """Close nothing."""
+
+    def request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Any:
+        """Answer the request."""
+        return self.server.handle(data, request_type)
+
+    def iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Iterator[Any]:
+        """Yield the elements of the response, like the JSON array stream."""
+        body = self.request(data, request_type, timeout)
+        if not isinstance(body, list):
+            raise ValueError("Response is not a JSON array.")
+        yield from body
+
+
+class FakeHttpAsync:
+    """Class for an async http layer backed by a FakeServer."""
+
+    def __init__(self, server: FakeServer):
+        """Initialize the http layer."""
+        self.server = server
+        self.session = FakeSession()
+        self.limits: dict[str, int] = {}
+
+    @property
+    def is_logged_in(self) -> bool:
+        """Return if the server saw a login."""
+        return self.server.logged_in
+
+    async def async_close(self) -> None:
+        """Close the session."""
+        await self.session.close()
+
+    def export_session(self) -> list[dict[str, Any]]:
+        """Return the fake session cookie once logged in."""
+        if not self.server.logged_in:
+            return []
+        return [{"name": "skySSEIONID", "value": "fake"}]
+
+    def import_session(self, cookies: list[dict[str, Any]]) -> None:
+        """Take over a session."""
+        self.server.logged_in = bool(cookies)
+
+    async def async_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> Any:
+        """Answer the request after the delay of the server, within the timeout."""
+        await asyncio.wait_for(asyncio.sleep(self.server.delay), timeout)
+        return self.server.handle(data, request_type)
+
+    async def async_iter_request(
+        self, data: dict, request_type: RequestTypes, timeout: float = None
+    ) -> AsyncIterator[Any]:
+        """Yield the elements of the response, like the JSON array stream."""
+        body = await self.async_request(data, request_type, timeout)
+        if not isinstance(body, list):
+            raise ValueError("Response is not a JSON array.")
+        for element in body:
+            yield element
+
+
+@pytest.fixture
+def server() -> FakeServer:
+    """Return a fake Brunt cloud with three things."""
+    return FakeServer()
+
+
+@pytest.fixture
+def http(server: FakeServer) -> FakeHttpAsync:
+    """Return an async http layer for the fake cloud."""
+    return FakeHttpAsync(server)
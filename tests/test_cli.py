@@ -0,0 +1,76 @@
+"""Tests for the NDJSON batch runner of the command line."""
+import asyncio
+import io
+import json
+import os
+
+from brunt import BruntClientAsync
+from brunt.cli import _load_session, _save_session, format_stats, run_batch
+
+from conftest import FakeHttpAsync, FakeServer
+
+COMMANDS = [
+    {"id": "a", "cmd": "get-state", "thing": "Blind1"},
+    {"id": "b", "cmd": "set-position", "thing_uri": "/hub/S2", "position": 40},
+    {"id": "c", "cmd": "set-position", "thing": "Blind0"},
+    {"id": "d", "cmd": "move-away"},
+    {"id": "e", "cmd": "list"},
+]
+
+
+def test_batch_writes_a_result_per_line(server, http):
+    """Each command gets a result line, bad commands an error line."""
+    source = io.StringIO(
+        "\n".join([json.dumps(c) for c in COMMANDS] + ["", "[1, 2]", "{oops"]) + "\n"
+    )
+    output = io.StringIO()
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        return await run_batch(client, source, output, concurrency=2)
+
+    timings = asyncio.run(_test())
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    by_id = {r["id"]: r for r in results if "id" in r}
+    assert by_id["a"]["ok"] and by_id["a"]["result"]["thing_uri"] == "/hub/S1"
+    assert by_id["b"]["result"] == {"result": "success"}
+    assert by_id["c"]["error"] == "ValueError: set-position needs a position."
+    assert by_id["d"]["error"].startswith("ValueError: Unknown cmd: move-away")
+    assert len(by_id["e"]["result"]) == 3
+    invalid = sorted(r["line"] for r in results if "id" not in r)
+    assert invalid == [7, 8]
+    assert all(not r["ok"] for r in results if "id" not in r)
+    assert server.things["/hub/S2"]["requestPosition"] == "40"
+    assert len(timings) == 7
+    summary = format_stats(timings, 1.0)
+    assert summary.startswith("7 commands in 1.000s (7.0/s), 4 failed")
+
+
+def test_session_is_saved_and_reused(server, http, tmp_path):
+    """A saved session lets a new client skip the login."""
+    path = str(tmp_path / "session.json")
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        _save_session(client, path)
+        assert not os.path.exists(path)
+        await client.async_login()
+        _save_session(client, path)
+
+        other = FakeHttpAsync(FakeServer())
+        reused = BruntClientAsync("user", "pass", http=other)
+        _load_session(reused, path)
+        await reused.async_get_things()
+        assert [call[1] for call in other.server.calls] == ["/thing"]
+
+    asyncio.run(_test())
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_broken_session_file_is_ignored(http, tmp_path):
+    """A session file that is not valid json is skipped."""
+    path = tmp_path / "session.json"
+    path.write_text("{not json", encoding="utf-8")
+    _load_session(BruntClientAsync("user", "pass", http=http), str(path))
+    _load_session(BruntClientAsync("user", "pass", http=http), str(tmp_path / "none"))
+    assert not http.is_logged_in
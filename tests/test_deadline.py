@@ -0,0 +1,68 @@
+"""Tests for the call deadlines and the hedged get_state."""
+import asyncio
+import time
+
+import pytest
+
+from brunt import BruntClientAsync, RequestPriority
+
+
+def test_slow_transport_times_out_within_the_deadline(server, http):
+    """A call stops at its deadline even when the server is slower."""
+    server.delay = 0.5
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, timeout=0.05)
+        start = time.monotonic()
+        with pytest.raises((TimeoutError, asyncio.TimeoutError)):
+            await client.async_get_state(thing_uri="/hub/S0")
+        assert time.monotonic() - start < 0.3
+
+    asyncio.run(_test())
+
+
+def test_deadline_covers_login_and_thing_lookup(server, http):
+    """The deadline of a call is shared by the login and list requests it needs."""
+    server.delay = 0.06
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        with pytest.raises((TimeoutError, asyncio.TimeoutError)):
+            # each request fits in the deadline, the three together do not.
+            await client.async_get_state(thing="Blind0", timeout=0.15)
+        state = await client.async_get_state(thing="Blind0", timeout=0.15)
+        assert state.thing_uri == "/hub/S0"
+
+    asyncio.run(_test())
+
+
+def test_hedge_fires_and_releases_its_slot(server, http):
+    """A slow get_state gets a second request and both slots are given back."""
+    server.delay = 0.001
+    handle = http.async_request
+    slow = []
+
+    async def _request(data, request_type, timeout=None):
+        if slow and data["path"] == "/thing/hub/S0" and not slow[0]:
+            slow[0] = True
+            await asyncio.sleep(1.0)
+        return await handle(data, request_type, timeout)
+
+    http.async_request = _request
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, hedge_percentile=0.9)
+        for _ in range(25):
+            await client.async_get_state(thing_uri="/hub/S0")
+        assert client.hedged_requests == 0
+        slow.append(False)
+        start = time.monotonic()
+        state = await client.async_get_state(thing_uri="/hub/S0")
+        assert state.thing_uri == "/hub/S0"
+        assert time.monotonic() - start < 0.5
+        assert client.hedged_requests == 1
+        await asyncio.sleep(0)
+        assert client.scheduler.in_flight == 0
+        assert client.scheduler.stats[RequestPriority.INTERACTIVE_READ].in_flight == 0
+
+    asyncio.run(_test())
@@ -0,0 +1,68 @@
+"""Tests for skipping position changes that match the known target."""
+import asyncio
+
+from brunt import BruntClientAsync
+
+
+def test_known_target_is_skipped(server, http):
+    """A position change to the fresh known target is not sent."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, elide_writes=True)
+        await client.async_get_state(thing_uri="/hub/S0")
+        assert await client.async_change_request_position(
+            0, thing_uri="/hub/S0"
+        ) == {"result": "skipped"}
+        assert await client.async_change_request_position(30, thing="Blind0") == {
+            "result": "success"
+        }
+        await client.async_get_state(thing_uri="/hub/S0")
+        assert await client.async_change_request_position(30, thing="Blind0") == {
+            "result": "skipped"
+        }
+        assert len(server.puts()) == 1
+
+    asyncio.run(_test())
+
+
+def test_force_sends_anyway(server, http):
+    """With force the change is sent even when it matches the target."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, elide_writes=True)
+        await client.async_get_state(thing_uri="/hub/S0")
+        assert await client.async_change_request_position(
+            0, thing_uri="/hub/S0", force=True
+        ) == {"result": "success"}
+        assert server.puts("/thing/hub/S0") == [{"requestPosition": "0"}]
+
+    asyncio.run(_test())
+
+
+def test_stale_state_is_not_elided(server, http):
+    """A state older than elide_max_age is not trusted."""
+
+    async def _test():
+        client = BruntClientAsync(
+            "user", "pass", http=http, elide_writes=True, elide_max_age=0.01
+        )
+        await client.async_get_state(thing_uri="/hub/S0")
+        await asyncio.sleep(0.02)
+        assert await client.async_change_request_position(
+            0, thing_uri="/hub/S0"
+        ) == {"result": "success"}
+        assert len(server.puts()) == 1
+
+    asyncio.run(_test())
+
+
+def test_elision_is_off_by_default(server, http):
+    """Without elide_writes every change is sent."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_state(thing_uri="/hub/S0")
+        await client.async_change_request_position(0, thing_uri="/hub/S0")
+        assert len(server.puts()) == 1
+
+    asyncio.run(_test())
@@ -0,0 +1,39 @@
+"""Tests for the blocking client on a background event loop."""
+import threading
+
+import pytest
+
+from brunt import BruntClientLoop
+from brunt import facade
+
+
+def _loop_threads():
+    return [t for t in threading.enumerate() if t.name == "brunt-loop"]
+
+
+def test_blocking_calls_and_close(server, http):
+    """Blocking calls run on the loop thread and close stops the thread."""
+    bapi = BruntClientLoop("user", "pass", http=http)
+    assert bapi.get_state(thing="Blind1").thing_uri == "/hub/S1"
+    assert bapi.change_request_position(30, thing_uri="/hub/S1") == {
+        "result": "success"
+    }
+    assert server.things["/hub/S1"]["requestPosition"] == "30"
+    assert set(bapi.map_get_state(["Blind0", "/hub/S2"])) == {"/hub/S0", "/hub/S2"}
+    bapi.close()
+    assert not _loop_threads()
+    assert bapi.loop.is_closed()
+    with pytest.raises(RuntimeError):
+        bapi.get_things()
+
+
+def test_failed_create_stops_the_loop(monkeypatch):
+    """When the async client can not be created the loop thread is stopped."""
+
+    def _fail(*args, **kwargs):
+        raise ValueError("no client")
+
+    monkeypatch.setattr(facade, "BruntClientAsync", _fail)
+    with pytest.raises(ValueError):
+        BruntClientLoop("user", "pass")
+    assert not _loop_threads()
@@ -0,0 +1,59 @@
+"""Tests for the fleet moves of the async client."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClientAsync
+
+
+def test_apply_positions_timeout_reports_waiting_things(server, http):
+    """The things that did not arrive are in the timeout message."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_things()
+        handle = server.handle
+
+        def _stuck(data, request_type):
+            # S1 never moves.
+            resp = handle(data, request_type)
+            if data["path"] == "/thing/hub/S1" and isinstance(resp, dict):
+                resp["currentPosition"] = "0"
+            return resp
+
+        server.handle = _stuck
+        with pytest.raises(TimeoutError, match=r"\['/hub/S1'\]"):
+            await client.async_apply_positions(
+                {"/hub/S0": 40, "/hub/S1": 40},
+                wait_for_arrival=True,
+                arrival_timeout=0.2,
+                poll_interval=0.01,
+            )
+
+    asyncio.run(_test())
+
+
+def test_apply_positions_arrival_tolerance(server, http):
+    """A blind that stops one off its target has arrived."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_things()
+        handle = server.handle
+
+        def _one_off(data, request_type):
+            resp = handle(data, request_type)
+            if data["path"] == "/thing/hub/S0" and isinstance(resp, dict):
+                resp["currentPosition"] = "99"
+            return resp
+
+        server.handle = _one_off
+        result = await client.async_apply_positions(
+            {"/hub/S0": 100},
+            wait_for_arrival=True,
+            arrival_timeout=1,
+            poll_interval=0.01,
+        )
+        assert result["/hub/S0"].current_position == 99
+
+    asyncio.run(_test())
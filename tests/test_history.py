@@ -0,0 +1,93 @@
+"""Tests for the position history of things."""
+import asyncio
+import io
+import json
+
+import pytest
+
+from brunt import BruntClientAsync
+from brunt.history import HistorySample, Movement, ThingHistory
+
+
+def _fill(history, samples):
+    for sample in samples:
+        history.append(*sample)
+
+
+def test_ring_buffer_keeps_the_latest_samples():
+    """A full buffer overwrites the oldest sample and skips repeated states."""
+    history = ThingHistory(3)
+    _fill(history, [(float(t), t, t, 0) for t in range(5)])
+    assert not history.append(4.0, 4, 4, 0)
+    assert len(history) == 3
+    assert [s.timestamp for s in history] == [2.0, 3.0, 4.0]
+    assert history.samples(since=3.0) == [
+        HistorySample(3.0, 3, 3, 0),
+        HistorySample(4.0, 4, 4, 0),
+    ]
+
+
+def test_movements_and_travel_time():
+    """A movement runs from the last resting sample to the arrival."""
+    history = ThingHistory(10)
+    _fill(
+        history,
+        [
+            (0.0, 0, 0, 0),
+            (1.0, 0, 50, 1),
+            (6.0, 50, 50, 0),
+            (7.0, 50, 40, 1),
+            (8.0, 40, 40, 0),
+        ],
+    )
+    assert list(history.movements()) == [
+        Movement(0.0, 6.0, 0, 50),
+        Movement(6.0, 8.0, 50, 40),
+    ]
+    assert history.recent_movements(1) == [Movement(6.0, 8.0, 50, 40)]
+    assert history.average_travel_time() == pytest.approx(8.0 / 60)
+    assert ThingHistory(2).average_travel_time() is None
+
+
+def test_exports():
+    """The samples are written as CSV and as newline delimited JSON."""
+    history = ThingHistory(2)
+    history.append(1.0, 10, 20, 1)
+    csv_file, json_file = io.StringIO(), io.StringIO()
+    history.to_csv(csv_file)
+    history.to_ndjson(json_file)
+    assert csv_file.getvalue().splitlines() == [
+        "timestamp,current_position,request_position,move_state",
+        "1.0,10,20,1",
+    ]
+    assert json.loads(json_file.getvalue()) == {
+        "timestamp": 1.0,
+        "current_position": 10,
+        "request_position": 20,
+        "move_state": 1,
+    }
+
+
+def test_invalid_size():
+    """The history keeps at least one sample."""
+    with pytest.raises(ValueError):
+        ThingHistory(0)
+
+
+def test_client_records_fetched_states(server, http):
+    """The client appends each fetched state of a thing to its history."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, history_size=4)
+        await client.async_get_state(thing_uri="/hub/S0")
+        await client.async_change_request_position(30, thing_uri="/hub/S0")
+        await client.async_get_state(thing_uri="/hub/S0")
+        history = client.history(thing="Blind0")
+        assert [(s.current_position, s.request_position) for s in history] == [
+            (0, 0),
+            (30, 30),
+        ]
+        with pytest.raises(ValueError):
+            BruntClientAsync("user", "pass", http=http).history(thing_uri="/hub/S0")
+
+    asyncio.run(_test())
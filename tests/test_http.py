@@ -0,0 +1,58 @@
+"""Tests for the http layers, against a local aiohttp server."""
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp import test_utils
+
+from brunt.http import BruntHttpAsync
+from brunt.utils import RequestTypes
+
+
+async def _serve(body):
+    async def _handler(request):
+        return web.Response(body=body, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_route("*", "/thing", _handler)
+    server = test_utils.TestServer(app)
+    await server.start_server()
+    return server
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [(b"", {"result": "success"}), (b" \n", {"result": "success"}), (b"[]", [])],
+)
+def test_async_request_decodes_empty_and_json_bodies(body, expected):
+    """An empty body is a success, a JSON body is decoded."""
+
+    async def _test():
+        server = await _serve(body)
+        http = BruntHttpAsync()
+        try:
+            data = {"host": str(server.make_url("")).rstrip("/"), "path": "/thing"}
+            assert await http.async_request(data, RequestTypes.GET) == expected
+        finally:
+            await http.session.close()
+            await server.close()
+
+    asyncio.run(_test())
+
+
+@pytest.mark.parametrize("body", [b"<html>busy</html>", b'[{"NAME": "Bl'])
+def test_async_request_raises_for_invalid_json(body):
+    """A body that is not JSON raises ValueError, like the sync transport."""
+
+    async def _test():
+        server = await _serve(body)
+        http = BruntHttpAsync()
+        try:
+            data = {"host": str(server.make_url("")).rstrip("/"), "path": "/thing"}
+            with pytest.raises(ValueError):
+                await http.async_request(data, RequestTypes.GET)
+        finally:
+            await http.session.close()
+            await server.close()
+
+    asyncio.run(_test())
@@ -0,0 +1,99 @@
+"""Tests for the adaptive concurrency limiter."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClientAsync
+from brunt.http import BruntHttpAsync
+from brunt.limiter import AdaptiveLimiter
+
+
+def test_adaptive_limit_is_opt_in():
+    """New http layers and clients do not limit the requests by default."""
+
+    async def _test():
+        http = BruntHttpAsync()
+        assert http._get_limiter("https://sky.brunt.co") is None
+        await http.session.close()
+        client = BruntClientAsync("user", "pass", adaptive_limit=True)
+        client._http._get_limiter("https://sky.brunt.co")
+        assert client.limiter_stats["https://sky.brunt.co"].limit == 8
+        await client.async_close()
+
+    asyncio.run(_test())
+
+
+def test_limit_holds_back_requests():
+    """Requests above the limit wait until one is released."""
+
+    async def _test():
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert limiter.stats.queue_depth == 1
+        limiter.release(rtt=0.01)
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 2
+
+    asyncio.run(_test())
+
+
+def test_limit_grows_when_used_and_fast():
+    """The limit grows while it is used and the latency stays at the baseline."""
+    limiter = AdaptiveLimiter(initial_limit=4)
+    for _ in range(10):
+        limiter._in_flight = limiter.limit
+        limiter.release(rtt=0.01)
+    assert limiter.limit > 4
+
+
+def test_limit_backs_off_on_errors_and_latency():
+    """Errors and a latency above tolerance times the baseline cut the limit."""
+    limiter = AdaptiveLimiter(initial_limit=16)
+    limiter._in_flight = 1
+    limiter.release(error=True)
+    assert limiter.limit == 8
+    limiter._last_decrease = 0.0
+    limiter._in_flight = 2
+    limiter.release(rtt=0.01)
+    limiter.release(rtt=0.5)
+    assert limiter.limit == 4
+    assert limiter.stats.decreases == 2
+
+
+def test_limit_does_not_grow_when_idle():
+    """A limit that is hardly used says nothing about the server."""
+    limiter = AdaptiveLimiter(initial_limit=16)
+    for _ in range(10):
+        limiter._in_flight = 1
+        limiter.release(rtt=0.01)
+    assert limiter.limit == 16
+
+
+def test_cancelled_waiter_gives_back_its_slot():
+    """A waiter cancelled while waiting does not leak a slot."""
+
+    async def _test():
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release(rtt=0.01)
+        assert limiter.in_flight == 0
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+    asyncio.run(_test())
+
+
+def test_invalid_settings_raise():
+    """Settings out of range raise ValueError."""
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(initial_limit=0)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(backoff=1.5)
@@ -0,0 +1,125 @@
+"""Tests for the outbox of submitted commands."""
+import asyncio
+import json
+
+from brunt import BruntClientAsync
+from brunt import client as brunt_client
+from brunt.outbox import FileOutbox, OutboxEntry
+
+
+def test_file_outbox_survives_a_restart(tmp_path):
+    """Unfinished commands are loaded again, completed ones are not."""
+    path = str(tmp_path / "outbox.log")
+    outbox = FileOutbox(path)
+    first = OutboxEntry("/hub/S0", "moveState", 1)
+    second = OutboxEntry("/hub/S1", "moveState", 2)
+    outbox.add(first)
+    outbox.add(second)
+    outbox.complete(first.entry_id)
+    outbox.close()
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("{not json\n")
+
+    reopened = FileOutbox(path)
+    assert [e.entry_id for e in reopened.pending()] == [second.entry_id]
+    reopened.close()
+    with open(path, encoding="utf-8") as file:
+        # the completed command made the open compact the file.
+        assert [json.loads(line)["op"] for line in file] == ["add"]
+
+
+def test_file_outbox_compacts(tmp_path):
+    """The file only keeps the unfinished commands after compact_after completions."""
+    path = str(tmp_path / "outbox.log")
+    outbox = FileOutbox(path, compact_after=2)
+    entries = [OutboxEntry("/hub/S0", "moveState", idx) for idx in range(3)]
+    for entry in entries:
+        outbox.add(entry)
+    outbox.complete(entries[0].entry_id)
+    outbox.complete(entries[1].entry_id)
+    outbox.close()
+    with open(path, encoding="utf-8") as file:
+        assert [json.loads(line)["entry_id"] for line in file] == [entries[2].entry_id]
+
+
+def test_submit_sends_in_order_per_thing(server, http):
+    """Submitted changes are sent in submit order for each thing."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        futures = [
+            client.submit_change_key("moveState", str(idx), thing_uri="/hub/S0")
+            for idx in range(3)
+        ]
+        futures.append(client.submit_change_key("moveState", "9", thing_uri="/hub/S1"))
+        assert len(client.outbox) == 4
+        await client.async_flush_outbox()
+        assert all(f.result() == {"result": "success"} for f in futures)
+        assert [p["moveState"] for p in server.puts("/thing/hub/S0")] == ["0", "1", "2"]
+        assert len(client.outbox) == 0
+        await client.async_close()
+
+    asyncio.run(_test())
+
+
+def test_transient_errors_are_retried(server, http, monkeypatch):
+    """A timed out send is retried, the command stays until it is done."""
+    monkeypatch.setattr(brunt_client, "OUTBOX_RETRY_DELAY", 0.0)
+    handle = server.handle
+    failures = []
+
+    def _flaky(data, request_type):
+        if request_type.value == "PUT" and not failures:
+            failures.append(data["path"])
+            raise asyncio.TimeoutError()
+        return handle(data, request_type)
+
+    server.handle = _flaky
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        future = client.submit_change_key("moveState", "1", thing_uri="/hub/S0")
+        assert await future == {"result": "success"}
+        assert failures == ["/thing/hub/S0"]
+        assert server.things["/hub/S0"]["moveState"] == "1"
+        await client.async_close()
+
+    asyncio.run(_test())
+
+
+def test_commands_left_by_a_restart_are_sent(server, http, tmp_path):
+    """async_start_outbox sends the commands loaded from the file."""
+    path = str(tmp_path / "outbox.log")
+    outbox = FileOutbox(path)
+    outbox.add(OutboxEntry("/hub/S2", "requestPosition", 40))
+    outbox.close()
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, outbox=FileOutbox(path))
+        results = await asyncio.gather(*await client.async_start_outbox())
+        assert results == [{"result": "success"}]
+        assert server.things["/hub/S2"]["requestPosition"] == "40"
+        await client.async_close()
+
+    asyncio.run(_test())
+    reopened = FileOutbox(path)
+    assert reopened.pending() == []
+    reopened.close()
+
+
+def test_close_cancels_the_unfinished_commands(server, http, tmp_path):
+    """Closing the client cancels the Futures, the file keeps the commands."""
+    server.delay = 1.0
+    path = str(tmp_path / "outbox.log")
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http, outbox=FileOutbox(path))
+        future = client.submit_change_key("moveState", "1", thing_uri="/hub/S0")
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(client.async_close(), 0.5)
+        assert future.cancelled()
+
+    asyncio.run(_test())
+    reopened = FileOutbox(path)
+    assert [e.thing_uri for e in reopened.pending()] == ["/hub/S0"]
+    reopened.close()
@@ -0,0 +1,54 @@
+"""Tests for the optimistic updates and pending changes of the client."""
+import asyncio
+
+from brunt import BruntClientAsync
+from brunt import client as brunt_client
+
+
+def _lagging(server, count):
+    """Let the server report the old position for the next count states."""
+    handle = server.handle
+    lag = {"left": count}
+
+    def _handle(data, request_type):
+        resp = handle(data, request_type)
+        if request_type.value == "GET" and data["path"] != "/thing" and lag["left"]:
+            lag["left"] -= 1
+            resp["requestPosition"] = "0"
+        return resp
+
+    server.handle = _handle
+
+
+def test_lagging_state_keeps_pending_change(server, http):
+    """A state that does not confirm the write yet does not roll back the cache."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_things()
+        await client.async_change_request_position(60, thing_uri="/hub/S0")
+        _lagging(server, 1)
+        state = await client.async_get_state(thing_uri="/hub/S0")
+        assert state.request_position == 60
+        assert client.pending_changes == {"/hub/S0": {"request_position": 60}}
+        await client.async_get_state(thing_uri="/hub/S0")
+        assert client.pending_changes == {}
+
+    asyncio.run(_test())
+
+
+def test_unconfirmed_change_expires(server, http, monkeypatch):
+    """After PENDING_MAX_AGE the server state wins."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_things()
+        await client.async_change_request_position(60, thing_uri="/hub/S0")
+        monkeypatch.setattr(brunt_client, "PENDING_MAX_AGE", 0.0)
+        _lagging(server, 1)
+        state = await client.async_get_state(thing_uri="/hub/S0")
+        assert state.request_position == 0
+        assert client.pending_changes == {}
+        assert client.get_cached_thing(thing_uri="/hub/S0").request_position == 0
+
+    asyncio.run(_test())
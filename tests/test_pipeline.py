@@ -0,0 +1,188 @@
+"""Tests for the ordered write pipelines per thing."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClientAsync, DevicePipelines
+from brunt.utils import deadline_scope
+
+POSITIONS = [10, 20, 30, 40, 50]
+
+
+def _positions(server, path="/thing/hub/S0"):
+    return [int(payload["requestPosition"]) for payload in server.puts(path)]
+
+
+@pytest.mark.parametrize("by_name", [False, True])
+def test_cold_registry_keeps_the_call_order(server, http, by_name):
+    """Changes made before the login and the thing list load go out in order."""
+    server.delay = 0.01
+
+    async def _test():
+        pipelines = DevicePipelines()
+        client = BruntClientAsync("user", "pass", http=http, pipelines=pipelines)
+        target = {"thing": "Blind0"} if by_name else {"thing_uri": "/hub/S0"}
+        await asyncio.gather(
+            *(client.async_change_request_position(pos, **target) for pos in POSITIONS)
+        )
+        assert _positions(server) == POSITIONS
+        assert server.things["/hub/S0"]["requestPosition"] == "50"
+        assert pipelines.depths == {}
+
+    asyncio.run(_test())
+
+
+def test_change_after_the_load_does_not_overtake(server, http):
+    """A change made when the list just loaded goes after the waiting changes."""
+    server.delay = 0.01
+
+    async def _test():
+        pipelines = DevicePipelines()
+        client = BruntClientAsync("user", "pass", http=http, pipelines=pipelines)
+        tasks = [
+            asyncio.ensure_future(
+                client.async_change_request_position(pos, thing_uri="/hub/S0")
+            )
+            for pos in POSITIONS
+        ]
+        while client.last_registry_diff is None:
+            await asyncio.sleep(0)
+        await client.async_change_request_position(60, thing_uri="/hub/S0")
+        await asyncio.gather(*tasks)
+        assert _positions(server) == POSITIONS + [60]
+        assert server.things["/hub/S0"]["requestPosition"] == "60"
+
+    asyncio.run(_test())
+
+
+def test_cold_registry_supersedes_to_the_last_position(server, http):
+    """With supersede the positions that are sent are in order and end at the last."""
+    server.delay = 0.01
+
+    async def _test():
+        pipelines = DevicePipelines(supersede=True)
+        client = BruntClientAsync("user", "pass", http=http, pipelines=pipelines)
+        results = await asyncio.gather(
+            *(
+                client.async_change_request_position(pos, thing_uri="/hub/S0")
+                for pos in POSITIONS
+            )
+        )
+        sent = _positions(server)
+        assert sent == sorted(sent) and sent[-1] == 50
+        assert results.count({"result": "superseded"}) == len(POSITIONS) - len(sent)
+        assert server.things["/hub/S0"]["requestPosition"] == "50"
+
+    asyncio.run(_test())
+
+
+def test_concurrent_positions_are_all_sent_by_default(server, http):
+    """Without supersede every position change is sent and gets the response."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        results = await asyncio.gather(
+            *(
+                client.async_change_request_position(pos, thing_uri="/hub/S0")
+                for pos in POSITIONS
+            )
+        )
+        assert results == [{"result": "success"}] * len(POSITIONS)
+        assert _positions(server) == POSITIONS
+        assert client.pipelines.superseded == 0
+
+    asyncio.run(_test())
+
+
+def test_full_queue_is_refused():
+    """A write reserved when max_depth writes are queued raises."""
+
+    async def _test():
+        pipelines = DevicePipelines(max_depth=2)
+        writes = [pipelines.reserve("/thing/a", "moveState") for _ in range(2)]
+        with pytest.raises(RuntimeError):
+            pipelines.reserve("/thing/a", "moveState")
+        assert pipelines.depths == {"/thing/a": 2}
+        assert await pipelines.run(writes[0], _third) == "third"
+        assert await pipelines.run(writes[1], _third) == "third"
+        assert pipelines.depths == {}
+
+    asyncio.run(_test())
+
+
+def test_supersede_replaces_queued_position_writes():
+    """A position write replaces the queued ones, not the one being sent."""
+
+    async def _test():
+        pipelines = DevicePipelines(max_depth=2, supersede=True)
+        writes = [pipelines.reserve("/thing/a", "requestPosition") for _ in range(3)]
+        assert writes[0].turn.result() is True
+        assert writes[1].turn.done() and writes[1].turn.result() is False
+        assert not writes[2].turn.done()
+        assert pipelines.superseded == 1
+        assert await pipelines.run(writes[1], _fail) == {"result": "superseded"}
+
+    asyncio.run(_test())
+
+
+def test_deadline_while_waiting_frees_the_place():
+    """A write that times out waiting is skipped and the next one still runs."""
+
+    async def _test():
+        pipelines = DevicePipelines(max_depth=3)
+        release = asyncio.Event()
+
+        async def _slow():
+            await release.wait()
+            return "first"
+
+        first = pipelines.reserve("/thing/a", "moveState")
+        second = pipelines.reserve("/thing/a", "moveState")
+        third = pipelines.reserve("/thing/a", "moveState")
+        running = asyncio.ensure_future(pipelines.run(first, _slow))
+        with deadline_scope(0.02):
+            with pytest.raises(TimeoutError):
+                await pipelines.run(second, _fail)
+        waiting = asyncio.ensure_future(pipelines.run(third, _third))
+        release.set()
+        assert await running == "first"
+        assert await waiting == "third"
+        assert pipelines.depths == {}
+
+    asyncio.run(_test())
+
+
+def test_different_things_run_in_parallel():
+    """A slow write to one thing does not hold back a write to another thing."""
+
+    async def _test():
+        pipelines = DevicePipelines()
+        release = asyncio.Event()
+
+        async def _slow():
+            await release.wait()
+            return "slow"
+
+        slow = asyncio.ensure_future(
+            pipelines.async_run("/thing/a", "moveState", _slow)
+        )
+        await asyncio.sleep(0)
+        assert await pipelines.async_run("/thing/b", "moveState", _third) == "third"
+        release.set()
+        assert await slow == "slow"
+
+    asyncio.run(_test())
+
+
+def test_invalid_depth():
+    """The queue needs room for at least the write being sent."""
+    with pytest.raises(ValueError):
+        DevicePipelines(max_depth=0)
+
+
+async def _fail():
+    raise AssertionError("should not be sent")
+
+
+async def _third():
+    return "third"
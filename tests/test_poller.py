@@ -0,0 +1,119 @@
+"""Tests for the timing wheel poll scheduler."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClientAsync
+from brunt.poller import PollScheduler
+
+
+def test_slow_polls_do_not_stall_the_wheel():
+    """Polls slower than a tick run concurrently and the lag stays bounded."""
+
+    async def _test():
+        polled = []
+
+        async def _poll(batch):
+            await asyncio.sleep(0.25)
+            polled.extend(batch)
+
+        poller = PollScheduler(_poll, tick=0.02, batch_size=5, max_batches=50)
+        for idx in range(100):
+            poller.add(f"/hub/S{idx}", 0.5)
+        poller.start()
+        await asyncio.sleep(1.6)
+        await poller.stop()
+        assert poller.stats.max_lag < 0.1
+        assert len(polled) >= 200
+        assert poller.stats.errors == 0
+
+    asyncio.run(_test())
+
+
+def test_max_batches_bounds_concurrent_polls():
+    """At most max_batches polls run at once."""
+
+    async def _test():
+        running = 0
+        peak = 0
+
+        async def _poll(batch):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        poller = PollScheduler(_poll, tick=0.01, batch_size=1, max_batches=3)
+        for idx in range(30):
+            poller.add(f"/hub/S{idx}", 0.1)
+        poller.start()
+        await asyncio.sleep(0.5)
+        await poller.stop()
+        assert peak == 3
+        assert poller.stats.polled > 0
+
+    asyncio.run(_test())
+
+
+def test_busy_thing_is_skipped():
+    """A thing whose poll is still running is not polled again."""
+
+    async def _test():
+        calls = []
+
+        async def _poll(batch):
+            calls.append(batch)
+            await asyncio.sleep(0.3)
+
+        poller = PollScheduler(_poll, tick=0.01, jitter=0.0)
+        poller.add("/hub/S0", 0.05)
+        poller.start()
+        await asyncio.sleep(0.25)
+        await poller.stop()
+        assert calls == [["/hub/S0"]]
+        assert poller.stats.skipped >= 2
+
+    asyncio.run(_test())
+
+
+def test_errors_do_not_stop_polling():
+    """A failing poll is counted and the wheel keeps polling."""
+
+    async def _test():
+        async def _poll(batch):
+            raise ValueError("boom")
+
+        poller = PollScheduler(_poll, tick=0.01, jitter=0.0)
+        poller.add("/hub/S0", 0.03)
+        poller.start()
+        await asyncio.sleep(0.2)
+        assert poller.running
+        await poller.stop()
+        assert poller.stats.errors >= 2
+
+    asyncio.run(_test())
+
+
+def test_client_polling_settings_and_callback(server, http):
+    """A later start_polling call replaces the callback and refuses new settings."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        first, second = [], []
+        poller = await client.async_start_polling(
+            0.05, things=["Blind0"], callback=first.append, tick=0.01
+        )
+        with pytest.raises(ValueError):
+            await client.async_start_polling(0.05, tick=0.02)
+        with pytest.raises(ValueError):
+            await client.async_start_polling(0.05, tick=0.01, max_batches=2)
+        assert await client.async_start_polling(
+            0.05, things=["Blind1"], callback=second.append, tick=0.01
+        ) is poller
+        await asyncio.sleep(0.2)
+        await client.async_stop_polling()
+        assert len(poller) == 2
+        assert second and not any("/hub/S1" in states for states in first)
+
+    asyncio.run(_test())
@@ -0,0 +1,70 @@
+"""Tests for the stage profiler."""
+import asyncio
+import io
+import re
+import tracemalloc
+
+import pytest
+
+from brunt import BruntClientAsync
+from brunt.profiling import Profiler, profiler
+
+
+@pytest.fixture
+def enabled():
+    """Return the client profiler, enabled and empty, and disable it afterwards."""
+    profiler.reset()
+    profiler.enable()
+    yield profiler
+    profiler.disable()
+    profiler.reset()
+
+
+def test_profiled_call_in_collapsed_format(server, http, enabled):
+    """A client call is written as nested stages with their self time."""
+    server.delay = 0.01
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_state(thing_uri="/hub/S0")
+
+    asyncio.run(_test())
+    stats = enabled.stats
+    assert stats["get_state"].calls == 1
+    assert "get_state;scheduler_wait" in stats
+    assert stats["get_state"].total_ns >= stats["get_state"].self_ns >= 10_000_000
+    output = io.StringIO()
+    enabled.write_collapsed(output)
+    lines = output.getvalue().splitlines()
+    assert lines and all(re.fullmatch(r"[\w;]+ \d+", line) for line in lines)
+    assert any(line.startswith("get_state ") for line in lines)
+    summary = enabled.summary().splitlines()
+    assert summary[0].split()[0] == "calls" and summary[0].endswith("stage")
+    assert summary[1].split()[0] == "1"
+
+
+def test_memory_is_traced_per_stage():
+    """With trace_memory the self allocations of a stage are written."""
+    local = Profiler()
+    local.enable(trace_memory=True)
+    try:
+        with local.stage("outer"):
+            with local.stage("inner"):
+                kept = [bytearray(1000) for _ in range(100)]
+        output = io.StringIO()
+        local.write_collapsed(output, memory=True)
+    finally:
+        local.disable()
+    assert not tracemalloc.is_tracing()
+    values = dict(line.rsplit(" ", 1) for line in output.getvalue().splitlines())
+    assert int(values["outer;inner"]) >= 100_000
+    assert local.stats["outer"].alloc_bytes >= local.stats["outer;inner"].alloc_bytes
+    assert len(kept) == 100
+
+
+def test_disabled_profiler_records_nothing():
+    """A disabled profiler hands out a null stage."""
+    local = Profiler()
+    with local.stage("idle"):
+        pass
+    assert local.stats == {}
@@ -0,0 +1,128 @@
+"""Tests for the record and replay transports."""
+import asyncio
+import gzip
+
+import pytest
+import requests
+from aiohttp import web
+from aiohttp import test_utils
+
+from brunt import BruntClient, BruntClientAsync
+from brunt import client as brunt_client
+from brunt.recording import (
+    RecordingHttp,
+    RecordingHttpAsync,
+    ReplayHttp,
+    ReplayHttpAsync,
+    async_replay_traffic,
+    load_recording,
+)
+
+from conftest import make_records
+
+
+async def _cloud():
+    things = {r["thingUri"]: r for r in make_records(2)}
+
+    async def _session(request):
+        return web.json_response({"sessionId": "live-session-id"})
+
+    async def _list(request):
+        return web.json_response(list(things.values()))
+
+    async def _thing(request):
+        uri = request.path[len("/thing") :]
+        if request.method == "PUT":
+            return web.Response(body=b"")
+        return web.json_response(things[uri])
+
+    app = web.Application()
+    app.router.add_post("/session", _session)
+    app.router.add_get("/thing", _list)
+    app.router.add_route("*", "/thing/hub/{serial}", _thing)
+    server = test_utils.TestServer(app)
+    await server.start_server()
+    return server
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """Record some traffic against a local cloud and return the file."""
+    path = str(tmp_path / "traffic.ndjson.gz")
+
+    async def _record():
+        server = await _cloud()
+        host = str(server.make_url("")).rstrip("/")
+        monkeypatch.setattr(brunt_client, "MAIN_HOST", host)
+        monkeypatch.setattr(brunt_client, "THINGS_HOST", host)
+        monkeypatch.setattr(
+            brunt_client, "MAIN_THINGS_PATH", {"path": "/thing", "host": host}
+        )
+        http = RecordingHttpAsync(path)
+        client = BruntClientAsync("me@example.com", "secret", http=http)
+        try:
+            await client.async_login()
+            await client.async_get_things()
+            await client.async_get_state(thing_uri="/hub/S1")
+            await client.async_change_request_position(40, thing_uri="/hub/S1")
+        finally:
+            await client.async_close()
+            await server.close()
+        # async_close finished the gzip file while the transport is still alive.
+        assert load_recording(http.recording.path)[-1].method == "PUT"
+
+    asyncio.run(_record())
+    return path
+
+
+def test_recording_scrubs_credentials(recording):
+    """The login payload and the login response are not in the file."""
+    with gzip.open(recording, "rt") as file:
+        raw = file.read()
+    assert "secret" not in raw
+    assert "me@example.com" not in raw
+    assert "live-session-id" not in raw
+    # the local cloud sets no brunt.co cookie, so the client logs in every call.
+    paths = [e.path for e in load_recording(recording) if e.path != "/session"]
+    assert paths == ["/thing", "/thing/hub/S1", "/thing/hub/S1"]
+
+
+def test_replay_serves_the_recording(recording):
+    """A client with a replay transport gets the recorded responses."""
+
+    async def _test():
+        http = ReplayHttpAsync(recording, speed=None)
+        assert http.codec is not None
+        client = BruntClientAsync("user", "pass", http=http)
+        state = await client.async_get_state(thing="Blind1")
+        assert state.thing_uri == "/hub/S1"
+        results = await async_replay_traffic(
+            BruntClientAsync("user", "pass", http=ReplayHttpAsync(recording, None)),
+            recording,
+            speed=None,
+        )
+        assert [result.error for result in results] == [None, None, None]
+
+    asyncio.run(_test())
+
+
+def test_sync_replay_has_a_codec(recording):
+    """The sync replay transport initializes its base class."""
+    http = ReplayHttp(recording, speed=None)
+    assert http.codec is not None
+    assert http.request(
+        {"host": load_recording(recording)[1].host, "path": "/thing"},
+        brunt_client.RequestTypes.GET,
+    )
+
+
+def test_sync_close_finishes_the_recording(tmp_path, monkeypatch):
+    """Closing the sync client closes the gzipped recording, with the exchanges."""
+    path = str(tmp_path / "traffic.ndjson.gz")
+    monkeypatch.setattr(brunt_client, "MAIN_HOST", "http://127.0.0.1:9")
+    with BruntClient("me@example.com", "secret", http=RecordingHttp(path)) as bapi:
+        with pytest.raises(requests.ConnectionError):
+            bapi.login()
+    [exchange] = load_recording(path)
+    assert exchange.path == "/session"
+    assert exchange.error.startswith("ConnectionError")
@@ -0,0 +1,66 @@
+"""Tests for refreshing the state of many things at once."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClient, BruntClientAsync
+
+from conftest import FakeHttp, FakeHttpAsync, FakeServer
+
+
+def _paths(server):
+    return [path for method, path, _ in server.calls if method == "GET"]
+
+
+@pytest.fixture
+def big_server():
+    """Return a fake Brunt cloud with twenty things."""
+    return FakeServer(count=20)
+
+
+def test_few_things_use_get_state(big_server):
+    """Below the threshold each thing gets its own get_state request."""
+    with BruntClient("user", "pass", http=FakeHttp(big_server)) as bapi:
+        bapi.get_things()
+        assert set(bapi.refresh_states(["Blind1"])) == {"/hub/S1"}
+        states = bapi.refresh_states(["Blind1", "/hub/S2"], list_threshold=3)
+    assert set(states) == {"/hub/S1", "/hub/S2"}
+    assert _paths(big_server) == [
+        "/thing",
+        "/thing/hub/S1",
+        "/thing/hub/S1",
+        "/thing/hub/S2",
+    ]
+
+
+def test_many_things_use_the_thing_list(big_server):
+    """From the threshold on the states come from one thing list request."""
+    with BruntClient("user", "pass", http=FakeHttp(big_server)) as bapi:
+        bapi.get_things()
+        big_server.things["/hub/S3"]["currentPosition"] = "80"
+        states = bapi.refresh_states(["Blind1", "/hub/S2", "Blind3"])
+    assert states["/hub/S3"].current_position == 80
+    assert _paths(big_server) == ["/thing", "/thing"]
+
+
+def test_cold_registry_uses_the_first_list(big_server):
+    """The list loaded to resolve the names is not requested again."""
+    with BruntClient("user", "pass", http=FakeHttp(big_server)) as bapi:
+        states = bapi.refresh_states(list_threshold=1)
+    assert len(states) == 20
+    assert _paths(big_server) == ["/thing"]
+
+
+def test_async_branches(big_server):
+    """The async client makes the same choice, get_state calls run concurrently."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=FakeHttpAsync(big_server))
+        await client.async_get_things()
+        few = await client.async_refresh_states(["Blind1", "Blind2"], list_threshold=3)
+        assert _paths(big_server) == ["/thing", "/thing/hub/S1", "/thing/hub/S2"]
+        many = await client.async_refresh_states(["Blind1", "Blind2"], list_threshold=2)
+        assert _paths(big_server)[3:] == ["/thing"]
+        assert set(few) == set(many) == {"/hub/S1", "/hub/S2"}
+
+    asyncio.run(_test())
@@ -0,0 +1,44 @@
+"""Tests for the incremental thing registry."""
+import asyncio
+
+from brunt import BruntClientAsync
+
+
+def test_refresh_keeps_unchanged_things(server, http):
+    """Unchanged things keep their Thing object, changed ones are rebuilt."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        before = {t.thing_uri: t for t in await client.async_get_things()}
+        server.things["/hub/S1"]["currentPosition"] = "70"
+        server.things["/hub/S1"]["TIMESTAMP"] = "1700000000000"
+        diff = await client.async_refresh_things()
+        after = {t.thing_uri: t for t in await client.async_get_things()}
+        assert after["/hub/S0"] is before["/hub/S0"]
+        assert after["/hub/S2"] is before["/hub/S2"]
+        assert after["/hub/S1"] is not before["/hub/S1"]
+        assert [t.thing_uri for t in diff.changed] == ["/hub/S1"]
+        assert diff.unchanged == 2 and not diff.added and not diff.removed
+
+    asyncio.run(_test())
+
+
+def test_refresh_drops_removed_things(server, http):
+    """A thing that is no longer in the list is removed from the registry."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await client.async_get_things()
+        removed = server.things.pop("/hub/S1")
+        diff = await client.async_refresh_things()
+        assert [t.thing_uri for t in diff.removed] == ["/hub/S1"]
+        assert [t.thing_uri for t in await client.async_get_things()] == [
+            "/hub/S0",
+            "/hub/S2",
+        ]
+        assert client.get_cached_thing(thing_uri="/hub/S2").thing_uri == "/hub/S2"
+        server.things["/hub/S1"] = removed
+        diff = await client.async_refresh_things()
+        assert [t.thing_uri for t in diff.added] == ["/hub/S1"]
+
+    asyncio.run(_test())
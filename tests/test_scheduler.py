@@ -0,0 +1,110 @@
+"""Tests for the priority request scheduler."""
+import asyncio
+
+import pytest
+
+from brunt import PriorityScheduler, RequestPriority
+
+
+def test_free_slots_go_to_the_most_urgent_class():
+    """A waiting write gets the slot before a read and a background poll."""
+
+    async def _test():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        await scheduler.acquire(RequestPriority.BACKGROUND)
+        order = []
+
+        async def _request(priority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+
+        tasks = [
+            asyncio.ensure_future(_request(priority))
+            for priority in (
+                RequestPriority.BACKGROUND,
+                RequestPriority.INTERACTIVE_READ,
+                RequestPriority.INTERACTIVE_WRITE,
+            )
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats[RequestPriority.BACKGROUND].queue_depth == 1
+        scheduler.release(RequestPriority.BACKGROUND)
+        await asyncio.gather(*tasks)
+        assert order == [
+            RequestPriority.INTERACTIVE_WRITE,
+            RequestPriority.INTERACTIVE_READ,
+            RequestPriority.BACKGROUND,
+        ]
+        assert scheduler.in_flight == 0
+
+    asyncio.run(_test())
+
+
+def test_share_limits_a_class():
+    """A class never has more than its share of requests in flight."""
+
+    async def _test():
+        scheduler = PriorityScheduler(
+            max_concurrency=4, shares={RequestPriority.BACKGROUND: 1}
+        )
+        await scheduler.acquire(RequestPriority.BACKGROUND)
+        waiting = asyncio.ensure_future(scheduler.acquire(RequestPriority.BACKGROUND))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        await scheduler.acquire(RequestPriority.INTERACTIVE_READ)
+        assert scheduler.in_flight == 2
+        scheduler.release(RequestPriority.BACKGROUND)
+        await waiting
+        assert scheduler.stats[RequestPriority.BACKGROUND].granted == 2
+
+    asyncio.run(_test())
+
+
+def test_starved_request_is_promoted():
+    """A background request that waited too long goes before a write."""
+
+    async def _test():
+        scheduler = PriorityScheduler(max_concurrency=1, starvation_timeout=0.01)
+        await scheduler.acquire(RequestPriority.INTERACTIVE_WRITE)
+        background = asyncio.ensure_future(
+            scheduler.acquire(RequestPriority.BACKGROUND)
+        )
+        await asyncio.sleep(0.02)
+        write = asyncio.ensure_future(
+            scheduler.acquire(RequestPriority.INTERACTIVE_WRITE)
+        )
+        await asyncio.sleep(0)
+        scheduler.release(RequestPriority.INTERACTIVE_WRITE)
+        await background
+        assert not write.done()
+        assert scheduler.stats[RequestPriority.BACKGROUND].promoted == 1
+        scheduler.release(RequestPriority.BACKGROUND)
+        await write
+
+    asyncio.run(_test())
+
+
+def test_cancelled_waiter_gives_back_its_place():
+    """A cancelled request leaves the queue and does not keep a slot."""
+
+    async def _test():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        await scheduler.acquire(RequestPriority.INTERACTIVE_READ)
+        waiting = asyncio.ensure_future(
+            scheduler.acquire(RequestPriority.INTERACTIVE_READ)
+        )
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.stats[RequestPriority.INTERACTIVE_READ].queue_depth == 0
+        scheduler.release(RequestPriority.INTERACTIVE_READ)
+        assert scheduler.in_flight == 0
+
+    asyncio.run(_test())
+
+
+def test_invalid_concurrency():
+    """The scheduler needs at least one slot."""
+    with pytest.raises(ValueError):
+        PriorityScheduler(max_concurrency=0)
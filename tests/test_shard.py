@@ -0,0 +1,48 @@
+"""Tests for the multi process sharded runner."""
+import threading
+import time
+
+from brunt.shard import ShardedRunner
+
+from conftest import FakeHttpAsync, FakeServer
+
+
+def test_rebalance_keeps_polling_moved_accounts():
+    """A moved account is polled again on its new shard."""
+    updates = []
+    lock = threading.Lock()
+
+    def _on_update(account, thing):
+        with lock:
+            updates.append(account)
+
+    runner = ShardedRunner(
+        shards=2,
+        on_update=_on_update,
+        client_kwargs={"http": FakeHttpAsync(FakeServer())},
+        start_method="fork",
+    )
+    with runner:
+        for account in "abcd":
+            runner.add_account(account, "user", "pass")
+        on_second = [a for a in "abcd" if runner.shard_of(a) == 1]
+        for account in on_second:
+            runner.remove_account(account)
+        for account in runner._assignment:
+            runner.submit(account, "async_start_polling", 0.1, tick=0.01).result()
+        moves = runner.rebalance()
+        assert len(moves) == 1
+        moved = next(iter(moves))
+        assert runner.loads == [1, 1]
+        time.sleep(0.1)
+        with lock:
+            updates.clear()
+        time.sleep(0.5)
+        with lock:
+            assert moved in updates
+        # list results reach on_update as well.
+        with lock:
+            updates.clear()
+        assert len(runner.submit(moved, "async_get_things", force=True).result()) == 3
+        with lock:
+            assert updates.count(moved) >= 3
@@ -0,0 +1,38 @@
+"""Tests for the shared login and thing list load of the async client."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClientAsync
+
+
+def test_cold_registry_loads_things_once(server, http):
+    """Concurrent calls with a cold registry make one login and one list request."""
+    server.delay = 0.01
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        await asyncio.gather(
+            *(client.async_get_state(thing_uri=f"/hub/S{idx % 3}") for idx in range(5))
+        )
+        paths = [path for _, path, _ in server.calls]
+        assert paths.count("/session") == 1
+        assert paths.count("/thing") == 1
+
+    asyncio.run(_test())
+
+
+def test_waiting_for_the_list_load_keeps_the_deadline(server, http):
+    """A call that waits for another call's list load stops at its deadline."""
+    server.delay = 0.2
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        server.logged_in = True
+        first = asyncio.ensure_future(client.async_get_things())
+        await asyncio.sleep(0.01)
+        with pytest.raises(TimeoutError):
+            await client.async_get_things(timeout=0.05)
+        assert len(await first) == 3
+
+    asyncio.run(_test())
@@ -0,0 +1,73 @@
+"""Tests for the streaming thing list."""
+import asyncio
+
+import pytest
+
+from brunt import BruntClientAsync, PriorityScheduler, RequestPriority
+from brunt.stream import JsonArrayStream
+
+
+def test_stream_yields_elements_across_chunks():
+    """Elements split over chunks are returned once they are complete."""
+    parser = JsonArrayStream()
+    body = b'[{"a": 1}, {"b": "\xc3\xa9"}, [2, 3]]'
+    elements = []
+    for idx in range(len(body)):
+        elements.extend(parser.feed(body[idx : idx + 1]))
+    elements.extend(parser.close())
+    assert elements == [{"a": 1}, {"b": "é"}, [2, 3]]
+
+
+@pytest.mark.parametrize("body", [b'{"error": "busy"}', b"<html>", b""])
+def test_stream_rejects_bodies_that_are_not_an_array(body):
+    """A body that is not a complete array raises ValueError."""
+    parser = JsonArrayStream()
+    with pytest.raises(ValueError):
+        parser.feed(body)
+        parser.close()
+
+
+def test_stream_rejects_incomplete_array():
+    """A truncated array raises ValueError on close."""
+    parser = JsonArrayStream()
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+async def _collect(client):
+    return [thing async for thing in client.async_iter_things()]
+
+
+@pytest.mark.parametrize("list_body", [{"error": "busy"}, [1]])
+def test_invalid_list_keeps_the_registry(server, http, list_body):
+    """An invalid thing list raises and does not remove the cached things."""
+
+    async def _test():
+        client = BruntClientAsync("user", "pass", http=http)
+        assert len(await _collect(client)) == 3
+        server.list_body = list_body
+        with pytest.raises(ValueError):
+            await _collect(client)
+        for idx in range(3):
+            assert client.get_cached_thing(thing_uri=f"/hub/S{idx}")
+
+    asyncio.run(_test())
+
+
+def test_iter_things_waits_for_a_slot_within_the_deadline(server, http):
+    """Waiting for a scheduler slot stops at the deadline of the call."""
+
+    async def _test():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        client = BruntClientAsync("user", "pass", http=http, scheduler=scheduler)
+        server.logged_in = True
+        await scheduler.acquire(RequestPriority.INTERACTIVE_READ)
+        with pytest.raises(TimeoutError):
+            async for _ in client.async_iter_things(timeout=0.05):
+                pass
+        scheduler.release(RequestPriority.INTERACTIVE_READ)
+        assert len(await _collect(client)) == 3
+        assert scheduler.in_flight == 0
+
+    asyncio.run(_test())